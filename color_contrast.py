@@ -14,8 +14,13 @@ We will produce labels only in black (to contrast with light colors) and
 white (to contrast with dark colors).  Tile background colors are generated
 randomly, then a contrasting label color (black or white) is chosen.
 For some tiles colors  the desired contrast ratio of 7:1, the WCAG AAA criterion,
-cannot be met with either a black or white label.  In that case we generate
-another random color and try again.
+cannot be met with either a black or white label.  sampled_color generates
+another random color and tries again.  next_color instead chooses from a
+Palette of every color (with LEVELS values of each of red, green, and blue)
+that meets the criterion, computed once, so each color is chosen in
+constant time and with the same distribution.  key_color chooses from
+the same Palette by a hash of a key, so that a key has the same color
+in every run and every process.
 
 Code for determining contrast is absolutely brimming with magic numbers and seemingly arbitrary
 formulas, which are normally a "bad smell" in code.  Rather than defining
@@ -23,7 +28,11 @@ symbolic constants, which would not be helpful in this case, we have tried to
 follow as closely as possible the names and expression of the WCAG documentation
 at https://www.w3.org/WAI/GL/wiki/Relative_luminance .
 """
+from array import array
+import bisect
+import hashlib
 import random
+import time
 import logging
 logging.basicConfig()
 log = logging.getLogger(__name__)
@@ -52,7 +61,106 @@ def contrast(foreground: float, background: float) -> float:
     """
     return abs((foreground + 0.05)/(background + 0.05))
 
+LEVELS = 64        # Values of each channel in the palette, evenly spaced 0..255
+MIN_CONTRAST = 7.0
+
+
+class Palette:
+    """Every color with levels values of each channel that has
+    contrast ratio at least min_contrast with a black or white label.
+    Colors are packed as (r * levels + g) * levels + b, with r, g, b
+    the numbers of levels.  For each red and green, colors contrasting
+    with black have all blue values from some level up, and colors
+    contrasting with white all blue values up to some level, because
+    brightness increases with blue, so the table is built a range of
+    blue values at a time.
+    """
+    def __init__(self, levels: int = LEVELS, min_contrast: float = MIN_CONTRAST):
+        self.levels = levels
+        self.values = [round(i * 255 / (levels - 1)) for i in range(levels)]
+        self.codes = [f"{value:02x}" for value in self.values]
+        red = [0.2126 * s_rgb_val(value) for value in self.values]
+        green = [0.7152 * s_rgb_val(value) for value in self.values]
+        blue = [0.11 * s_rgb_val(value) for value in self.values]
+
+        def on_black(luma: float) -> bool:   # As in sampled_color
+            return (luma + 0.05) / (BLACK_BRIGHT + 0.05) >= min_contrast
+
+        def on_white(luma: float) -> bool:
+            return (WHITE_BRIGHT + 0.05) / (luma + 0.05) >= min_contrast
+
+        # Estimated bounds on brightness, corrected below with the
+        # tests themselves, so that rounding cannot admit a color
+        # sampled_color would reject
+        light = min_contrast * (BLACK_BRIGHT + 0.05) - 0.05
+        dark = (WHITE_BRIGHT + 0.05) / min_contrast - 0.05
+        self.black = array('I')   # Colors for black labels
+        self.white = array('I')   # Colors for white labels
+        for r in range(levels):
+            for g in range(levels):
+                partial = red[r] + green[g]   # Summed as in brightness
+                base = (r * levels + g) * levels
+                lo = bisect.bisect_left(blue, light - partial)
+                while lo < levels and not on_black(partial + blue[lo]):
+                    lo += 1
+                while lo > 0 and on_black(partial + blue[lo - 1]):
+                    lo -= 1
+                self.black.extend(range(base + lo, base + levels))
+                hi = bisect.bisect_right(blue, dark - partial)
+                while hi > 0 and not on_white(partial + blue[hi - 1]):
+                    hi -= 1
+                while hi < levels and on_white(partial + blue[hi]):
+                    hi += 1
+                self.white.extend(range(base, base + min(hi, lo)))   # Black preferred
+
+    def __len__(self) -> int:
+        return len(self.black) + len(self.white)
+
+    def color(self, index: int) -> tuple[str, str]:
+        """Color code and label color of palette entry index"""
+        if index < len(self.black):
+            packed, label = self.black[index], "black"
+        else:
+            packed, label = self.white[index - len(self.black)], "white"
+        packed, b = divmod(packed, self.levels)
+        r, g = divmod(packed, self.levels)
+        codes = self.codes
+        return f"#{codes[r]}{codes[g]}{codes[b]}", label
+
+    def choice(self, rng: random.Random = random) -> tuple[str, str]:
+        """A color chosen uniformly from the palette"""
+        return self.color(rng.randrange(len(self)))
+
+
+PALETTE: Palette | None = None   # Built when first needed
+
+
+def palette() -> Palette:
+    """The Palette of LEVELS, which is not changed once built"""
+    global PALETTE
+    if PALETTE is None:
+        PALETTE = Palette()
+    return PALETTE
+
+
 def next_color() -> tuple[str, str]:
+    """Generates random RGB color code and contrast color,
+    satisfying Web Content Accessibility Guidelines (WCAG),
+    from a Palette computed once.
+    """
+    return palette().choice()
+
+
+def key_color(key: str, seed: str = "") -> tuple[str, str]:
+    """RGB color code and contrast color for key, as next_color but
+    chosen by a hash of seed and key rather than at random.
+    """
+    digest = hashlib.blake2b(key.encode(), digest_size=8, key=seed.encode()[:64]).digest()
+    colors = palette()
+    return colors.color(int.from_bytes(digest, "big") % len(colors))
+
+
+def sampled_color() -> tuple[str, str]:
     """Generates random RGB color code and contrast color,
     satisfying Web Content Accessibility Guidelines (WCAG).
     WCAG requires contrast ratio 4.5:1 for text; 7.0 is considered
@@ -75,3 +183,23 @@ def next_color() -> tuple[str, str]:
             return rgb_code, "white"
         log.debug(f"Rejecting {r},{g},{b} ({luma}) for {black_contrast} with black and {white_contrast} with white")
 
+
+def benchmark(count: int = 50_000):
+    """Compare times of sampled_color and next_color for count colors"""
+    start = time.perf_counter()
+    for _ in range(count):
+        sampled_color()
+    sampled = time.perf_counter() - start
+    start = time.perf_counter()
+    palette = Palette()
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(count):
+        palette.choice()
+    chosen = time.perf_counter() - start
+    print(f"{count} colors:  sampled {sampled:.3f}s;  "
+          f"palette of {len(palette)} built in {built:.3f}s, then {chosen:.3f}s")
+
+
+if __name__ == "__main__":
+    benchmark()
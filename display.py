@@ -4,17 +4,47 @@ and returns an SVG version, which can be saved to a file.
 A color scheme from a key: color table and/or a CSS style sheet
 may be applied based on graphics.display_options.
 
-Note we are using modules (display, tk_display, svg_display) as stateful objects,
-which makes them "singletons".   To allow multiple instances of display (e.g.,
- building two different treemaps at the same time to compare them) would require
-rewrite of all three modules to isolate state in objects managed by other code.
+Each medium is a backend module, registered by name in BACKENDS and
+imported only when init selects it:  importing the Tk backend opens a
+Tk window, and fails where there is no display, so an SVG-only run
+(or stream_svg) never imports it.  A backend module provides
+create(options), which returns a new display object with methods
+    init(width, height), draw_tile(region), begin_group(region),
+    end_group(), close()
+where each region is a graphics.gr_display.Rectangular, with the
+colors and label already worked out here.  close finishes the output
+(for Tk, waiting for the user to close the window).  The module's
+DEFAULT display is used by the module API.
+
+The state of a render (the displays it draws on, the keys of enclosing
+groups, and its options, including colors assigned as it goes) is kept
+in a RenderContext, which is a canvas for tiling.render and the layout
+functions of tiling.  Several treemaps can be built at once, e.g., in
+threads, each with its own RenderContext:
+
+    context = display.RenderContext()
+    context.stream_svg(tiling.iter_tiles(values, 800, 600), out, 800, 600)
+
+A RenderContext copies graphics.display_options when it is created.
+With display_options.stable_colors set, keys that have no color in
+the color scheme get colors derived from the key and that seed, rather
+than random colors, so that every render of the same tiles (in any
+order, context, or process) colors them the same way.
+The module API (display.init, display.draw_tile, ...) uses a default
+context, which shares graphics.display_options and the DEFAULT
+display of each backend module.
 """
 
-import graphics.tk_display as tk
-import graphics.svg_display as svg
+from collections.abc import Sequence
+import importlib
+import io
+import types
+
 import graphics.gr_display as gr
+from graphics import text_metrics
 import geometry
-from graphics import display_options as options
+import tiling
+from graphics import display_options
 import color_contrast
 
 
@@ -24,17 +54,25 @@ log = logging.getLogger(__name__)
 log.setLevel(logging.INFO)
 
 
-# ------
-# Tk display requires us to keep a stack of keys so that we can
-# inherit graphical attributes from a parent.
-#
-INCLUSION_STACK: list[str] = []  # Initially empty
+# Backend modules by name, imported when chosen
+BACKENDS: dict[str, str] = {"tk": "graphics.tk_display",
+                            "svg": "graphics.svg_display"}
+DEFAULT_BACKENDS = ("tk", "svg")
+
+MAX_LOGGED_KEYS = 10   # Of those given random colors
 
 
 # --------------------------------------------------------
 #  API is
-#       init(width: int, height: int):
-#           Creates the display (Tk visible and SVG buffer) with width and height in pixels
+#       init(width: int, height: int, svg_out: io.TextIOBase | None = None,
+#            backends: Sequence[str] = DEFAULT_BACKENDS):
+#           Creates the display with width and height in pixels on the named backends
+#           (by default Tk visible and SVG buffer).  If svg_out (an open file, sys.stdout, ...)
+#           is provided, SVG is written to it as tiles are drawn instead of kept in a buffer,
+#           and is complete after wait_close.
+#
+#       register_backend(name: str, module: str):
+#           Makes the backend module (e.g., "graphics.svg_display") available to init by name.
 #
 #           def draw_tile(r: geometry.Rect,
 #                   key: object = None,
@@ -65,121 +103,300 @@ INCLUSION_STACK: list[str] = []  # Initially empty
 #           must be properly nested (like nested parentheses).   Tiles can inherit colors within
 #           groups, in both the Tk graphics and the SVG graphics.
 #
-#       svg_content() -> list[str]:
-#           Returns the SVG representation as a list of strings.
-#           Typically these should be written to a file, which can then
+#       write_svg(out: io.TextIOBase):
+#           Writes the buffered SVG representation to out (without first joining it into
+#           one string).  Typically out is a file, which can then
 #           be opened in a web browser or illustration application like
 #           Inkscape (free and open source) or Adobe Illustrator (very not free or open source).
 #
+#       svg_content() -> str:
+#           Returns the buffered SVG representation as a string.
+#
 #       wait_close():
-#           Closes the display after waiting for user to click it.
+#           Finishes output on each backend, in reverse order;  closes the Tk display
+#           after waiting for user to click it.
+#
+#       stream_svg(records, out: io.TextIOBase, width: int, height: int):
+#           Writes the SVG representation of tile and group records (from tiling.iter_tiles
+#           or tiling.compute_tiles) to out as each is produced, without Tk and without
+#           keeping the SVG in memory.  Does not require init.
+#
+#       explore(drill: drill_down.DrillDown):
+#           Lets the interactive Tk display (display_options.interactive) drill down
+#           into the groups of the treemap being drawn, with views laid out by drill.
+#
+#       RenderContext(options=None):
+#           A separate render, with all of the functions above as methods (except
+#           register_backend).  options default to a copy of graphics.display_options.
 #
 
 # -------------------------------------------------------------------
 #  API visible functions
 # -------------------------------------------------------------------
 
-def init(width: int, height: int):
-    tk.init(width, height)
-    svg.init(width, height)
-
-
-def draw_tile(r: geometry.Rect,
-              key: object = None,
-              value: object = None):
-    """Draw the tile (on both media).
-     Displays on Tk (Python built-in graphics) and
-     also writes corresponding graphics into buffer to
-     produce corresponding SVG diagram which can be displayed
-     in a web page, imported into a diagramming tool like
-     Inkscape, OmniGraffle, Illustrator, etc.
-     `key`, if present, is normalized to become the class name
-     for SVG CSS class and/or the Tk color assignment table.
-    """
-    log.debug(f"Drawing tile key {key} value {value} at {r}")
-    # fill_color and label_color will be used in tk graphics,
-    # and also in SVG graphics ONLY if the user hasn't provided a CSS stylesheet
-    if value and key:
-        label = f"{key}\n{value}"
-    elif value:
-        label = f"{value}"
-    elif key:
-        label = str(key)
-    else:
-        label = ""
-    # For everything else, we need the key normalized
-    key = normalize_key(key)
-    fill_color, label_color = lookup_colors(key)
-    tile = gr.Rectangular(key,
-                          ((r.ll.x, r.ll.y), (r.ur.x, r.ur.y)),
-                          label=label, fill_color=fill_color, label_color=label_color)
-
-    tk.draw_tile(tile)
-    svg.draw_tile(tile)
-
-
-def begin_group(r: geometry.Rect,
-                key: str | None = None,
-                value: str | None = None):
+class RenderContext:
+    """Displays and state of one treemap as it is drawn.
+    options is graphics.display_options or a display_options.Options;
+    by default, a copy of graphics.display_options.  If defaults, each
+    backend draws on the DEFAULT display of its module.
     """
-    Begin a group of tiles. The `key` argument, if present,
-    is normalized to become the class name for SVG CSS and/or
-    the Tk color assignment table.  The (key, value) pair may not
-    be directly visible, but if either `key` or `value` is present
-    it will be displayed as a tooltip in SVG.
-    """
-    global INCLUSION_STACK
-    INCLUSION_STACK.append(key)
-    fill_color, label_color = lookup_colors(key)
-    if value:
-        label = f"{key}: {value}"
-    else:
-        label = f"{key}"
-    key = normalize_key(key)
-    region = gr.Rectangular(key, ((r.ll.x, r.ll.y),(r.ur.x, r.ur.y)),
-                            label=label, fill_color=fill_color, label_color=label_color)
-    # SVG version - create SVG group
-    # Note fill and label colors will be ignored if we have a CSS stylesheet
-    svg.begin_group(region)
-
-def end_group():
-    """Must be matched with begin_group"""
-    # Tk:  Nothing to do
-    # SVG: Ends the SVG group
-    INCLUSION_STACK.pop()
-    svg.end_group()
-
-def svg_content() -> list[str]:
-    """Contents of the SVG representation"""
-    return svg.content()
-
-def wait_close():
-    """Hold display on screen until user indicates finish"""
-    svg.close()
-    tk.wait_close()
+    def __init__(self, options=None, defaults: bool = False):
+        self.options = display_options.snapshot() if options is None else options
+        self.defaults = defaults
+        # Tiles inherit colors from enclosing groups.  For each group
+        # begun, its key and the colors its parts inherit (its own, or
+        # else those it inherited), resolved when it begins.
+        self.inclusion_stack: list[str] = []
+        self.inherited: list[tuple[str, str] | None] = []
+        self.classes: dict[object, str] = {}   # Normalized key of each key, interned
+        self.uncolored: list[str] = []          # Keys given generated colors, for one log line
+        self.derived: dict[object, tuple[str, str]] = {}   # Colors from stable_colors, by key, this render
+        self.displays: dict[str, object] = {}   # By backend name
+        self.active: list = []   # Displays chosen by init, in order
+        # Whether labels fit is decided here, once for all backends:  from a
+        # table of widths, or from one measured by a backend that has it
+        self.table_metrics: text_metrics.TextMetrics = (
+            text_metrics.DEFAULT if defaults else text_metrics.scaled(text_metrics.HELVETICA_WIDTHS))
+        self.metrics = self.table_metrics
+
+    def init(self, width: int, height: int, svg_out: io.TextIOBase | None = None,
+             backends: Sequence[str] = DEFAULT_BACKENDS):
+        self.active = []
+        self.inclusion_stack = []
+        self.inherited = []
+        self.derived = {}
+        for name in backends:
+            backend = self.display(name)
+            if name == "svg" and svg_out is not None:
+                backend.init_stream(svg_out, width, height)
+            else:
+                backend.init(width, height)
+            self.active.append(backend)
+        measured = [backend.metrics for backend in self.active
+                    if getattr(backend, "metrics", None) is not None]
+        self.metrics = measured[0] if measured else self.table_metrics
+
+    def display(self, name: str):
+        """This render's display on the backend registered as name"""
+        if name not in self.displays:
+            module = load_backend(name)
+            self.displays[name] = module.DEFAULT if self.defaults else module.create(self.options)
+        return self.displays[name]
+
+    def draw_tile(self, r: geometry.Rect,
+                  key: object = None,
+                  value: object = None):
+        """Draw the tile (on both media).
+         Displays on Tk (Python built-in graphics) and
+         also writes corresponding graphics into buffer to
+         produce corresponding SVG diagram which can be displayed
+         in a web page, imported into a diagramming tool like
+         Inkscape, OmniGraffle, Illustrator, etc.
+         `key`, if present, is normalized to become the class name
+         for SVG CSS class and/or the Tk color assignment table.
+        """
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(f"Drawing tile key {key} value {value} at {r}")
+        self.draw_box((r.ll.x, r.ll.y, r.ur.x, r.ur.y), key, value)
+
+    def begin_group(self, r: geometry.Rect,
+                    key: str | None = None,
+                    value: str | None = None):
+        """
+        Begin a group of tiles. The `key` argument, if present,
+        is normalized to become the class name for SVG CSS and/or
+        the Tk color assignment table.  The (key, value) pair may not
+        be directly visible, but if either `key` or `value` is present
+        it will be displayed as a tooltip in SVG.
+        """
+        fill_color, label_color = self.lookup_colors(key)
+        enclosing = self.inherited[-1] if self.inherited else None
+        self.inclusion_stack.append(key)
+        # None or "" propagate only colors they inherit or are assigned
+        self.inherited.append((fill_color, label_color)
+                              if key or enclosing is not None or key in self.options.color_scheme
+                              else None)
+        if value:
+            label = f"{key}: {value}"
+        else:
+            label = f"{key}"
+        key = self.normalized(key)
+        region = gr.Rectangular(key, ((r.ll.x, r.ll.y),(r.ur.x, r.ur.y)),
+                                label=label, fill_color=fill_color, label_color=label_color)
+        # Note fill and label colors will be ignored in SVG if we have a CSS stylesheet
+        for backend in self.active:
+            backend.begin_group(region)
+
+    def end_group(self):
+        """Must be matched with begin_group"""
+        self.inclusion_stack.pop()
+        self.inherited.pop()
+        for backend in self.active:
+            backend.end_group()
+
+    def write_svg(self, out: io.TextIOBase):
+        """Write the SVG representation to out"""
+        self.display("svg").write(out)
+
+    def svg_content(self) -> str:
+        """Contents of the SVG representation"""
+        return self.display("svg").content()
+
+    def wait_close(self):
+        """Finish each backend, holding the Tk display on screen
+        until user indicates finish
+        """
+        self.log_uncolored()
+        for backend in reversed(self.active):
+            backend.close()
+
+    def stream_svg(self, records, out, width: int, height: int):
+        """Write SVG for records, an iterable of tiling.Tile and
+        tiling.Group, to the text stream out as they are produced.
+        """
+        svg = self.display("svg")
+        active, self.active = self.active, [svg]
+        self.derived = {}
+        svg.init_stream(out, width, height)
+        try:
+            tiling.render(records, self)
+        finally:
+            svg.close()
+            self.active = active
+        self.log_uncolored()
+
+    def explore(self, drill):
+        """Let the Tk display drill down into the groups of the treemap,
+        drawing the view of each group from drill (a drill_down.DrillDown)
+        on the Tk display alone.  The Tk display calls enter(node, i)
+        for record i of the view of node, which draws the view of that
+        group and returns it with its depth, or returns None if
+        record i is not a group.
+        """
+        tk = self.display("tk")
+
+        def enter(node: int | None, i: int) -> tuple[int, int] | None:
+            group = drill.child(node, i)
+            if group is None:
+                return None
+            active, self.active = self.active, [tk]
+            self.inclusion_stack, self.inherited = [], []
+            try:
+                drill.render(group, self)
+            finally:
+                self.active = active
+            return group, drill.depth(group)
+
+        tk.drill = enter
+
+    # --------------------------------------------------------------
+    #  Internal methods, not part of API
+    # --------------------------------------------------------------
+
+    def draw_box(self, box: tuple[int, int, int, int],
+                 key: object = None,
+                 value: object = None):
+        """Draw a tile given its corners (llx, lly, urx, ury)"""
+        llx, lly, urx, ury = box
+        # fill_color and label_color will be used in tk graphics,
+        # and also in SVG graphics ONLY if the user hasn't provided a CSS stylesheet
+        if value and key:
+            label = f"{key}\n{value}"
+        elif value:
+            label = f"{value}"
+        elif key:
+            label = str(key)
+        else:
+            label = ""
+        # For everything else, we need the key normalized
+        key = self.normalized(key)
+        fill_color, label_color = self.lookup_colors(key)
+        tile = gr.Rectangular(key,
+                              ((llx, lly), (urx, ury)),
+                              label=label, fill_color=fill_color, label_color=label_color,
+                              label_fits=self.metrics.fits(label, urx - llx, ury - lly))
+
+        for backend in self.active:
+            backend.draw_tile(tile)
+
+    def lookup_colors(self, key: str) -> tuple[str, str]:
+        """Finds nearest color for key or enclosing key on inclusion stack."""
+        colors = self.options.color_scheme.get(key)
+        if colors is not None:
+            return colors
+        if self.inherited and self.inherited[-1] is not None:
+            return self.inherited[-1]
+        # Not mapped in any enclosing object.  Generate a color pair.
+        seed = self.options.stable_colors
+        if seed is not None:
+            # Derived from the key alone;  remembered in this context only,
+            # so that each key is derived and reported once
+            colors = self.derived.get(key)
+            if colors is None:
+                self.uncolored.append(str(key))
+                colors = self.derived[key] = color_contrast.key_color(self.normalized(key), seed)
+            return colors
+        self.uncolored.append(str(key))
+        # We memoize a random assignment so we will use the same color if we
+        # encounter the same key again.   Exception:  None or "" don't get an
+        # assigned color.
+        fill, text = color_contrast.next_color()
+        if key:
+            self.options.color_scheme[key] = (fill, text)
+        return fill, text
+
+    def normalized(self, key: object) -> str:
+        """normalize_key(key), computed once for each key"""
+        try:
+            return self.classes[key]
+        except KeyError:
+            normal = self.classes[key] = normalize_key(key)
+            return normal
+        except TypeError:   # Not hashable
+            return normalize_key(key)
+
+    def log_uncolored(self):
+        """Report keys that were given generated colors since last reported"""
+        if not self.uncolored:
+            return
+        keys = ", ".join(self.uncolored[:MAX_LOGGED_KEYS])
+        if len(self.uncolored) > MAX_LOGGED_KEYS:
+            keys += ", ..."
+        assigned = "random" if self.options.stable_colors is None else "derived"
+        log.info(f"Could not find colors for {len(self.uncolored)} keys ({keys}); "
+                 f"{assigned} colors were assigned.")
+        self.uncolored = []
+
+
+def register_backend(name: str, module: str):
+    """Backend module (by its import name) to be used by init as name"""
+    BACKENDS[name] = module
+
+
+# The module API, on a default context
+CONTEXT = RenderContext(display_options, defaults=True)
+
+init = CONTEXT.init
+draw_tile = CONTEXT.draw_tile
+begin_group = CONTEXT.begin_group
+end_group = CONTEXT.end_group
+write_svg = CONTEXT.write_svg
+svg_content = CONTEXT.svg_content
+wait_close = CONTEXT.wait_close
+stream_svg = CONTEXT.stream_svg
+explore = CONTEXT.explore
+draw_box = CONTEXT.draw_box
+lookup_colors = CONTEXT.lookup_colors
 
 
 # --------------------------------------------------------------
 #  Internal functions, not part of API
 # --------------------------------------------------------------
 
-def lookup_colors(key: str) -> tuple[str, str]:
-    """Finds nearest color for key or enclosing key on inclusion stack."""
-    if key in options.color_scheme:
-        return options.color_scheme[key]
-    for enclosing in reversed(INCLUSION_STACK):
-        if enclosing in options.color_scheme:
-            return options.color_scheme[enclosing]
-    # Not mapped in any enclosing object.  Generate a random color pair.
-    # We memoize the assignment for two reasons:  So we can propagate it if
-    # we are coloring a group, and so we will use the same color if we encounter
-    # the same key again.   Exception:  None or "" don't get an assigned color,
-    # and don't propagate to parts.
-    log.info(f"Could not find color for key {key}; a random color will be assigned.")
-    fill, text = color_contrast.next_color()
-    if key:
-        options.color_scheme[key] = (fill, text)
-    return fill, text
+def load_backend(name: str) -> types.ModuleType:
+    """The backend module registered as name, imported if necessary"""
+    assert name in BACKENDS, f"No display backend {name!r}; choices are {list(BACKENDS)}"
+    return importlib.import_module(BACKENDS[name])
 
 
 def normalize_key(key: object) -> str:
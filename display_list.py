@@ -0,0 +1,191 @@
+"""Display lists:  a treemap recorded as the drawing operations of
+its canvas, to be replayed on any display later, in another process or
+on another machine, without the JSON input or its layout.
+
+A DisplayList is a canvas (like display or tiling.TileRecorder) that
+records draw_tile, begin_group and end_group.  Each operation is a
+byte code, with four integer coordinates and two indexes into a table
+of the distinct keys and values for the ones that have them, so that a
+display list is a few arrays and one table however many tiles it has:
+
+    recorder = display_list.DisplayList(width, height)
+    tiling.render(tiling.compute_tiles(values, width, height), recorder)
+    recorder.save("majors.dlist")
+    ...
+    display_list.load("majors.dlist").show(backends=["svg"])
+
+Display lists are saved with marshal, which (unlike pickle) cannot run
+code when read, with arrays in little-endian order so that they can be
+read on a machine of either byte order.  The format of marshal may
+change from one version of Python to the next, so a display list is
+only sure to be read by the same version of Python that saved it.
+Replay from the command line with
+
+    python3 display_list.py majors.dlist --svg majors.svg
+"""
+from array import array
+from collections.abc import Sequence
+import argparse
+import io
+import marshal
+import os
+import pathlib
+import sys
+
+import geometry
+from geometry import Point, Rect
+from graphics.svg_display import open_svg
+
+FORMAT = 1    # Of a saved display list
+
+# Operations
+TILE = 0
+GROUP = 1
+END = 2
+
+
+class DisplayList:
+    """Canvas that records drawing operations on a width x height
+    display, to be replayed on other canvases.
+    """
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.ops = bytearray()
+        self.boxes = array('i')      # x0, y0, x1, y1 of each tile or group
+        self.labels = array('i')     # Indexes of key and value of each tile or group
+        self.atoms: list[object] = [None]       # Distinct keys and values
+        self.atom_index: dict[tuple[type, object], int] = {(type(None), None): 0}
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    def atom(self, x: object) -> int:
+        """Index of x in the table of keys and values.  Keyed by type
+        as well, because 1 and 1.0 (which are displayed differently)
+        are equal.
+        """
+        entry = (type(x), x)
+        index = self.atom_index.get(entry)
+        if index is None:
+            index = self.atom_index[entry] = len(self.atoms)
+            self.atoms.append(x)
+        return index
+
+    def draw_tile(self, r: geometry.Rect, key: object = None, value: object = None):
+        self.ops.append(TILE)
+        self.boxes.extend((r.ll.x, r.ll.y, r.ur.x, r.ur.y))
+        self.labels.extend((self.atom(key), self.atom(value)))
+
+    def begin_group(self, r: geometry.Rect, key: str | None = None, value: object = None):
+        self.ops.append(GROUP)
+        self.boxes.extend((r.ll.x, r.ll.y, r.ur.x, r.ur.y))
+        self.labels.extend((self.atom(key), self.atom(value)))
+
+    def end_group(self):
+        self.ops.append(END)
+
+    def replay(self, canvas):
+        """Draw the recorded operations on canvas, with the same arguments"""
+        atoms = self.atoms
+        draw_tile, begin_group, end_group = canvas.draw_tile, canvas.begin_group, canvas.end_group
+        boxes = iter(self.boxes)
+        labels = iter(self.labels)
+        for op in self.ops:
+            if op == END:
+                end_group()
+                continue
+            rect = Rect(Point(next(boxes), next(boxes)), Point(next(boxes), next(boxes)))
+            key, value = atoms[next(labels)], atoms[next(labels)]
+            if op == GROUP:
+                begin_group(rect, key, value)
+            elif value is None:   # As drawn, e.g., a number as its own label
+                draw_tile(rect, key)
+            else:
+                draw_tile(rect, key, value)
+
+    def show(self, svg_out: io.TextIOBase | None = None,
+             backends: Sequence[str] | None = None):
+        """Replay on the display (with the display backends named),
+        as mapper.show displays a layout.
+        """
+        import display
+        display.init(self.width, self.height, svg_out,
+                     display.DEFAULT_BACKENDS if backends is None else backends)
+        self.replay(display)
+        display.wait_close()
+
+    def dumps(self) -> bytes:
+        return marshal.dumps((FORMAT, self.width, self.height, bytes(self.ops),
+                              little_endian(self.boxes), little_endian(self.labels),
+                              self.atoms))
+
+    def save(self, path: str | os.PathLike):
+        pathlib.Path(path).write_bytes(self.dumps())
+
+
+def little_endian(numbers: array) -> bytes:
+    if sys.byteorder == "big":
+        numbers = array(numbers.typecode, numbers)
+        numbers.byteswap()
+    return numbers.tobytes()
+
+
+def loads(data: bytes) -> DisplayList:
+    """The DisplayList saved as data by DisplayList.dumps.
+    Raises ValueError if data is not a display list.
+    """
+    try:
+        form, width, height, ops, boxes, labels, atoms = marshal.loads(data)
+    except (EOFError, TypeError) as e:
+        raise ValueError(f"Not a display list: {e}") from e
+    if form != FORMAT:
+        raise ValueError(f"Display list format {form}, expected {FORMAT}")
+    if bytes(ops).translate(None, bytes((TILE, GROUP, END))):
+        raise ValueError("Display list has unknown operations")
+    recorded = DisplayList(width, height)
+    recorded.ops = bytearray(ops)
+    recorded.boxes.frombytes(boxes)
+    recorded.labels.frombytes(labels)
+    if sys.byteorder == "big":
+        recorded.boxes.byteswap()
+        recorded.labels.byteswap()
+    drawn = len(recorded.ops) - recorded.ops.count(END)
+    if len(recorded.boxes) != 4 * drawn or len(recorded.labels) != 2 * drawn:
+        raise ValueError("Display list is truncated")
+    if recorded.labels and not 0 <= min(recorded.labels) <= max(recorded.labels) < len(atoms):
+        raise ValueError("Display list has labels out of range")
+    try:
+        recorded.atom_index = {(type(x), x): i for i, x in enumerate(atoms)}
+    except TypeError as e:   # An atom that is not hashable, e.g., a list
+        raise ValueError(f"Display list has a key or value that is not an atom: {e}") from e
+    recorded.atoms = atoms
+    return recorded
+
+
+def load(path: str | os.PathLike) -> DisplayList:
+    return loads(pathlib.Path(path).read_bytes())
+
+
+def main():
+    """Replay a saved display list on the display and in SVG."""
+    import display
+    parser = argparse.ArgumentParser("Replay a treemap saved with treemap.py --record")
+    parser.add_argument("recorded", help="Display list file", type=pathlib.Path)
+    parser.add_argument("--svg", help="Path to SVG file, compressed if it ends in .svgz",
+                        default="treemap.svg", type=pathlib.Path)
+    parser.add_argument("-b", "--backend", help="Display backend, may be repeated (default tk and svg)",
+                        choices=list(display.BACKENDS), action="append", dest="backends")
+    args = parser.parse_args()
+    recorded = load(args.recorded)
+    backends = args.backends or list(display.DEFAULT_BACKENDS)
+    if "svg" not in backends:
+        recorded.show(backends=backends)
+        return
+    with open_svg(args.svg) as svg_out:
+        recorded.show(svg_out, backends)
+    print(f"SVG output written to {args.svg.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
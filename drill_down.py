@@ -0,0 +1,147 @@
+"""Drill-down views of a treemap:  any group of the tree laid out to
+fill the whole canvas, for a viewer that zooms into a group and back
+out again (see the interactive mode of graphics/tk_display.py).
+
+The records of the view of a group begin with a Group record for each
+group enclosing it, each covering the whole canvas, so that a display
+colors the tiles of the view as they were colored in the whole
+treemap, and the tile under a point is found with all of its groups.
+
+A group is laid out when it is first visited (or its layout is loaded
+from a layout_cache.LayoutCache), and the layouts of the most recently
+visited groups are kept in a least-recently-used cache of CAPACITY
+views, so that going back to a group seen lately needs no layout.
+
+The group under a point of a view is identified by its position in the
+records of the view.  Its node in the tree is found by descending
+through the arrangements of the viewed group (tiling.ARRANGEMENTS),
+which place its parts in the order of the records, so that sibling
+groups with the same label and value are told apart.
+"""
+from collections import OrderedDict
+
+import geometry
+import tiling
+import weighted_tree
+from splitter import Nest
+from tiling import Tile, Group
+from weighted_tree import WeightedTree, LEAF, GROUP, NO_CHILD
+
+CAPACITY = 16   # Layouts kept
+
+
+class DrillDown:
+    """Views of the groups of values, each laid out in width x height.
+    The view of the whole tree may be given as records, e.g., from
+    tiling.compute_tiles.
+    """
+    def __init__(self, values: Nest | WeightedTree, width: int, height: int,
+                 algorithm: str = "bisect", records: list[Tile | Group] | None = None,
+                 cache=None, capacity: int = CAPACITY):
+        self.tree = weighted_tree.as_tree(values)
+        self.width = width
+        self.height = height
+        self.algorithm = algorithm
+        self.cache = cache          # A layout_cache.LayoutCache, or None
+        self.capacity = capacity
+        self.parents = self.tree.parents()
+        self.layouts: OrderedDict[int, list[Tile | Group]] = OrderedDict()   # Least recent first
+        self.groups: dict[int, list[int]] = {}   # Node of each record of a layout, if a group
+        if records is not None:
+            self.remember(self.tree.root, records)
+
+    def records(self, node: int | None = None) -> list[Tile | Group]:
+        """Records of the view of node (by default, the whole tree)"""
+        if node is None:
+            node = self.tree.root
+        records = self.layouts.get(node)
+        if records is None:
+            records = self.lay_out(node)
+            self.remember(node, records)
+        else:
+            self.layouts.move_to_end(node)
+        return records
+
+    def remember(self, node: int, records: list[Tile | Group]):
+        self.layouts[node] = records
+        self.groups.pop(node, None)
+        while len(self.layouts) > self.capacity:
+            evicted, _ = self.layouts.popitem(last=False)
+            self.groups.pop(evicted, None)
+
+    def enclosing(self, node: int) -> list[int]:
+        """Groups enclosing node, outermost first"""
+        tree, parents = self.tree, self.parents
+        groups = []
+        parent = parents[node]
+        while parent != NO_CHILD:
+            if tree.kinds[parent] == GROUP:
+                groups.append(parent)
+            parent = parents[parent]
+        groups.reverse()
+        return groups
+
+    def depth(self, node: int | None = None) -> int:
+        """Number of groups that fill the view of node, including node itself"""
+        if node is None or node == self.tree.root:
+            return 0
+        return len(self.enclosing(node)) + 1
+
+    def lay_out(self, node: int) -> list[Tile | Group]:
+        tree = self.tree
+        records = tiling.compute_tiles(tree if node == tree.root else tree.subtree(node),
+                                       self.width, self.height, self.algorithm, cache=self.cache)
+        if node == tree.root:
+            return records
+        outer = self.enclosing(node)
+        labels = tuple(tree.labels[group] for group in outer)
+        view: list[Tile | Group] = [Group(tree.labels[group], tree.weights[group], depth,
+                                          0, 0, self.width, self.height, labels[:depth])
+                                    for depth, group in enumerate(outer)]
+        base = len(outer)
+        for record in records:
+            view.append(record._replace(depth=record.depth + base, group=labels + record.group))
+        return view
+
+    def child(self, node: int | None, i: int) -> int | None:
+        """The group of record i of the view of node, or None if it
+        is not a group
+        """
+        if node is None:
+            node = self.tree.root
+        records = self.records(node)
+        groups = self.groups.get(node)
+        if groups is None:
+            groups = self.groups[node] = self.enclosing(node) + group_nodes(
+                self.tree, node, self.width, self.height, self.algorithm)
+        return None if groups[i] == NO_CHILD else groups[i]
+
+    def render(self, node: int | None, canvas):
+        """Draw the view of node on canvas"""
+        tiling.render(self.records(node), canvas)
+
+
+def group_nodes(tree: WeightedTree, node: int, width: int, height: int,
+                algorithm: str = "bisect") -> list[int]:
+    """For each record of the layout of node in width x height, in
+    drawing order, its node if it is a Group and NO_CHILD if it is a
+    Tile.  Replays the arrangements of the layout, as tiling.iter_tiles
+    does, without making records.
+    """
+    arrange = tiling.ARRANGEMENTS[algorithm]
+    kinds = tree.kinds
+    area = geometry.Rect(geometry.Point(0, 0), geometry.Point(width, height))
+    nodes = []
+    levels = [iter([(node, area)])]   # Parts of each open group or list still to place
+    while levels:
+        for part, rect in levels[-1]:
+            if kinds[part] == LEAF:
+                nodes.append(NO_CHILD)
+                continue
+            if kinds[part] == GROUP:
+                nodes.append(part)
+            levels.append(iter(arrange(tree, part, rect)))
+            break   # Descend, then continue with the rest of the parts
+        else:
+            levels.pop()
+    return nodes
@@ -1,9 +1,15 @@
-"""Command-line driver for nest_sort.py, sorts a JSON-encoded items."""
+"""Command-line driver for nest_sort.py, sorts a JSON-encoded items.
+    python3 extensions/json_nest_sort.py in.json out.json
+"""
 
 import argparse
 import json
+import pathlib
 import sys
 
+# As a script, only this directory is on the module path;  nest_sort
+# also needs the project's modules, one directory up
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
 import nest_sort
 
 def main():
@@ -5,10 +5,16 @@ A items may be
     - a tuple (name, items) (base case, already in order; note this appears when decomposing dicts)
     - a real number (base case, already in order)
 
-There is a fair amount of repeated code here from mapper.py. Factoring it out would be a good student project.
+Weights come from the project's canonical weighted_tree.WeightedTree, built
+in one pass, so no part of the nest is summed more than once.  Sort a
+JSON file with json_nest_sort.py;  run the doctests from the project root,
+with it on the module path:
+    PYTHONPATH=. python3 extensions/nest_sort.py
 """
 import doctest
 
+from weighted_tree import WeightedTree
+
 Real = int | float    # Named type for use in type annotations
 Nest = Real | list['Nest'] | dict[ str, 'Nest'] | tuple[str, 'Nest']
 
@@ -26,18 +32,8 @@ def deep_sum(nest: Nest) -> Real:
     >>> deep_sum({ "Cake": { "Chocolate": 10, "Carrot": 4 }, "Ice Cream": 15 })
     29
     """
-    if isinstance(nest, dict):
-        nest = list(nest.items())
-
-    if isinstance(nest, Real):
-        return nest
-    elif isinstance(nest, list):
-        return sum(deep_sum(item) for item in nest)
-    elif isinstance(nest, tuple):
-        label, value = nest
-        return deep_sum(value)
-    else:
-        assert False, f"Unanticipated type in deep_sum: {nest}"
+    tree = WeightedTree.from_nest(nest)
+    return tree.weights[tree.root]
 
 
 def ordered(nest: Nest) -> Nest:
@@ -51,26 +47,37 @@ def ordered(nest: Nest) -> Nest:
     >>> ordered([[1.0, 2.0], [3, 4]])
     [[4, 3], [2.0, 1.0]]
     >>> ordered({ "Cake": { "Chocolate": 4, "Carrot": 10 }, "Ice Cream": 15 })
-    {'Ice Cream': 15, 'Cake': { 'Carrot': 10, 'Chocolate': 4 }}
+    {'Ice Cream': 15, 'Cake': {'Carrot': 10, 'Chocolate': 4}}
+    >>> ordered([("Pie", [2, 5]), 10])
+    [10, ('Pie', [2, 5])]
     """
+    tree = WeightedTree.from_nest(nest)
+    return ordered_node(tree, tree.root, nest)
+
+
+def ordered_node(tree: WeightedTree, node: int, nest: Nest) -> Nest:
+    """Reorder nest, which is node of tree, by the weights of its parts"""
     # Base cases: Already in order
     if isinstance(nest, Real) or isinstance(nest, tuple):
         return nest
 
+    weights = tree.weights
     if isinstance(nest, list):
-        elements = [ordered(el) for el in nest]
-        return sorted(elements, key= lambda el: deep_sum(el), reverse=True)
+        elements = [(ordered_node(tree, child, el), weights[child])
+                    for (child, el) in zip(tree.child_nodes(node), nest)]
+        return [el for (el, _) in sorted(elements, key=lambda pair: pair[1], reverse=True)]
 
     if isinstance(nest, dict):
         # Reorder each element
-        pairs = ((k, ordered(v)) for (k, v) in nest.items())
+        pairs = ((k, ordered_node(tree, child, v), weights[child])
+                 for (child, (k, v)) in zip(tree.child_nodes(node), nest.items()))
         # Build dict from sorted list of reordered k, v pairs
-        in_order = sorted(pairs, key=lambda pair: deep_sum(pair[1]), reverse=True)
-        return { k: v for (k, v) in in_order }
+        in_order = sorted(pairs, key=lambda triple: triple[2], reverse=True)
+        return { k: v for (k, v, _) in in_order }
 
     # Should be exhaustive if items is well-formed
-    assert False, f"Unanticipated type in deep_sum: {nest}"
+    assert False, f"Unanticipated type in ordered: {nest}"
 
 
 if __name__ == '__main__':
-    doctest.testmod()
\ No newline at end of file
+    doctest.testmod()
@@ -1,10 +1,20 @@
-"""Integer geometry (points and rectangles) for tree mapping."""
+"""Integer geometry (points and rectangles) for tree mapping.
+
+Points and rectangles are created for every tile, so they are kept
+compact, with __slots__ rather than a __dict__ per object.  A RectArray
+holds many rectangles in columns of machine integers, without an
+object per rectangle.
+"""
+from array import array
+from collections.abc import Iterator, Sequence
 import logging
 logging.basicConfig()
 log = logging.getLogger(__name__)
 log.setLevel(logging.INFO)
 
 class Point:
+    __slots__ = ("x", "y")
+
     def __init__(self, x: int, y: int):
         self.x = x
         self.y = y
@@ -26,6 +36,8 @@ class Point:
 
 class Rect:
     """Rectangle with integer coordinates defined by lower left and upper right corners"""
+    __slots__ = ("ll", "ur")
+
     def __init__(self, lower_left: Point, upper_right: Point):
         self.ll = lower_left
         self.ur = upper_right
@@ -48,17 +60,85 @@ class Rect:
             frac_height = int(self.height() * fraction)
             bottom = Rect(self.ll, Point(self.ur.x, self.ll.y + frac_height))
             top = Rect(Point(self.ll.x, self.ll.y + frac_height), self.ur)
-            log.debug(f"Splitting {self} vertically into {bottom}, {top}")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug(f"Splitting {self} vertically into {bottom}, {top}")
             return bottom, top
         else:
             frac_width = int(self.width() * fraction)
             left = Rect(self.ll, Point(self.ll.x + frac_width, self.ur.y))
             right = Rect(Point(self.ll.x + frac_width, self.ll.y), self.ur)
-            log.debug(f"Splitting {self} horizontally into {left}, {right}")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug(f"Splitting {self} horizontally into {left}, {right}")
             return left, right
 
-
-
-
-
-
+    def strips(self, weights: Sequence[int | float], along_x: bool | None = None) -> "RectArray":
+        """Split this rectangle into len(weights) strips side by side,
+        each with a share of it proportional to its weight, in a single
+        call.  Strips lie side by side in the x direction (along_x) or
+        the y direction, by default across the longer side as in split.
+        Cuts are rounded from cumulative weights, so rounding error
+        does not accumulate from strip to strip.
+
+        >>> for strip in Rect(Point(0, 0), Point(10, 4)).strips([1, 2, 2]):
+        ...     print(strip)
+        Rect((0, 0), (2, 4))
+        Rect((2, 0), (6, 4))
+        Rect((6, 0), (10, 4))
+        """
+        if along_x is None:
+            along_x = not self.height() > self.width()
+        (llx, lly), (urx, ury) = (self.ll.x, self.ll.y), (self.ur.x, self.ur.y)
+        low, length = (llx, urx - llx) if along_x else (lly, ury - lly)
+        total = sum(weights)
+        assert total > 0, f"Cannot divide {self} by weights totaling {total}"
+        cuts = array('i', [low])
+        cumulative = 0
+        for weight in weights:
+            cumulative += weight
+            cuts.append(low + int(length * (cumulative / total)))
+        cuts[-1] = low + length   # Exactly, whatever the rounding
+        n = len(weights)
+        if along_x:
+            return RectArray(cuts[:-1], array('i', [lly]) * n, cuts[1:], array('i', [ury]) * n)
+        return RectArray(array('i', [llx]) * n, cuts[:-1], array('i', [urx]) * n, cuts[1:])
+
+
+class RectArray:
+    """Many rectangles, as four parallel columns of corner coordinates.
+    Indexing or iterating produces Rect objects;  boxes() produces
+    (llx, lly, urx, ury) tuples, as accepted by display.draw_box.
+    """
+    __slots__ = ("llx", "lly", "urx", "ury")
+
+    def __init__(self, llx: array | None = None, lly: array | None = None,
+                 urx: array | None = None, ury: array | None = None):
+        self.llx = llx if llx is not None else array('i')
+        self.lly = lly if lly is not None else array('i')
+        self.urx = urx if urx is not None else array('i')
+        self.ury = ury if ury is not None else array('i')
+        assert len(self.llx) == len(self.lly) == len(self.urx) == len(self.ury)
+
+    def __len__(self) -> int:
+        return len(self.llx)
+
+    def __getitem__(self, i: int) -> Rect:
+        return Rect(Point(self.llx[i], self.lly[i]), Point(self.urx[i], self.ury[i]))
+
+    def __iter__(self) -> Iterator[Rect]:
+        for llx, lly, urx, ury in self.boxes():
+            yield Rect(Point(llx, lly), Point(urx, ury))
+
+    def boxes(self) -> Iterator[tuple[int, int, int, int]]:
+        return zip(self.llx, self.lly, self.urx, self.ury)
+
+    def append(self, r: Rect):
+        self.llx.append(r.ll.x)
+        self.lly.append(r.ll.y)
+        self.urx.append(r.ur.x)
+        self.ury.append(r.ur.y)
+
+    def extend(self, other: "RectArray"):
+        self.llx.extend(other.llx)
+        self.lly.extend(other.lly)
+        self.urx.extend(other.urx)
+        self.ury.extend(other.ury)
@@ -18,4 +18,28 @@ if options.prop_name:
 color_scheme: dict[str, tuple[str, str]] = {}    # Maps class name to (fill, text) color pair
 css: str | None = None
 messy: bool = False
+compact: bool = False   # Smaller SVG:  less whitespace, more CSS, fewer tool tips
+stable_colors: str | None = None   # Seed of colors derived from keys;  if None, random colors
+progressive: bool = False   # Tk:  largest tiles first, in batches while the window handles events
+interactive: bool = False   # Tk:  click to identify tiles, drag to pan, scroll to zoom
 
+
+class Options:
+    """The options above, for one render (see display.RenderContext)"""
+    def __init__(self, color_scheme: dict[str, tuple[str, str]] | None = None,
+                 css: list[str] | None = None, messy: bool = False, compact: bool = False,
+                 stable_colors: str | None = None, progressive: bool = False,
+                 interactive: bool = False):
+        self.color_scheme = {} if color_scheme is None else color_scheme
+        self.css = css
+        self.messy = messy
+        self.compact = compact
+        self.stable_colors = stable_colors
+        self.progressive = progressive
+        self.interactive = interactive
+
+
+def snapshot() -> Options:
+    """A copy of the current options, which later changes do not affect"""
+    return Options(dict(color_scheme), list(css) if css else css, messy, compact, stable_colors,
+                   progressive, interactive)
@@ -8,13 +8,16 @@ class Rectangular:
                  box: tuple[tuple[int, int], tuple[int, int]], # (llx, lly), (urx, ury)
                  # Textual label
                  label: str,
-                 fill_color: str, label_color: str):
+                 fill_color: str, label_color: str,
+                 # Is the label shown, if decided once for all media (see text_metrics)?
+                 label_fits: bool | None = None):
 
         self.key = key
         self.box = box
         self.label = label
         self.fill_color = fill_color
         self.label_color = label_color
+        self.label_fits = label_fits
 
 
 
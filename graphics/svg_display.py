@@ -1,10 +1,12 @@
 """SVG display of Treemap"""
+from collections.abc import Callable
+import gzip        # For .svgz output
 import io
-import sys
+import os
 
 
 from .gr_display import Rectangular
-from .tk_display import LINE_HEIGHT_APPROX  #FIXME: factor out of sibling module
+from .text_metrics import region_fits
 from . import display_options
 
 import logging
@@ -20,10 +22,30 @@ log.setLevel(logging.DEBUG)
 #   - CSS epilogue
 #   - SVG entries buffer, which we build up incrementally with 1-1 correspondence to CSS entries
 #   - SVG epilogue
+#
+# Alternatively, with init_stream, the SVG is written to a file as it is
+# produced:  the header and CSS parts at once, then SVG entries one at a
+# time, and finally the CSS rules generated along the way (each only
+# once) in a second style sheet, which applies to the whole document.
+#
+# Either way, output goes through an SvgWriter, which collects small
+# pieces of text and passes them to the file in large writes.  The whole
+# document is never assembled as one string, except by content().
+#
+# The state of each document is kept in an SvgDisplay, so that several
+# can be drawn at once (e.g., in threads, each with its own
+# display.RenderContext).  The module functions init, draw_tile, etc.
+# draw on a default SvgDisplay.
+#
+# With display_options.compact, the same document is written in fewer
+# bytes:  no indentation or line breaks, classes and colors only on the
+# <g> of each tile (which its <rect> and <text> inherit), corner radii
+# and label fonts in the style sheet rather than on each element, and no
+# <title> tool tip for a tile whose label is visible.
 
 MARGIN = 3
+SVGZ_LEVEL = 6   # gzip level of .svgz output;  9 is 4 times slower for 7% less
 
-SVG_HEAD = "uninitialized"  # Set in 'init' with height and width
 CSS_PROLOGUE = """"
    <defs>
    <style>
@@ -37,172 +59,364 @@ CSS_PROLOGUE = """"
     .group_outline { stroke: grey; fill: white; stroke-width: 2; }
     .group_outline:hover { stroke: red; fill: red; stroke-width: 20; }
 """
-CSS_BUFFER: list[str] = []
 CSS_EPILOGUE   = """
    </style>
    </defs>
 """
-SVG_BUFFER: list[str] = []
 SVG_EPILOGUE = "\n</svg>"
 
+COMPACT_CSS_PROLOGUE = (
+    "<defs><style>"
+    "g>rect{rx:10px}"
+    ".group>rect{rx:5px;stroke:grey;fill:white;stroke-width:2px}"
+    ".group>rect:hover{stroke:red;fill:red;stroke-width:20px}"
+    "text{text-anchor:middle;font-family:Helvetica,Arial,sans-serif;"
+    "font-size:12pt;white-space:pre-wrap}")
+COMPACT_CSS_EPILOGUE = "</style></defs>"
 
-WIDTH = 0
-HEIGHT = 0
-IS_STYLED = False  # Is there a user-supplied CSS file, or do we need to randomly generate colors?
 
+BUFFER_SIZE = 1 << 16   # Characters of SVG collected before each write
 
-def init(width: int, height: int, svg_path: str = None):
-    """We keep SVG commands in a buffer, to be written
-    at the end of execution.
-    """
-    global SVG_HEAD
-    global SVG_BUFFER
-    global CSS_BUFFER
-    global WIDTH
-    global HEIGHT
-    global IS_STYLED
-    WIDTH, HEIGHT = width, height
-    if not svg_path:
-        svg_path = "treemap.svg"
-    try:
-        SVG_OUT = open(svg_path, "w")
-        log.info(f"SVG figure will be written to {svg_path}")
-    except FileNotFoundError:
-        log.error(f"Could not open SVG file {svg_path}")
-        sys.exit(1)
-
-    SVG_HEAD = f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}">'
-    if display_options.css:
-            IS_STYLED = True
-            CSS_BUFFER += display_options.css
-
-
-def xml_escape(s: str) -> str:
-    """"Escape XML special characters as XML entities"""
-    return ((s.replace("&", "&amp;").
-            replace("<", "&lt;")).
-            replace(">", "&gt;").
-            replace('"', '&quot;'))
 
-LBRACE = "{"
-RBRACE = "}"
-
-def draw_tile(r: Rectangular):
-    """Generate display directions for a tile in SVG rendering.
-    Includes labeling the rectangle, in text or as a tool-tip.
+class SvgWriter:
+    """Writes text to a stream (a file, sys.stdout, io.StringIO, ...)
+    in pieces of about BUFFER_SIZE characters rather than one small
+    write per element.
+    """
+    def __init__(self, out: io.TextIOBase, size: int = BUFFER_SIZE):
+        self.out = out
+        self.size = size
+        self.pending: list[str] = []
+        self.pending_size = 0
+
+    def write(self, text: str):
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size >= self.size:
+            self.flush()
+
+    def write_lines(self, lines: list[str]):
+        """Write lines separated (not followed) by newlines"""
+        for i, line in enumerate(lines):
+            if i:
+                self.write("\n")
+            self.write(line)
+
+    def flush(self):
+        if self.pending:
+            self.out.write("".join(self.pending))
+            self.pending.clear()
+            self.pending_size = 0
+
+
+class CssRegistry:
+    """CSS rules for the colors of tiles, when no style sheet is given.
+    Each distinct pair of fill and label colors gets one pair of rules,
+    for a class named after the group whose color tiles inherit, or
+    else after the first key drawn in those colors.  The style sheet
+    therefore grows with the number of distinct colors (at most one per
+    key and group), not the number of tiles.  New rules are passed to
+    emit_css.
     """
-    ((llx, lly), (urx, ury)) = r.box
-    width = max(1, (urx - llx - 2 * MARGIN))
-    height = max(1, (ury - lly - 2 * MARGIN))
-    key = xml_escape(r.key)
-    SVG_BUFFER.append(
-        f"""\n<g class="{key}"><rect x="{llx + MARGIN}" y="{lly + MARGIN}" 
+    def __init__(self, emit_css: Callable[[str], None], compact: bool = False):
+        self.emit_css = emit_css
+        self.compact = compact
+        self.classes: dict[tuple[str, str], str] = {}   # (fill, label color) -> class
+        self.names: set[str] = set()
+        self.groups: dict[tuple[str, str], str] = {}    # Colors of groups, by key
+
+    def group_colors(self, key: str, fill_color: str, label_color: str):
+        """Name colors after a group, if no tile has used them yet"""
+        self.groups.setdefault((fill_color, label_color), key)
+
+    def color_class(self, key: str, fill_color: str, label_color: str) -> str:
+        """The class giving a tile its colors, adding its rules if new"""
+        colors = (fill_color, label_color)
+        name = self.classes.get(colors)
+        if name is not None:
+            return name
+        name = self.groups.get(colors, key)
+        serial = len(self.names)
+        while name in self.names:   # Key already names other colors
+            name = f"color_{serial}"
+            serial += 1
+        self.classes[colors] = name
+        self.names.add(name)
+        if self.compact:   # Labels are <text> children of the tile's <g>
+            self.emit_css(f".{name}{LBRACE}fill:{fill_color}{RBRACE}"
+                          f".{name}>text{LBRACE}fill:{label_color}{RBRACE}")
+        else:
+            self.emit_css(f""".{name}  {LBRACE} fill: {fill_color}; {RBRACE}""")
+            self.emit_css(f"""text.{name} {LBRACE} fill: {label_color}; {RBRACE}""")
+        return name
+
+
+class SvgDisplay:
+    """The SVG representation of one treemap, as it is drawn.
+    Options (css, messy, compact) are taken from options, which is
+    graphics.display_options or a display_options.Options, when
+    init or init_stream begins the document.
+    """
+    def __init__(self, options=display_options):
+        self.options = options
+        self.svg_head = "uninitialized"   # Set in 'init' with height and width
+        self.css_buffer: list[str] = []
+        self.svg_buffer: list[str] = []
+        self.width = 0
+        self.height = 0
+        self.is_styled = False   # Is there a user-supplied CSS file, or do we need to randomly generate colors?
+        self.messy = False
+        self.compact = False
+        self.separator = "\n"    # Between SVG entries;  nothing if compact
+        self.writer: SvgWriter | None = None   # If SVG is written as it is produced
+        self.stream_css: list[str] = []        # CSS rules generated while streaming
+        self.css_rules = CssRegistry(self.emit_css)
+
+    def begin(self, width: int, height: int):
+        """Start a new document"""
+        options = self.options
+        self.width, self.height = width, height
+        self.is_styled = bool(options.css)
+        self.messy = options.messy
+        self.compact = options.compact
+        self.separator = "" if self.compact else "\n"
+        self.css_rules = CssRegistry(self.emit_css, self.compact)
+
+    def init(self, width: int, height: int):
+        """We keep SVG commands in a buffer, to be written
+        at the end of execution.
+        """
+        self.begin(width, height)
+        self.svg_head = svg_head(width, height)
+        self.svg_buffer = []
+        self.css_buffer = list(self.options.css) if self.is_styled else []
+
+    def init_stream(self, out: io.TextIOBase, width: int, height: int):
+        """Write SVG to out as it is produced, rather than keeping it
+        in buffers for content().  Ended by close().
+        """
+        self.begin(width, height)
+        self.writer = SvgWriter(out)
+        self.stream_css = []
+        self.writer.write(svg_head(width, height))
+        self.write_styles(self.writer, self.options.css if self.is_styled else [])
+
+    def write_styles(self, writer: SvgWriter, rules: list[str]):
+        """The style sheet at the head of the document, with rules"""
+        if self.compact:
+            writer.write(COMPACT_CSS_PROLOGUE)
+            writer.write_lines([rule.strip() for rule in rules])
+            writer.write(COMPACT_CSS_EPILOGUE)
+        else:
+            writer.write(CSS_PROLOGUE)
+            writer.write_lines(rules)
+            writer.write(CSS_EPILOGUE)
+
+    def emit(self, fragment: str):
+        """Add an SVG entry"""
+        if self.writer is None:
+            self.svg_buffer.append(fragment)
+        else:
+            self.writer.write(self.separator)
+            self.writer.write(fragment)
+
+    def emit_css(self, rule: str):
+        """Add a generated CSS rule"""
+        if self.writer is None:
+            self.css_buffer.append(rule)
+        else:
+            self.stream_css.append(rule)
+
+    def draw_tile(self, r: Rectangular):
+        """Generate display directions for a tile in SVG rendering.
+        Includes labeling the rectangle, in text or as a tool-tip.
+        """
+        ((llx, lly), (urx, ury)) = r.box
+        width = max(1, (urx - llx - 2 * MARGIN))
+        height = max(1, (ury - lly - 2 * MARGIN))
+        key = xml_escape(r.key)
+        classes = key
+        # If we haven't been given a custom CSS file, we'll fill in colors
+        # that match the Tk rendering (which currently are randomly generated)
+        if not self.is_styled:
+            color_class = self.css_rules.color_class(key, r.fill_color, r.label_color)
+            if color_class != key:
+                classes = f"{key} {color_class}"
+        if self.compact:
+            self.compact_tile(r, llx + MARGIN, lly + MARGIN, width, height, classes)
+            return
+        self.emit(
+            f"""\n<g class="{key}"><rect x="{llx + MARGIN}" y="{lly + MARGIN}" 
          width="{width}"  height="{height}"
          rx="10"  
-         class="tile {key}" />
+         class="tile {classes}" />
       """)
-    if r.label:
-        # Label is associated with group that wraps rect, so that
-        # it can be rendered as either <title> or <text> depending
-        # on available space
-        draw_label(r)
-    # If we haven't been given a custom CSS file, we'll fill in colors
-    # that match the Tk rendering (which currently are randomly generated)
-    if not IS_STYLED:
-        CSS_BUFFER.append(f""".{key}  {LBRACE} fill: {r.fill_color}; {RBRACE}""")
-        CSS_BUFFER.append(f"""text.{key} {LBRACE} fill: {r.label_color}; {RBRACE}""")
-    SVG_BUFFER.append("</g>")
-
-
-
-
-def begin_group(r: Rectangular):
-    ((llx, lly), (urx, ury)) = r.box
-    width = max(1, (urx - llx - 2 * MARGIN))
-    height = max(1, (ury - lly - 2 * MARGIN))
-    SVG_BUFFER.append(
-        f"""<g class="group {r.key}">
+        if r.label:
+            # Label is associated with group that wraps rect, so that
+            # it can be rendered as either <title> or <text> depending
+            # on available space
+            self.draw_label(r, classes)
+        self.emit("</g>")
+
+    def compact_tile(self, r: Rectangular, x: int, y: int, width: int, height: int,
+                     classes: str):
+        """draw_tile in compact form:  the rect and text inherit classes
+        from their <g>, and the label is a tool tip only if it is not shown.
+        """
+        if not r.label:
+            self.emit(f'<g class="{classes}"><rect x="{x}" y="{y}" width="{width}" height="{height}"/></g>')
+            return
+        ((llx, lly), (urx, ury)) = r.box
+        label = xml_escape(r.label)
+        if self.messy or region_fits(r):
+            center_x = (urx + llx) // 2
+            center_y = (lly + ury) // 2
+            first, *more = label.split('\n')
+            label = first + "".join(f'<tspan x="{center_x}" dy="1.2em">{line}</tspan>'
+                                    for line in more)
+            # A style sheet may select labels by class, e.g., text.fungi
+            text_class = f' class="tile_label {classes}"' if self.is_styled else ""
+            text = f'<text x="{center_x}" y="{center_y}"{text_class}>{label}</text>'
+        else:
+            text = f"<title>{label.replace(chr(10), ' – ')}</title>"
+        self.emit(f'<g class="{classes}"><rect x="{x}" y="{y}" width="{width}" height="{height}"/>'
+                  f'{text}</g>')
+
+    def begin_group(self, r: Rectangular):
+        ((llx, lly), (urx, ury)) = r.box
+        if not self.is_styled and r.fill_color:
+            self.css_rules.group_colors(xml_escape(r.key), r.fill_color, r.label_color)
+        width = max(1, (urx - llx - 2 * MARGIN))
+        height = max(1, (ury - lly - 2 * MARGIN))
+        if self.compact:
+            self.emit(f'<g class="group {r.key}"><rect x="{llx + MARGIN}" y="{lly + MARGIN}"'
+                      f' width="{width}" height="{height}"/><title>{xml_escape(r.label)}</title>')
+            return
+        self.emit(
+            f"""<g class="group {r.key}">
             <rect x="{llx + MARGIN}" y="{lly + MARGIN}" 
             width="{width}"  height="{height}"
             rx="5"  
             class="group_outline" />
         <title>{r.label}</title> 
         """
-    )
-
-def end_group():
-    SVG_BUFFER.append("\n</g>")
+        )
 
+    def end_group(self):
+        self.emit("</g>" if self.compact else "\n</g>")
 
-
-CHAR_WIDTH_APPROX = 13  # Rough approximation of average character width in pixels
-LINE_HEIGHT_APPROX = 17
-
-def text_width_roughly(label: str) -> int:
-    """Approximate width of a string in pixels, based on
-    rendering in a 12pt font.  Very rough since real width
-    depends on font, screen resolution, width of individual
-    characters, etc.  Just a "better than nothing" guess.
-    """
-    lines = label.split()  # Guess at LONGEST line
-    longest = 0
-    for line in lines:
-        longest = max(longest, len(line) * CHAR_WIDTH_APPROX)
-    return longest
-
-def label_fits(label: str, llx: int, lly: int, urx: int, ury: int) -> bool:
-    """Does this label fit in the screen area (probably)?
-    We can't measure it directly (e.g., we don't know the typeface and size),
-    so we make a very rough guess based on typical character width and line height.
-    """
-    width = text_width_roughly(label)
-    if width > (urx - llx):
-        return False
-    if len(label.split()) * LINE_HEIGHT_APPROX > ury - lly:
-        return False
-    return True
-
-
-def draw_label(r):
-    """Generate display directions for a label in SVG rendering.
-    May be rendered as <text> or <title> depending on available space, so
-    make sure there is an element (e.g., a <g>...</g>) to attach the
-    title to.
-    """
-    ((llx, lly), (urx, ury)) = r.box
-    center_x = (urx + llx) // 2
-    center_y = (lly + ury) // 2
-
-    # If a label contains special HTML/XML characters, they must be escaped,
-    # and newlines should break the text into parts
-    label = xml_escape(r.label)
-    key = xml_escape(r.key)
-
-    # Let's make a title element (tool tip) regardless
-    # (even when it duplicates the label)
-
-    # "Title" element works as a tool-tip
-    title = label.replace('\n', ' – ')
-    SVG_BUFFER.append(f"""<title>{title}</title>""")
-
-    # Also a label in the rectangle if it fits
-    if display_options.messy or label_fits(label, llx, lly, urx, ury):
-        label = label.replace('\n', f'</tspan><tspan x="{center_x}" dy="1.2em">')
-        SVG_BUFFER.append(
-            f"""<text x="{center_x}"  y="{center_y}" class="tile_label {key}">
+    def draw_label(self, r: Rectangular, classes: str | None = None):
+        """Generate display directions for a label in SVG rendering.
+        May be rendered as <text> or <title> depending on available space, so
+        make sure there is an element (e.g., a <g>...</g>) to attach the
+        title to.  classes (by default the key) style the text.
+        """
+        ((llx, lly), (urx, ury)) = r.box
+        center_x = (urx + llx) // 2
+        center_y = (lly + ury) // 2
+
+        # If a label contains special HTML/XML characters, they must be escaped,
+        # and newlines should break the text into parts
+        label = xml_escape(r.label)
+        if classes is None:
+            classes = xml_escape(r.key)
+
+        # Let's make a title element (tool tip) regardless
+        # (even when it duplicates the label)
+
+        # "Title" element works as a tool-tip
+        title = label.replace('\n', ' – ')
+        self.emit(f"""<title>{title}</title>""")
+
+        # Also a label in the rectangle if it fits
+        if self.messy or region_fits(r):
+            label = label.replace('\n', f'</tspan><tspan x="{center_x}" dy="1.2em">')
+            self.emit(
+                f"""<text x="{center_x}"  y="{center_y}" class="tile_label {classes}">
               <tspan>{label}</tspan>
             </text>
             """)
-        # Note text style was inserted in draw_tile already
+            # Note text style was inserted in draw_tile already
 
+    def close(self):
+        """Finish the SVG output, if it is being streamed.
+        The stream itself is left open.
+        """
+        writer = self.writer
+        if writer is None:
+            return
+        if self.stream_css:
+            if self.compact:
+                writer.write("<defs><style>")
+                writer.write("".join(self.stream_css))
+                writer.write("</style></defs>")
+            else:
+                writer.write("\n<defs><style>\n")
+                writer.write_lines(self.stream_css)
+                writer.write("\n</style></defs>")
+            self.stream_css = []
+        writer.write(SVG_EPILOGUE)
+        writer.flush()
+        self.writer = None
+
+    def write(self, out: io.TextIOBase):
+        """Write the buffered SVG representation to out, part by part"""
+        writer = SvgWriter(out)
+        writer.write(self.svg_head)
+        self.write_styles(writer, self.css_buffer)
+        if self.compact:
+            writer.write("".join(self.svg_buffer))
+        else:
+            writer.write_lines(self.svg_buffer)
+        writer.write(SVG_EPILOGUE)
+        writer.flush()
+
+    def content(self) -> str:
+        """The buffered SVG representation as a single string"""
+        out = io.StringIO()
+        self.write(out)
+        return out.getvalue()
+
+
+def create(options=None) -> SvgDisplay:
+    """A new SvgDisplay, for a display.RenderContext"""
+    return SvgDisplay(display_options if options is None else options)
+
+
+# The module API draws on a default SvgDisplay, which takes its
+# options from graphics.display_options
+DEFAULT = SvgDisplay()
+
+init = DEFAULT.init
+init_stream = DEFAULT.init_stream
+draw_tile = DEFAULT.draw_tile
+begin_group = DEFAULT.begin_group
+end_group = DEFAULT.end_group
+draw_label = DEFAULT.draw_label
+close = DEFAULT.close
+write = DEFAULT.write
+content = DEFAULT.content
+
+
+def svg_head(width: int, height: int) -> str:
+    return f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}">'
 
-def close():
-    pass
 
-def content() -> list[str]:
-    # Assemble the output SVG file from parts
-    log.info(f"Combining parts of SVG representation")
-    return ( SVG_HEAD
-             + CSS_PROLOGUE  + "\n".join(CSS_BUFFER) + CSS_EPILOGUE
-             + "\n".join(SVG_BUFFER)
-             + SVG_EPILOGUE )
+def xml_escape(s: str) -> str:
+    """"Escape XML special characters as XML entities"""
+    return ((s.replace("&", "&amp;").
+            replace("<", "&lt;")).
+            replace(">", "&gt;").
+            replace('"', '&quot;'))
+
+LBRACE = "{"
+RBRACE = "}"
+
+
+def open_svg(path: str | os.PathLike) -> io.TextIOBase:
+    """Text file for SVG output at path, which is compressed as it
+    is written if path ends in .svgz
+    """
+    if os.fspath(path).endswith(".svgz"):
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=SVGZ_LEVEL)
+    return open(path, "w")
@@ -0,0 +1,142 @@
+"""Size of text labels, to decide whether a label fits in its tile.
+
+Both SVG and Tk draw labels in 12 point Helvetica (16 pixels), centered
+with one line per line of the label.  Rather than guess a fixed width
+for every character, TextMetrics adds up the advance width of each
+character from a table:  by default the published widths of Helvetica
+(which Arial shares), or a table measured from a tkinter.font.Font
+with measured(font), for a display that opts into it (see tk_display).
+
+Widths are memoized for each distinct line of a label.  Labels are
+mostly distinct (a key and a value), but their lines repeat, so that
+most decisions are a dict lookup or two, with no splitting for labels
+of one line and no measuring for labels too tall for their tiles.  A
+TextMetrics is for one font at one size, so its memo is for (line,
+font, size).  The memo is emptied when it holds MEMO_SIZE lines, so
+that a long-running program drawing many treemaps does not keep the
+lines of all of them.
+"""
+import unicodedata
+
+FONT_SIZE = 16        # Pixels;  12pt as in the style sheet of svg_display
+LINE_SPACING = 1.2    # Line height in ems, as dy="1.2em" in svg_display
+
+# Advance widths of Helvetica, in thousandths of an em (from its AFM file)
+HELVETICA_WIDTHS: dict[str, int] = {
+    " ": 278, "!": 278, '"': 355, "#": 556, "$": 556, "%": 889, "&": 667, "'": 191,
+    "(": 333, ")": 333, "*": 389, "+": 584, ",": 278, "-": 333, ".": 278, "/": 278,
+    "0": 556, "1": 556, "2": 556, "3": 556, "4": 556, "5": 556, "6": 556, "7": 556,
+    "8": 556, "9": 556, ":": 278, ";": 278, "<": 584, "=": 584, ">": 584, "?": 556,
+    "@": 1015, "A": 667, "B": 667, "C": 722, "D": 722, "E": 667, "F": 611, "G": 778,
+    "H": 722, "I": 278, "J": 500, "K": 667, "L": 556, "M": 833, "N": 722, "O": 778,
+    "P": 667, "Q": 778, "R": 722, "S": 667, "T": 611, "U": 722, "V": 667, "W": 944,
+    "X": 667, "Y": 667, "Z": 611, "[": 278, "\\": 278, "]": 278, "^": 469, "_": 556,
+    "`": 333, "a": 556, "b": 556, "c": 500, "d": 556, "e": 556, "f": 278, "g": 556,
+    "h": 556, "i": 222, "j": 222, "k": 500, "l": 222, "m": 833, "n": 556, "o": 556,
+    "p": 556, "q": 556, "r": 333, "s": 500, "t": 278, "u": 556, "v": 500, "w": 722,
+    "x": 500, "y": 500, "z": 500, "{": 334, "|": 260, "}": 334, "~": 584,
+}
+DEFAULT_WIDTH = 556   # Other characters, except wide (e.g., CJK) ones
+WIDE_WIDTH = 1000
+
+MEMO_SIZE = 4096      # Most line widths memoized
+
+
+class TextMetrics:
+    """Sizes of labels in one font, from advance widths in pixels
+    of characters, and line height in pixels.
+    """
+    def __init__(self, advances: dict[str, float], line_height: float,
+                 default_advance: float, wide_advance: float):
+        self.advances = advances
+        self.line_height = line_height
+        self.default_advance = default_advance
+        self.wide_advance = wide_advance
+        self.line_widths: dict[str, float] = {}   # Memo
+
+    def line_width(self, line: str) -> float:
+        width = self.line_widths.get(line)
+        if width is None:
+            advances = self.advances
+            width = 0.0
+            for ch in line:
+                advance = advances.get(ch)
+                if advance is None:
+                    advance = self.advance(ch)
+                width += advance
+            if len(self.line_widths) >= MEMO_SIZE:
+                self.line_widths.clear()
+            self.line_widths[line] = width
+        return width
+
+    def advance(self, ch: str) -> float:
+        """Width of a character not in the table"""
+        if unicodedata.east_asian_width(ch) in "WF":
+            return self.wide_advance
+        if unicodedata.combining(ch):
+            return 0.0
+        return self.default_advance
+
+    def size(self, label: str) -> tuple[float, float]:
+        """(width, height) of label in pixels, one line per line of label"""
+        lines = label.split("\n")
+        return (max(self.line_width(line) for line in lines),
+                len(lines) * self.line_height)
+
+    def fits(self, label: str, width: int, height: int) -> bool:
+        """Does label fit in width x height pixels?  Same as comparing
+        with size(label), but usually without splitting or measuring.
+        """
+        line_widths = self.line_widths
+        if "\n" not in label:
+            line_width = line_widths.get(label)
+            if line_width is None:
+                line_width = self.line_width(label)
+            return line_width <= width and self.line_height <= height
+        lines = label.split("\n")
+        if len(lines) * self.line_height > height:
+            return False
+        for line in lines:
+            line_width = line_widths.get(line)
+            if line_width is None:
+                line_width = self.line_width(line)
+            if line_width > width:
+                return False
+        return True
+
+
+def scaled(widths: dict[str, int], size: float = FONT_SIZE) -> TextMetrics:
+    """Metrics for a font of size pixels with widths in thousandths of an em"""
+    scale = size / 1000
+    return TextMetrics({ch: width * scale for ch, width in widths.items()},
+                       LINE_SPACING * size, DEFAULT_WIDTH * scale, WIDE_WIDTH * scale)
+
+
+def measured(font) -> TextMetrics:
+    """Metrics measured from a tkinter.font.Font, for the printable
+    ASCII characters;  others are estimated from the width of "0".
+    """
+    advances = {chr(code): float(font.measure(chr(code))) for code in range(32, 127)}
+    zero = advances["0"]
+    return TextMetrics(advances, float(font.metrics("linespace")), zero, 2 * zero)
+
+
+DEFAULT = scaled(HELVETICA_WIDTHS)   # Of the default display.RenderContext
+
+
+def label_fits(label: str, llx: int, lly: int, urx: int, ury: int,
+               metrics: TextMetrics = DEFAULT) -> bool:
+    """Does this label fit in the box (probably)?  We can't know
+    exactly which font will be used, e.g., in a web browser.
+    """
+    return metrics.fits(label, urx - llx, ury - lly)
+
+
+def region_fits(r) -> bool:
+    """Does the label of r, a gr_display.Rectangular, fit in its box?
+    As decided by display for all backends, if it has been.
+    """
+    if r.label_fits is not None:
+        return r.label_fits
+    ((llx, lly), (urx, ury)) = r.box
+    return label_fits(r.label, llx, lly, urx, ury)
@@ -1,9 +1,46 @@
 """
 Tk (built-in Python graphics package) display of Treemap canvas.
+
+Tiles are drawn as items of the tkinter.Canvas underlying Zelle's
+GraphWin, rather than as Zelle graphics objects, and the window is
+created without autoflush:  Tk does not redraw the screen after each
+item, but at most FRAME_RATE times per second while drawing, and when
+drawing is finished.  All labels share one font object.
+
+With display_options.progressive, tiles are not drawn as they arrive
+but kept until the treemap is complete, then drawn in descending order
+of area, in batches of at most BATCH_TIME seconds scheduled with
+after() while Tk runs its event loop:  the largest structure appears in
+the first frame, and the window can be moved, resized and closed while
+the small tiles fill in.  Progress is shown in the title of the window
+and logged (at DEBUG level) after each batch.
+
+With display_options.interactive, the window is a viewer:  clicking a
+tile shows its label and the labels of the groups enclosing it,
+dragging pans, and the mouse wheel (or the + and - keys) zooms.  The
+tiles and groups are kept, with a spatial_index.TileIndex, so that a
+click is identified without searching every tile, and each view draws
+only the tiles within it that are at least a pixel wide and high.
+Given a way to lay out groups (see display.explore), double-clicking a
+group drills down into it:  the group is laid out to fill the window,
+and Escape, BackSpace or the right button goes back out.  The items of
+each view on the way down are hidden rather than deleted, so going
+back out redraws nothing.
+
+The state of each window is kept in a TkDisplay;  the module functions
+init, draw_tile, etc. draw in a default one.  (Tk itself expects to be
+used from a single thread.)
 """
+from collections.abc import Callable
+import time
+import tkinter.font
 
+from . import display_options
 from . import graphics  # Zelle's Tk graphics package
+from . import text_metrics
 from .gr_display import Rectangular
+from .text_metrics import label_fits, region_fits
+import spatial_index
 
 import logging
 logging.basicConfig()
@@ -14,78 +51,387 @@ MARGIN = 4   # Between tile and its surrounding object
 TYPEFACE = "helvetica"
 FONTSIZE = 12
 
-# Text size estimates borrowed from svg_display.  Could be different
-# in future depending on text sizes.  I don't know how to measure
-# rendered text size directly in Tk, but maybe it's possible?
-#
-CHAR_WIDTH_APPROX = 12  # Rough approximation of average character width in pixels
-LINE_HEIGHT_APPROX = 17
+# Labels are fitted to tiles by text_metrics, which assumes this font,
+# unless a TkDisplay is created with measured=True:  then the widths are
+# measured from the font Tk actually uses, and display fits labels for
+# every backend with them
 
+FRAME_RATE = 10   # Screen updates per second while drawing
+BATCH_TIME = 1 / FRAME_RATE   # Seconds of drawing between events, when progressive
+TITLE = "Treemap"
+ZOOM = 1.25          # Scale factor of each step of the mouse wheel
+DRAG_DISTANCE = 3    # Pixels the mouse moves before a click becomes a drag
 
-CANVAS: graphics.GraphWin | None = None   # Set in init function
 
-def init(width: int, height: int):
-    global CANVAS
-    CANVAS = graphics.GraphWin("Treemap", width, height)
-    CANVAS.setCoords(0, 0, width, height)
+class TkDisplay:
+    """A Tk window showing one treemap.  Options progressive and
+    interactive are taken from options, which is
+    graphics.display_options or a display_options.Options, when init
+    opens the window.  If measured, labels are fitted with widths
+    measured from its font (see text_metrics.measured).
+    """
+    def __init__(self, options=display_options, measured: bool = False):
+        self.options = options
+        self.measured = measured
+        self.canvas: graphics.GraphWin | None = None   # Set in init
+        self.font: tkinter.font.Font | None = None     # For every label
+        self.metrics: text_metrics.TextMetrics | None = None   # Of font, if measured
+        self.last_flush = 0.0    # time.monotonic() of last screen update
+        self.progressive = False
+        self.pending: list[tuple[int, Rectangular]] = []   # (area, tile) to draw, if progressive
+        self.batches: list[tuple[int, float]] = []   # (tiles drawn, seconds) after each batch
+        self.scheduled: str | None = None            # after() id of the next batch
+        # The interactive viewer keeps every tile and group
+        self.interactive = False
+        self.regions: list[Rectangular] = []
+        self.depths: list[int] = []
+        self.is_group = bytearray()
+        self.depth = 0      # Groups open while drawing
+        self.index: spatial_index.TileIndex | None = None   # Of regions, when drawn
+        self.view = (0.0, 0.0, 1.0)   # Treemap x, y at the upper left of the window, and scale
+        self.press: tuple[int, int] | None = None   # Last point of the mouse, while button down
+        self.dragged = False
+        # Drilling down:  drill(key, i) draws the view of group i of the view of key,
+        # collected without painting, and returns its key and depth (see display.explore)
+        self.drill: Callable[[object, int], tuple[object, int] | None] | None = None
+        self.collecting = False
+        self.key: object = None      # Of the current view;  None for the whole treemap
+        self.key_depth = 0           # Groups that fill the current view
+        self.tag = "view0"           # Of the canvas items of the current view
+        self.complete = False        # Are all tiles of the current view drawn?
+        self.title = TITLE
+        self.outer: list[tuple] = []   # Views enclosing the current view, outermost first
 
+    def init(self, width: int, height: int):
+        self.progressive = self.options.progressive
+        self.interactive = self.options.interactive
+        self.pending = []
+        self.batches = []
+        self.regions, self.depths, self.is_group = [], [], bytearray()
+        self.depth = 0
+        self.index = None
+        self.view = (0.0, 0.0, 1.0)
+        self.key, self.key_depth, self.tag, self.title, self.outer = None, 0, "view0", TITLE, []
+        self.complete = not self.progressive   # Else when filled in
+        self.canvas = graphics.GraphWin(TITLE, width, height, autoflush=False)
+        self.canvas.setCoords(0, 0, width, height)
+        if self.progressive or self.interactive:
+            self.canvas.master.resizable(True, True)
+        self.font = tkinter.font.Font(root=self.canvas, family=TYPEFACE, size=FONTSIZE)
+        if self.measured and self.metrics is None:   # The font is the same in each window
+            self.metrics = text_metrics.measured(self.font)
+        graphics.update()   # Show the empty window at once
+        self.last_flush = time.monotonic()
 
-# Replacing individual calls to draw_rect and draw_label by
-# a single function draw_tile, taking explicit arguments instead
-# of a property list
+    def draw_tile(self, r: Rectangular):
+        """Draw a tile and its label, or keep it to draw in order of
+        area if progressive.
+        """
+        assert self.canvas, "Did you forget to initialize the window?"
+        if self.interactive:
+            self.keep(r, False)
+        if self.collecting:
+            return
+        if self.progressive:
+            self.pending.append((area(r), r))
+        else:
+            self.paint(r)
+        if time.monotonic() - self.last_flush >= 1 / FRAME_RATE:
+            self.flush()
 
+    def paint(self, r: Rectangular):
+        """Draw a tile and its label, transforming to screen coordinates."""
+        ((llx, lly), (urx, ury)) = r.box
+        canvas = self.canvas
+        fits = region_fits(r)
+        vx, vy, scale = self.view
+        if vx or vy or scale != 1:
+            llx, lly = (llx - vx) * scale, (lly - vy) * scale
+            urx, ury = (urx - vx) * scale, (ury - vy) * scale
+            fits = label_fits(r.label, llx, lly, urx, ury, self.metrics or text_metrics.DEFAULT)
+        # The tile background
+        lly_flipped = canvas.height - lly
+        ury_flipped = canvas.height - ury
+        x0, y0 = canvas.toScreen(llx + MARGIN, lly_flipped - MARGIN)
+        x1, y1 = canvas.toScreen(urx - MARGIN, ury_flipped + MARGIN)
+        canvas.create_rectangle(x0, y0, x1, y1, fill=r.fill_color or "", outline="black", width=1,
+                                tags=self.tag)
 
-def draw_tile(r: Rectangular):
-    ((llx, lly), (urx, ury)) = r.box
-    """Draw a tile and its label, transforming to screen coordinates."""
-    assert CANVAS, "Did you forget to initialize the window?"
-    # The tile background
-    lly_flipped = CANVAS.height - lly
-    ury_flipped = CANVAS.height - ury
-    image = graphics.Rectangle(graphics.Point(llx+MARGIN, lly_flipped-MARGIN),
-                              graphics.Point(urx-MARGIN,ury_flipped+MARGIN))
-    if r.fill_color:
-        image.setFill(r.fill_color)
-    image.draw(CANVAS)
-
-    # The textual label on the background
-    if  label_fits(r.label, llx, lly, urx, ury):
-        label = graphics.Text(graphics.Point((llx + urx)/2, (lly_flipped + ury_flipped)/2), r.label)
-        label.setSize(FONTSIZE)
-        label.setFace(TYPEFACE)
-        label.setTextColor(r.label_color)
-        label.draw(CANVAS)
-
-
-
-def text_width_roughly(label: str) -> int:
-    """Approximate width of a string in pixels.
-    Very rough since real width
-    depends on font, screen resolution, width of individual
-    characters, etc.  Just a "better than nothing" guess.
-    """
-    lines = label.split()  # Guess at LONGEST line
-    longest = 0
-    for line in lines:
-        longest = max(longest, len(line) * CHAR_WIDTH_APPROX)
-    return longest
+        # The textual label on the background
+        if fits:
+            x, y = canvas.toScreen((llx + urx) / 2, (lly_flipped + ury_flipped) / 2)
+            canvas.create_text(x, y, text=r.label, fill=r.label_color, font=self.font,
+                               justify="center", tags=self.tag)
+
+    def begin_group(self, r: Rectangular):
+        """Groups are not outlined in Tk;  their tiles carry their colors.
+        The interactive viewer keeps them, to identify what is clicked.
+        """
+        if self.interactive:
+            self.keep(r, True)
+            self.depth += 1
+
+    def end_group(self):
+        if self.interactive:
+            self.depth -= 1
+
+    def keep(self, r: Rectangular, is_group: bool):
+        """Keep a tile or group for the interactive viewer"""
+        self.regions.append(r)
+        self.depths.append(self.depth)
+        self.is_group.append(is_group)
+
+    def flush(self):
+        """Show what has been drawn so far"""
+        graphics.update()   # Also handles window events, so the window stays responsive
+        self.last_flush = time.monotonic()
+
+    def fill_in(self, pending: list[tuple[int, Rectangular]]):
+        """Schedule the pending (area, tile) pairs to be drawn, largest
+        first, in batches of at most BATCH_TIME seconds, until they are
+        all drawn, the window is closed, or fill_in is called again.
+        """
+        canvas = self.canvas
+        if self.scheduled is not None:
+            canvas.after_cancel(self.scheduled)
+        pending.sort(key=lambda entry: entry[0], reverse=True)   # Stable
+        tiles = [tile for area, tile in pending]
+        done = 0
+        self.complete = False
+
+        def batch():
+            nonlocal done
+            self.scheduled = None
+            if canvas.isClosed():
+                return
+            start = time.monotonic()
+            while done < len(tiles) and time.monotonic() - start < BATCH_TIME:
+                self.paint(tiles[done])
+                done += 1
+            elapsed = time.monotonic() - start
+            self.batches.append((done, elapsed))
+            log.debug(f"Drew {done} of {len(tiles)} tiles, batch {len(self.batches)} "
+                      f"in {elapsed * 1000:.0f}ms")
+            if done < len(tiles):
+                canvas.master.title(f"{self.title} ({done} of {len(tiles)} tiles)")
+                self.scheduled = canvas.after(1, batch)
+            else:
+                canvas.master.title(self.title)
+                self.complete = True
+
+        self.scheduled = canvas.after(0, batch)
+
+    def wait_close(self):
+        """Hold display on screen until user clicks"""
+        self.flush()
+        canvas = self.canvas
+        if not (self.progressive or self.interactive):
+            print("Click window to close it")
+            canvas.getMouse()
+            canvas.close()
+            return
+        # Tk's event loop draws the tiles and handles the viewer while waiting
+        if self.interactive:
+            self.explore()
+            print("Click a tile to identify it, drag to pan, scroll or press + and - to zoom;  "
+                  + ("double-click a group to drill down, and Escape to go back out;  "
+                     if self.drill else "")
+                  + "press q or close the window when done")
+        else:
+            print("Click window to close it")
+            canvas.setMouseHandler(lambda point: canvas.close())
+        if self.progressive:
+            self.fill_in(self.pending)
+            self.pending = []
+        canvas.master.wait_window()
+
+    def close(self):
+        """Finish the display:  hold it on screen until user clicks"""
+        self.wait_close()
 
-def label_fits(label: str, llx: int, lly: int, urx: int, ury: int) -> bool:
-    # Too wide?
-    if text_width_roughly(label) > urx - llx:
-        return False
-    # Too tall?
-    if len(label.split()) * LINE_HEIGHT_APPROX > ury - lly:
-        return False
-    return True
+    # -------------------------------------------------------------------
+    #  The interactive viewer
+    # -------------------------------------------------------------------
 
+    def explore(self):
+        """Index the tiles and groups, and respond to the mouse and keys"""
+        canvas = self.canvas
+        self.index = self.indexed()
+        canvas.bind("<ButtonPress-1>", self.on_press)
+        canvas.bind("<B1-Motion>", self.on_drag)
+        canvas.bind("<ButtonRelease-1>", self.on_release)
+        canvas.bind("<MouseWheel>", lambda event: self.zoom(ZOOM if event.delta > 0 else 1 / ZOOM,
+                                                            event.x, event.y))
+        canvas.bind("<Button-4>", lambda event: self.zoom(ZOOM, event.x, event.y))
+        canvas.bind("<Button-5>", lambda event: self.zoom(1 / ZOOM, event.x, event.y))
+        canvas.bind("<Double-Button-1>", lambda event: self.drill_in(event.x, event.y))
+        canvas.bind("<Button-3>", lambda event: self.drill_out())
+        canvas.master.bind("<Key>", self.on_key)
+
+    def indexed(self) -> spatial_index.TileIndex:
+        """Index of the tiles and groups kept"""
+        return spatial_index.TileIndex(
+            [(llx, lly, urx, ury) for ((llx, lly), (urx, ury)) in (r.box for r in self.regions)],
+            self.depths)
+
+    def redraw(self):
+        """Draw the tiles in view, except those smaller than a pixel"""
+        canvas = self.canvas
+        canvas.delete(self.tag)
+        vx, vy, scale = self.view
+        regions, is_group = self.regions, self.is_group
+        self.fill_in([(area(regions[i]), regions[i])
+                      for i in self.index.within(vx, vy, vx + canvas.width / scale,
+                                                 vy + canvas.height / scale, 1 / scale)
+                      if not is_group[i]])
+
+    def within_bounds(self, vx: float, vy: float, scale: float) -> tuple[float, float, float]:
+        """The view nearest (vx, vy, scale) that shows only the treemap"""
+        canvas = self.canvas
+        scale = max(scale, 1.0)
+        return (min(max(vx, 0.0), canvas.width - canvas.width / scale),
+                min(max(vy, 0.0), canvas.height - canvas.height / scale),
+                scale)
+
+    def set_view(self, vx: float, vy: float, scale: float):
+        """Show the treemap from (vx, vy) at scale, within its bounds"""
+        view = self.within_bounds(vx, vy, scale)
+        if view != self.view:
+            self.view = view
+            self.redraw()
+
+    def zoom(self, factor: float, x: int, y: int):
+        """Zoom by factor, keeping the point at (x, y) in the window in place"""
+        vx, vy, scale = self.view
+        new_scale = max(scale * factor, 1.0)
+        self.set_view(vx + x / scale - x / new_scale, vy + y / scale - y / new_scale, new_scale)
+
+    def identify(self, x: int, y: int) -> list[Rectangular]:
+        """The tile at (x, y) in the window, after the groups enclosing it"""
+        vx, vy, scale = self.view
+        return [self.regions[i] for i in self.index.at(vx + x / scale, vy + y / scale)]
+
+    def on_press(self, event):
+        self.press = (event.x, event.y)
+        self.dragged = False
+
+    def on_drag(self, event):
+        if self.press is None:
+            return
+        x, y = self.press
+        if not self.dragged and abs(event.x - x) + abs(event.y - y) < DRAG_DISTANCE:
+            return
+        # Move what is drawn;  the view is redrawn when the button is released
+        self.dragged = True
+        self.canvas.move(self.tag, event.x - x, event.y - y)
+        self.press = (event.x, event.y)
+        vx, vy, scale = self.view
+        self.view = (vx - (event.x - x) / scale, vy - (event.y - y) / scale, scale)
+
+    def on_release(self, event):
+        self.press = None
+        if self.dragged:
+            self.view = self.within_bounds(*self.view)
+            self.redraw()
+            return
+        path = " > ".join(r.label.replace("\n", " ") for r in self.identify(event.x, event.y))
+        self.canvas.master.title(f"{TITLE}:  {path}" if path else self.title)
+        print(path)
+
+    def on_key(self, event):
+        canvas = self.canvas
+        vx, vy, scale = self.view
+        step_x, step_y = canvas.width / scale / 4, canvas.height / scale / 4
+        if event.keysym in ("plus", "equal", "KP_Add"):
+            self.zoom(ZOOM, canvas.width / 2, canvas.height / 2)
+        elif event.keysym in ("minus", "KP_Subtract"):
+            self.zoom(1 / ZOOM, canvas.width / 2, canvas.height / 2)
+        elif event.keysym in ("0", "Home"):
+            self.set_view(0.0, 0.0, 1.0)
+        elif event.keysym == "Left":
+            self.set_view(vx - step_x, vy, scale)
+        elif event.keysym == "Right":
+            self.set_view(vx + step_x, vy, scale)
+        elif event.keysym == "Up":
+            self.set_view(vx, vy - step_y, scale)
+        elif event.keysym == "Down":
+            self.set_view(vx, vy + step_y, scale)
+        elif event.keysym in ("Escape", "BackSpace"):
+            self.drill_out()
+        elif event.keysym == "q":
+            canvas.close()
+
+    def drill_in(self, x: int, y: int):
+        """Show the group at (x, y) in the window, one level below the
+        groups that fill the view, laid out to fill the window
+        """
+        if self.drill is None:
+            return
+        vx, vy, scale = self.view
+        groups = [i for i in self.index.at(vx + x / scale, vy + y / scale) if self.is_group[i]]
+        if len(groups) <= self.key_depth:
+            return
+        view = (self.key, self.key_depth, self.regions, self.depths, self.is_group, self.index,
+                self.view, self.tag, self.complete, self.title)
+        self.regions, self.depths, self.is_group, self.depth = [], [], bytearray(), 0
+        self.collecting = True
+        try:
+            entered = self.drill(self.key, groups[self.key_depth])
+        finally:
+            self.collecting = False
+        if entered is None:
+            (self.key, self.key_depth, self.regions, self.depths, self.is_group, self.index,
+             self.view, self.tag, self.complete, self.title) = view
+            return
+        # Hide the view, to show again on the way back out
+        canvas = self.canvas
+        if self.scheduled is not None:
+            canvas.after_cancel(self.scheduled)
+            self.scheduled = None
+        canvas.itemconfigure(self.tag, state="hidden")
+        self.outer.append(view)
+        self.key, self.key_depth = entered
+        self.tag = f"view{len(self.outer)}"
+        self.title = f"{TITLE}:  " + " > ".join(self.regions[i].label.replace("\n", " ")
+                                                 for i in range(self.key_depth))
+        self.index = self.indexed()
+        self.view = (0.0, 0.0, 1.0)
+        self.redraw()
+
+    def drill_out(self):
+        """Show the view enclosing this one, as it was"""
+        if not self.outer:
+            return
+        canvas = self.canvas
+        if self.scheduled is not None:
+            canvas.after_cancel(self.scheduled)
+            self.scheduled = None
+        canvas.delete(self.tag)
+        (self.key, self.key_depth, self.regions, self.depths, self.is_group, self.index,
+         self.view, self.tag, self.complete, self.title) = self.outer.pop()
+        canvas.itemconfigure(self.tag, state="normal")
+        canvas.master.title(self.title)
+        if not self.complete:   # Left before it was drawn
+            self.redraw()
+
+
+def area(r: Rectangular) -> int:
+    ((llx, lly), (urx, ury)) = r.box
+    return (urx - llx) * (ury - lly)
 
 
+def create(options=None) -> TkDisplay:
+    """A new TkDisplay, for a display.RenderContext"""
+    return TkDisplay(display_options if options is None else options)
 
-def wait_close():
-    """Hold display on screen until user clicks"""
-    print("Click window to close it")
-    CANVAS.getMouse()
-    CANVAS.close()
 
+# The module API draws in a default window
+DEFAULT = TkDisplay()
 
+init = DEFAULT.init
+draw_tile = DEFAULT.draw_tile
+begin_group = DEFAULT.begin_group
+end_group = DEFAULT.end_group
+flush = DEFAULT.flush
+wait_close = DEFAULT.wait_close
+close = DEFAULT.close
@@ -0,0 +1,220 @@
+"""Persistent cache of treemap layouts, on disk.
+
+The same inputs are often laid out at the same sizes again and again,
+in different processes and on different days.  A LayoutCache keeps the
+tile and group records of each layout in a directory, so that they can
+be loaded instead of computed.
+
+Entries are addressed by content:  the key of an entry is a hash of
+the nest (as a WeightedTree), the width and height of the canvas, the
+layout algorithm, and tiling.LAYOUT_VERSION.  The hash of each node of
+the tree combines its own kind, label, and value with the hashes of its
+children, so every subtree has a hash of its own.  Besides the layout
+of the whole tree, the cache keeps the layouts of the large subtrees
+that tiling.layout_tiles lays out separately, with coordinates relative
+to their rectangles;  a subtree that appears in another nest, or in
+another place, is reused when it is given a rectangle of the same size.
+
+The total size of the entries is limited.  Each time an entry is
+loaded its file is touched, and once a layout has been computed and
+saved (tiling.compute_tiles calls evict), if the limit is exceeded the
+least recently used entries are removed.
+
+Entries are written with marshal, which (unlike pickle) cannot run
+code when read, and written atomically through a temporary file of
+their own, so that several processes and threads can share a cache
+directory.
+"""
+from array import array
+import hashlib
+import logging
+import marshal
+import os
+import pathlib
+import tempfile
+
+import geometry
+import tiling
+from tiling import Tile, Group
+from weighted_tree import WeightedTree, LEAF
+
+logging.basicConfig()
+log = logging.getLogger(__name__)
+log.setLevel(logging.INFO)
+
+DEFAULT_DIRECTORY = pathlib.Path(os.environ.get("XDG_CACHE_HOME",
+                                                pathlib.Path.home() / ".cache")) / "treemap"
+DEFAULT_LIMIT = 200 * 1024 * 1024   # Bytes
+SUFFIX = ".tiles"
+FORMAT = 1    # Of the contents of an entry
+
+
+class LayoutCache:
+    """Layouts kept in directory, in at most limit bytes"""
+    def __init__(self, directory: str | os.PathLike = DEFAULT_DIRECTORY,
+                 limit: int = DEFAULT_LIMIT):
+        self.directory = pathlib.Path(directory)
+        self.limit = limit
+
+    def for_tree(self, tree: WeightedTree) -> "TreeEntries":
+        """Entries for the layouts of tree and its subtrees.  The tree
+        must not change while they are in use.
+        """
+        return TreeEntries(self, node_hashes(tree))
+
+    def read(self, key: str) -> bytes | None:
+        path = self.directory / (key + SUFFIX)
+        try:
+            data = path.read_bytes()
+            os.utime(path)   # Recently used
+        except OSError:
+            return None
+        return data
+
+    def write(self, key: str, data: bytes):
+        path = self.directory / (key + SUFFIX)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            handle, temporary = tempfile.mkstemp(prefix=key, suffix=".tmp", dir=self.directory)
+            try:
+                with os.fdopen(handle, "wb") as f:
+                    f.write(data)
+                os.replace(temporary, path)
+            except OSError:
+                pathlib.Path(temporary).unlink(missing_ok=True)
+                raise
+        except OSError as e:
+            log.warning(f"Could not save layout in cache {self.directory}: {e}")
+
+    def evict(self):
+        """Remove least recently used entries until within the limit"""
+        entries = []
+        total = 0
+        try:
+            listing = list(os.scandir(self.directory))
+        except OSError:
+            return   # Nothing saved yet
+        for entry in listing:
+            if entry.name.endswith(SUFFIX):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue   # Removed by another process
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        for used, size, path in entries:
+            if total <= self.limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        for path in self.directory.glob("*" + SUFFIX):
+            path.unlink(missing_ok=True)
+
+
+class TreeEntries:
+    """Cached layouts of the subtrees of one tree, by node number.
+    The cache argument of tiling.compute_tiles.
+    """
+    def __init__(self, cache: LayoutCache, hashes: list[bytes]):
+        self.cache = cache
+        self.hashes = hashes
+
+    def key(self, node: int, rect: geometry.Rect, algorithm: str) -> str:
+        layout = repr((rect.width(), rect.height(), algorithm, tiling.LAYOUT_VERSION))
+        return hashlib.blake2b(self.hashes[node] + layout.encode(), digest_size=20).hexdigest()
+
+    def load(self, node: int, rect: geometry.Rect, algorithm: str,
+             group: tuple = ()) -> list[Tile | Group] | None:
+        """Records of the layout of node in rect, within groups group,
+        or None if it is not in the cache.
+        """
+        data = self.cache.read(self.key(node, rect, algorithm))
+        if data is None:
+            return None
+        try:
+            return decode(data, rect, group)
+        except (ValueError, TypeError, IndexError, EOFError) as e:
+            log.warning(f"Ignoring damaged layout in cache {self.cache.directory}: {e}")
+            return None
+
+    def store(self, node: int, rect: geometry.Rect, algorithm: str,
+              records: list[Tile | Group]):
+        try:
+            data = encode(records, rect)
+        except ValueError:
+            return   # Labels or values that marshal cannot save
+        self.cache.write(self.key(node, rect, algorithm), data)
+
+
+def node_hashes(tree: WeightedTree) -> list[bytes]:
+    """A hash of the subtree of each node, in a single pass because
+    children are numbered before their parents.  Values are hashed by
+    repr, so that 1 and 1.0 (which are displayed differently) differ.
+    A leaf is not hashed on its own:  its repr, which is unambiguous
+    where it ends, stands for it in the hash of its parent.
+    """
+    kinds, keyed, labels, weights = tree.kinds, tree.keyed, tree.labels, tree.weights
+    children, first, count = tree.children, tree.first, tree.count
+    hashes: list[bytes] = []
+    for node in range(len(tree)):
+        if kinds[node] == LEAF:
+            hashes.append(b"L" + repr((labels[node], weights[node])).encode())
+            continue
+        digest = hashlib.blake2b(repr((kinds[node], keyed[node], labels[node])).encode(),
+                                 digest_size=16)
+        start = first[node]
+        for i in range(start, start + count[node]):
+            digest.update(hashes[children[i]])
+        hashes.append(b"N" + digest.digest())
+    return hashes
+
+
+def encode(records: list[Tile | Group], rect: geometry.Rect) -> bytes:
+    """Records as columns, with coordinates relative to rect and depths
+    relative to the first record.  Group labels of each record are
+    implied by depths and the labels of the groups before it.
+    """
+    x, y = rect.ll.x, rect.ll.y
+    base = records[0].depth if records else 0
+    kinds = bytes(isinstance(record, Group) for record in records)
+    depths = array('i', [record.depth - base for record in records])
+    corners = array('i')
+    for record in records:
+        corners.extend((record.x0 - x, record.y0 - y, record.x1 - x, record.y1 - y))
+    return marshal.dumps((FORMAT, kinds, depths.tobytes(), corners.tobytes(),
+                          [record.label for record in records],
+                          [record.value for record in records]))
+
+
+def decode(data: bytes, rect: geometry.Rect, group: tuple) -> list[Tile | Group]:
+    """Records from encode, placed in rect within groups group"""
+    form, kinds, depths, corners, labels, values = marshal.loads(data)
+    if form != FORMAT:
+        raise ValueError(f"format {form}")
+    depths = array('i', depths)
+    corners = array('i', corners)
+    x, y = rect.ll.x, rect.ll.y
+    base = len(group)
+    paths = [group]   # Labels of enclosing groups at each relative depth
+    records: list[Tile | Group] = []
+    append = records.append
+    make = tuple.__new__   # Skips argument handling of Tile(...)
+    corner = iter(corners)
+    for kind, depth, label, value, llx, lly, urx, ury in zip(
+            kinds, depths, labels, values, corner, corner, corner, corner, strict=True):
+        path = paths[depth]
+        if kind:
+            append(make(Group, (label, value, base + depth,
+                                llx + x, lly + y, urx + x, ury + y, path)))
+            del paths[depth + 1:]
+            paths.append(path + (label,))
+        else:
+            append(make(Tile, (label, value, base + depth,
+                               llx + x, lly + y, urx + x, ury + y, path)))
+    return records
@@ -14,10 +14,15 @@ Example use:  python3 mapper.py data/small_flat.json 500 500
 # Standard Python library modules
 import logging
 import doctest
+import io
+from collections.abc import Sequence
 
 # Project modules, provided
 import geometry
 import display
+import tiling
+from splitter import Nest
+from weighted_tree import WeightedTree
 
 # Enable logging with log.debug(msg), log.info(msg), etc.
 logging.basicConfig()
@@ -25,34 +30,38 @@ log = logging.getLogger(__name__)  # Log messages will look like "DEBUG:mapper:m
 log.setLevel(logging.DEBUG)   # Change to logging.INFO to suppress debugging messages
 
 
-# Layout works with integers, floating point numbers, or a mix of the two.
-Real = int | float    # Named type for use in type annotations
+# Layout algorithms, by name (see tiling.py)
+ALGORITHMS = tiling.ALGORITHMS
 
 
-def treemap(values: list[Real], width: int, height: int):
+def treemap(values: Nest | WeightedTree, width: int, height: int, algorithm: str = "bisect"):
     """Create treemap of values in width x height pixel display
     in Tk interface and in SVG file written to treemap.svg.
+    algorithm selects a layout function from ALGORITHMS.
     """
-    display.init(width, height)
-    area = geometry.Rect(geometry.Point(0, 0),
-                         geometry.Point(width, height))
-    layout(values, area)
-    display.wait_close()
+    show(tiling.compute_tiles(values, width, height, algorithm), width, height)
+
 
+def show(tiles: list[tiling.Tile | tiling.Group], width: int, height: int,
+         svg_out: io.TextIOBase | None = None,
+         backends: Sequence[str] = display.DEFAULT_BACKENDS):
+    """Display tiles already laid out by tiling.compute_tiles
+    in width x height pixel display in Tk interface and in SVG
+    (or the display backends named), with SVG written to svg_out
+    as it is drawn if provided.
+    """
+    display.init(width, height, svg_out, backends)
+    tiling.render(tiles, display)
+    display.wait_close()
 
 
-def layout(items: list[Real], rect: geometry.Rect):
-    """Lay elements of items out in rectangle.
-    Version 0 (skeleton code) just takes a slice off the canvas for
-    each rectangle.  You will replace it with much better recursive
-    layouts.
+def layout(items: Nest | WeightedTree, rect: geometry.Rect):
+    """Lay elements of items out in rectangle, on the display.
+    Balanced bisection:  a list is split into a prefix and suffix with
+    nearly equal sums, and each part is laid out recursively in its
+    share of the rectangle (see tiling.layout_bisect).
     """
-    while len(items) > 0:
-        log.debug(f"Laying out {items} in {rect}")
-        proportion = items[0] / sum(items)
-        left_rect, rect = rect.split(proportion)
-        display.draw_tile(left_rect, items[0])
-        items = items[1:]
+    tiling.layout_bisect(items, rect, display)
 
 
 if __name__ == "__main__":
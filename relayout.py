@@ -0,0 +1,138 @@
+"""Incremental layout of a treemap whose leaf values change.
+
+When a few leaves of a large nest change value, most of the treemap
+stays where it was.  A Layout keeps the state of a layout (the tree,
+with the rectangle of each node and the order in which its children
+were placed) so that update can change some leaf values and lay out
+again only what the change affects:
+
+ - Weights are updated along the chain of ancestors of each changed
+   leaf, and only those ancestors are arranged again (see
+   tiling.ARRANGEMENTS).
+ - A subtree with no changed leaf whose rectangle is unchanged keeps
+   its layout;  one that has been given a new rectangle is laid out
+   again in full.
+
+update returns the tile and group records that moved or changed value,
+in drawing order, so that a display can redraw just those.  Together
+they cover all the area that changed.  After any number of updates,
+records() is the same as tiling.compute_tiles for the current values.
+
+Leaves are identified by paths from the root, like the paths in
+weighted_tree.validate:  a label for each dict entry and a position
+for each list element, e.g., ("Cake", "Chocolate") or (2, 0).
+"""
+from collections.abc import Sequence
+
+import geometry
+import tiling
+import weighted_tree
+from splitter import Real, Nest
+from tiling import Tile, Group
+from weighted_tree import WeightedTree, LEAF, GROUP, NO_CHILD
+
+Box = tuple[int, int, int, int]   # (llx, lly, urx, ury), comparable
+
+
+class Layout:
+    """A layout of values in a width x height canvas that can be
+    updated as leaf values change.  A WeightedTree for values is
+    updated in place.
+    """
+    def __init__(self, values: Nest | WeightedTree, width: int, height: int,
+                 algorithm: str = "bisect"):
+        self.tree = weighted_tree.as_tree(values)
+        self.arrange = tiling.ARRANGEMENTS[algorithm]
+        self.parents = self.tree.parents()
+        self.boxes: list[Box | None] = [None] * len(self.tree)   # None if not drawn
+        self.placed: dict[int, list[int]] = {}   # Children of each node, in drawing order
+        self.indexes: dict[int, dict[str, int]] = {}   # Children of dicts by label
+        self.place(self.tree.root, (0, 0, width, height), (), set(), full=True)
+
+    def records(self) -> list[Tile | Group]:
+        """Tiles and groups of the current layout, in drawing order"""
+        tree = self.tree
+        records = []
+        work = [(tree.root, ())]
+        while work:
+            node, group = work.pop()
+            box = self.boxes[node]
+            if tree.kinds[node] == LEAF:
+                records.append(Tile(tree.labels[node], tree.weights[node], len(group), *box, group))
+                continue
+            if tree.kinds[node] == GROUP:
+                records.append(Group(tree.labels[node], tree.weights[node], len(group), *box, group))
+                group = group + (tree.labels[node],)
+            work.extend((child, group) for child in reversed(self.placed[node]))
+        return records
+
+    def update(self, changes: dict[Sequence[str | int], Real]) -> list[Tile | Group]:
+        """Set the leaves at the paths in changes to their new values,
+        and lay out again what they affect.  Returns the records that
+        moved or changed, in drawing order.
+        """
+        tree = self.tree
+        dirty: set[int] = set()   # Changed leaves and their ancestors
+        for leaf_path, value in changes.items():
+            leaf = self.find(leaf_path)
+            assert tree.kinds[leaf] == LEAF, f"{leaf_path} is not a number"
+            assert isinstance(value, Real), f"New value {value!r} at {leaf_path} is not a number"
+            tree.weights[leaf] = value
+            node = leaf
+            while node != NO_CHILD and node not in dirty:
+                dirty.add(node)
+                node = self.parents[node]
+        for node in sorted(dirty):   # Children are numbered before parents
+            if tree.kinds[node] != LEAF:
+                tree.update_sums(node)
+        root = tree.root
+        return self.place(root, self.boxes[root], (), dirty, full=False)
+
+    def find(self, leaf_path: Sequence[str | int]) -> int:
+        """Node at leaf_path"""
+        tree = self.tree
+        node = tree.root
+        for step in leaf_path:
+            if tree.keyed[node]:
+                if node not in self.indexes:
+                    self.indexes[node] = {tree.labels[child]: child
+                                          for child in tree.child_nodes(node)}
+                assert step in self.indexes[node], f"No {step!r} in {leaf_path}"
+                node = self.indexes[node][step]
+            else:
+                lo, hi = tree.child_range(node)
+                assert isinstance(step, int) and 0 <= step < hi - lo, f"No {step!r} in {leaf_path}"
+                node = tree.children[lo + step]
+        return node
+
+    def place(self, node: int, box: Box, group: tuple, dirty: set[int],
+              full: bool) -> list[Tile | Group]:
+        """Lay out node in box, returning the records drawn, in order.
+        If not full, parts of node that are not dirty and keep their
+        boxes are left as they are.
+        """
+        tree = self.tree
+        drawn: list[Tile | Group] = []
+        work = [(node, box, group, full)]
+        while work:
+            node, box, group, full = work.pop()
+            self.boxes[node] = box
+            if tree.kinds[node] == LEAF:
+                drawn.append(Tile(tree.labels[node], tree.weights[node], len(group), *box, group))
+                continue
+            if tree.kinds[node] == GROUP:
+                drawn.append(Group(tree.labels[node], tree.weights[node], len(group), *box, group))
+                group = group + (tree.labels[node],)
+            rect = geometry.Rect(geometry.Point(box[0], box[1]), geometry.Point(box[2], box[3]))
+            arranged = [(child, (r.ll.x, r.ll.y, r.ur.x, r.ur.y))
+                        for child, r in self.arrange(tree, node, rect)]
+            children = [child for child, _ in arranged]
+            for child in set(self.placed.get(node, ())).difference(children):
+                self.boxes[child] = None   # No longer visible
+            self.placed[node] = children
+            for child, child_box in reversed(arranged):
+                if full or self.boxes[child] != child_box:
+                    work.append((child, child_box, group, True))
+                elif child in dirty:
+                    work.append((child, child_box, group, False))
+        return drawn
@@ -0,0 +1,134 @@
+"""Spatial index of a laid-out treemap, to find the tile under a point
+(and the groups enclosing it) and the tiles within a region without
+looking at every tile.
+
+The index is a tree of nested rectangles that follows the treemap:
+each group encloses the records that follow it with greater depth, as
+for tiling.render.  A group with many parts would still have to be
+searched part by part, so its parts are packed into a tree of their
+own:  sorted along the longer side of their bounding box and cut into
+FANOUT runs, each with its bounding box, and so on until each run has
+at most FANOUT parts.  A point query visits a few boxes at each level,
+in time proportional to the depth of the treemap (and the logarithm
+of the size of its groups).  A region query visits only boxes that
+overlap the region, and can skip boxes smaller than a given size,
+e.g., a pixel, with everything inside them.
+
+Items are the positions of records in the sequence they are given in:
+
+    index = spatial_index.TileIndex.from_records(records)
+    path = [records[i] for i in index.at(x, y)]   # Outermost first
+"""
+from collections.abc import Iterator, Sequence
+
+FANOUT = 8   # Most children of a node of the index
+
+Box = tuple[float, float, float, float]   # x0, y0, x1, y1 with x0 <= x1 and y0 <= y1
+
+
+class Node:
+    """A box of the index, enclosing the boxes of its children.
+    item is the position of a record, or -1 for a run of parts.
+    """
+    __slots__ = ("item", "x0", "y0", "x1", "y1", "children")
+
+    def __init__(self, item: int, x0: float, y0: float, x1: float, y1: float):
+        self.item = item
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+        self.children: list[Node] = []
+
+
+class TileIndex:
+    """Index of items with boxes, nested by depth as tile and group
+    records are (each item encloses the items that follow it with
+    greater depth).
+    """
+    def __init__(self, boxes: Sequence[Box], depths: Sequence[int]):
+        assert len(boxes) == len(depths), "Each box must have a depth"
+        self.root = Node(-1, *bounds(boxes))
+        open_items = [self.root]   # Item at each depth that may enclose the next
+        for item, (box, depth) in enumerate(zip(boxes, depths)):
+            assert 0 <= depth < len(open_items), f"Item {item} at depth {depth} is not enclosed"
+            del open_items[depth + 1:]
+            node = Node(item, *box)
+            open_items[-1].children.append(node)
+            open_items.append(node)
+        # Pack the parts of each node, without recursion:  treemaps may be deep
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+            nodes.extend(node.children)
+            node.children = pack(node.children, node)
+
+    @classmethod
+    def from_records(cls, records: Sequence) -> "TileIndex":
+        """Index of tiling.Tile and tiling.Group records"""
+        return cls([(r.x0, r.y0, r.x1, r.y1) for r in records],
+                   [r.depth for r in records])
+
+    def at(self, x: float, y: float) -> list[int]:
+        """Items whose boxes contain (x, y), outermost first.  A box
+        contains its lower edges but not its upper edges, so that a
+        point on the edge between two tiles is in only one of them.
+        """
+        found = []
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+            if node.item >= 0:
+                found.append(node.item)
+            for child in node.children:
+                if child.x0 <= x < child.x1 and child.y0 <= y < child.y1:
+                    nodes.append(child)
+        found.sort()   # Enclosing items come first
+        return found
+
+    def within(self, x0: float, y0: float, x1: float, y1: float,
+               min_size: float = 0) -> Iterator[int]:
+        """Items whose boxes overlap the region (x0, y0) to (x1, y1),
+        except those less than min_size wide or high.  Each group comes
+        before the items it encloses.
+        """
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+            if node.item >= 0:
+                yield node.item
+            for child in reversed(node.children):
+                if (child.x0 < x1 and x0 < child.x1 and child.y0 < y1 and y0 < child.y1
+                        and child.x1 - child.x0 >= min_size and child.y1 - child.y0 >= min_size):
+                    nodes.append(child)
+
+
+def bounds(boxes: Sequence[Box]) -> Box:
+    """Smallest box enclosing boxes"""
+    if not boxes:
+        return 0, 0, 0, 0
+    return (min(box[0] for box in boxes), min(box[1] for box in boxes),
+            max(box[2] for box in boxes), max(box[3] for box in boxes))
+
+
+def enclose(nodes: list[Node]) -> Node:
+    """A run of nodes, in a box enclosing them"""
+    run = Node(-1, min(node.x0 for node in nodes), min(node.y0 for node in nodes),
+               max(node.x1 for node in nodes), max(node.y1 for node in nodes))
+    run.children = pack(nodes, run)
+    return run
+
+
+def pack(nodes: list[Node], box: Node) -> list[Node]:
+    """At most FANOUT nodes enclosing nodes, which are within box,
+    as runs of neighbors along its longer side
+    """
+    if len(nodes) <= FANOUT:
+        return nodes
+    if box.x1 - box.x0 >= box.y1 - box.y0:
+        nodes = sorted(nodes, key=lambda node: node.x0 + node.x1)
+    else:
+        nodes = sorted(nodes, key=lambda node: node.y0 + node.y1)
+    size = -(-len(nodes) // FANOUT)
+    runs = []
+    for start in range(0, len(nodes), size):
+        run = nodes[start:start + size]
+        runs.append(run[0] if len(run) == 1 else enclose(run))
+    return runs
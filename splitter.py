@@ -0,0 +1,126 @@
+"""Balanced splitting of weighted lists, for treemap layout.
+
+Balanced bisection divides a list into a prefix and a suffix whose sums
+are as nearly equal as possible.  Summing slices at each candidate split
+point is quadratic in the length of the list, and repeating that at each
+level of recursive layout is worse.  Instead we compute the partial sums
+of a list once, after which
+
+  - the sum of any sub-range items[i:j] is partials[j] - partials[i], and
+  - the best split point of any sub-range can be found by binary search,
+    because partial sums of positive weights are increasing.
+
+Layout can then refer to sub-lists by (lo, hi) index range into the one
+list of partial sums, rather than copying slices.
+"""
+import doctest
+from bisect import bisect_left
+from itertools import accumulate
+
+Real = int | float    # Named type for use in type annotations
+Nest = Real | list['Nest'] | dict[str, 'Nest'] | tuple[str, 'Nest']
+
+
+def deep_sum(nest: Nest) -> Real:
+    """Returns the total of all numbers in the Nest.
+
+    >>> deep_sum(12)
+    12
+    >>> deep_sum([12, 13, 10])
+    35
+    >>> deep_sum([[7, 3], [1, [2, 7]], 10])
+    30
+    >>> deep_sum([[1.0, 2.0], [3, 4]])
+    10.0
+    >>> deep_sum({ "Cake": { "Chocolate": 10, "Carrot": 4 }, "Ice Cream": 15 })
+    29
+    """
+    if isinstance(nest, dict):
+        nest = list(nest.items())
+
+    if isinstance(nest, Real):
+        return nest
+    elif isinstance(nest, list):
+        return sum(deep_sum(item) for item in nest)
+    elif isinstance(nest, tuple):
+        label, value = nest
+        return deep_sum(value)
+    else:
+        assert False, f"Unanticipated type in deep_sum: {nest}"
+
+
+def partial_sums(weights: list[Real]) -> list[Real]:
+    """Running totals of weights, beginning with 0, so that
+    sum(weights[i:j]) == partials[j] - partials[i].
+
+    >>> partial_sums([3, 1, 4])
+    [0, 3, 4, 8]
+    >>> partial_sums([])
+    [0]
+    """
+    return list(accumulate(weights, initial=0))
+
+
+def split_index(partials: list[Real], lo: int, hi: int) -> int:
+    """Index m, lo < m < hi, such that the weights in [lo, m) and
+    in [m, hi) are as nearly balanced as possible, given the partial
+    sums of those weights.  Breaks ties in favor of the earlier split.
+    Requires hi - lo >= 2 and non-negative weights.
+    Time is logarithmic in hi - lo.
+
+    >>> split_index([0, 1, 2, 4], 0, 3)  # [1, 1, 2]: perfect balance
+    2
+    >>> split_index([0, 1, 3, 4], 0, 3)  # [1, 2, 1]: tie, split before pivot
+    1
+    >>> split_index([0, 6, 11, 15, 18, 20, 21], 0, 6)  # [6, 5, 4, 3, 2, 1]
+    2
+    >>> split_index([0, 6, 11, 15, 18, 20, 21], 2, 6)  # [4, 3, 2, 1]
+    3
+    """
+    assert hi - lo >= 2, f"Cannot split range [{lo}, {hi}); length must be at least 2"
+    base = partials[lo]
+    target = (partials[hi] - base) / 2
+    # First candidate whose prefix reaches the target; the best split
+    # is either there or just before it.
+    m = bisect_left(partials, base + target, lo + 1, hi - 1)
+    if m > lo + 1:
+        before = abs(partials[m - 1] - base - target)
+        after = abs(partials[m] - base - target)
+        if before <= after:
+            # Earliest index with the same partial sum (zero weights)
+            m = bisect_left(partials, partials[m - 1], lo + 1, m - 1)
+    return m
+
+
+def bisect(li: list[Nest]) -> tuple[list[Nest], list[Nest]]:
+    """Returns (prefix, suffix) such that prefix+suffix == li
+    and abs(deep_sum(prefix) - deep_sum(suffix)) is minimal.
+    Breaks tie in favor of earlier split, e.g., bisect([1,5,1]) == ([1], [5, 1]).
+    Requires len(li) >= 2, and all elements of li positive.
+
+    >>> bisect([1, 1, 2])  # Perfect balance
+    ([1, 1], [2])
+    >>> bisect([1.5, 1.5, 3.0])  # Similar, works with floats
+    ([1.5, 1.5], [3.0])
+    >>> bisect([2.0, 1, 1.0])  # Perfect balance, mixed
+    ([2.0], [1, 1.0])
+    >>> bisect([1, 2, 1])  # Equally bad either way; split before pivot
+    ([1], [2, 1])
+    >>> bisect([6, 5, 4, 3, 2, 1])  # Must include element at split
+    ([6, 5], [4, 3, 2, 1])
+    >>> bisect([1, 2, 3, 4, 5])
+    ([1, 2, 3], [4, 5])
+    >>> bisect([1, 1, [1, 1]])
+    ([1, 1], [[1, 1]])
+    >>> bisect([[3, 3], 5, [2, 2], [1, 1, 1]])
+    ([[3, 3], 5], [[2, 2], [1, 1, 1]])
+    """
+    assert isinstance(li, list), f"bisect is only for lists, can't split {li}"
+    assert len(li) >= 2, f"Cannot bisect {li}; length must be at least 2"
+    partials = partial_sums([deep_sum(item) for item in li])
+    m = split_index(partials, 0, len(li))
+    return li[:m], li[m:]
+
+
+if __name__ == "__main__":
+    doctest.testmod()
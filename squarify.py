@@ -0,0 +1,106 @@
+"""Squarified tiling of a rectangle, after Bruls, Huizing, and van Wijk,
+"Squarified Treemaps" (2000).
+
+Weights, from largest to smallest, are placed in rows along the
+shorter side of the remaining rectangle.  A row grows while adding the
+next weight does not make its worst aspect ratio worse;  then the row
+is cut off as a strip and we continue with the rest of the rectangle.
+
+The worst aspect ratio of a row with total area s, smallest area
+r_min and largest area r_max, along a side of length w, is
+
+    max(w² r_max / s², s² / (w² r_min))
+
+so keeping running totals s, r_min, and r_max as each weight is added
+evaluates each candidate row in constant time, rather than re-scanning
+the row.
+"""
+from collections.abc import Iterable
+import doctest
+
+import geometry
+from splitter import Real
+
+
+def squarify(weights: list[Real], rect: geometry.Rect) -> geometry.RectArray:
+    """Tiles for weights that together fill rect, each with area roughly
+    proportional to its weight.  Weights must be positive, and should be
+    in decreasing order for the squarest tiles.
+
+    >>> canvas = geometry.Rect(geometry.Point(0, 0), geometry.Point(600, 400))
+    >>> for tile in squarify([6, 6, 4, 3, 2, 2, 1], canvas):
+    ...     print(tile)
+    Rect((0, 0), (300, 200))
+    Rect((0, 200), (300, 400))
+    Rect((300, 0), (471, 233))
+    Rect((471, 0), (600, 233))
+    Rect((300, 233), (420, 400))
+    Rect((420, 233), (540, 400))
+    Rect((540, 233), (600, 400))
+    """
+    tiles = geometry.RectArray()
+    remaining = sum(weights)
+    start = 0
+    while start < len(weights):
+        end = row_end(weights, start, remaining, rect)
+        row = weights[start:end]
+        row_weight = sum(row)
+        # The row lies along the shorter side, as does the strip
+        # that Rect.split cuts across the longer side.
+        along_x = rect.height() > rect.width()
+        if end < len(weights):
+            strip, rect = rect.split(row_weight / remaining)
+        else:
+            strip = rect
+        tiles.extend(strip.strips(row, along_x))   # The whole row at once
+        remaining -= row_weight
+        start = end
+    return tiles
+
+
+def row_end(weights: list[Real], start: int, remaining: Real, rect: geometry.Rect) -> int:
+    """End (exclusive) of the row beginning at weights[start], laid along
+    the shorter side of rect, where remaining is the total weight still
+    to be placed in rect.
+    """
+    side = min(rect.width(), rect.height())
+    if side <= 0 or remaining <= 0:
+        return len(weights)   # Nothing will be visible; finish in one row
+    scale = rect.width() * rect.height() / remaining   # Area per unit weight
+    side_squared = side * side
+    area = weights[start] * scale
+    total, smallest, largest = area, area, area
+    worst = max(side_squared * largest / (total * total),
+                (total * total) / (side_squared * smallest))
+    end = start + 1
+    while end < len(weights):
+        area = weights[end] * scale
+        with_total = total + area
+        with_smallest = min(smallest, area)
+        with_largest = max(largest, area)
+        with_worst = max(side_squared * with_largest / (with_total * with_total),
+                         (with_total * with_total) / (side_squared * with_smallest))
+        if with_worst > worst:
+            break
+        total, smallest, largest, worst = with_total, with_smallest, with_largest, with_worst
+        end += 1
+    return end
+
+
+def worst_aspect(tiles: Iterable[geometry.Rect]) -> float:
+    """Largest ratio of longer to shorter side among tiles with area.
+    A measure of how far from square a layout is.
+
+    >>> worst_aspect([geometry.Rect(geometry.Point(0, 0), geometry.Point(4, 2))])
+    2.0
+    """
+    worst = 1.0
+    for tile in tiles:
+        width, height = tile.width(), tile.height()
+        if width > 0 and height > 0:
+            worst = max(worst, width / height, height / width)
+    return worst
+
+
+if __name__ == "__main__":
+    doctest.testmod()
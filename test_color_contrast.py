@@ -0,0 +1,58 @@
+"""Unit tests for color_contrast.py"""
+
+import unittest
+import random
+
+import color_contrast
+from color_contrast import Palette, brightness, contrast, BLACK_BRIGHT, WHITE_BRIGHT
+
+
+def rgb(code: str) -> tuple[int, int, int]:
+    return int(code[1:3], 16), int(code[3:5], 16), int(code[5:7], 16)
+
+
+class TestPalette(unittest.TestCase):
+
+    def test_same_colors_as_sampling(self):
+        """Exactly the colors sampled_color would accept, at each level"""
+        for levels, min_contrast in [(16, 7.0), (24, 4.5)]:
+            palette = Palette(levels, min_contrast)
+            expected = {}
+            for r in palette.values:
+                for g in palette.values:
+                    for b in palette.values:
+                        luma = brightness(r, g, b)
+                        if contrast(luma, BLACK_BRIGHT) >= min_contrast:
+                            expected[f"#{r:02x}{g:02x}{b:02x}"] = "black"
+                        elif contrast(WHITE_BRIGHT, luma) >= min_contrast:
+                            expected[f"#{r:02x}{g:02x}{b:02x}"] = "white"
+            colors = dict(palette.color(i) for i in range(len(palette)))
+            self.assertEqual(len(colors), len(palette))
+            self.assertEqual(colors, expected)
+
+    def test_next_color(self):
+        random.seed(210)
+        for _ in range(1000):
+            fill, label = color_contrast.next_color()
+            luma = brightness(*rgb(fill))
+            if label == "black":
+                self.assertGreaterEqual(contrast(luma, BLACK_BRIGHT), 7.0)
+            else:
+                self.assertGreaterEqual(contrast(WHITE_BRIGHT, luma), 7.0)
+
+    def test_key_color(self):
+        palette = Palette()
+        colors = {color_contrast.key_color(f"k{i}") for i in range(1000)}
+        self.assertLess(900, len(colors))
+        self.assertLessEqual(colors, {palette.color(i) for i in range(len(palette))})
+        self.assertEqual(color_contrast.key_color("k", "1"), color_contrast.key_color("k", "1"))
+        self.assertNotEqual(color_contrast.key_color("k", "1"), color_contrast.key_color("k", "2"))
+
+    def test_extremes(self):
+        palette = Palette()
+        self.assertEqual(palette.color(len(palette.black) - 1), ("#ffffff", "black"))
+        self.assertEqual(palette.color(len(palette.black)), ("#000000", "white"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Unit tests for display_list.py"""
+
+import unittest
+import io
+import json
+import random
+
+import display
+import display_list
+import tiling
+from graphics import display_options
+
+
+class TestDisplayList(unittest.TestCase):
+
+    def setUp(self):
+        with open("data/Howto-examples/majors-23F.json") as f:
+            self.nest = json.load(f)
+        self.records = tiling.compute_tiles(self.nest, 800, 600)
+
+    def recorded(self) -> display_list.DisplayList:
+        recorder = display_list.DisplayList(800, 600)
+        tiling.render(self.records, recorder)
+        return recorder
+
+    def test_same_records(self):
+        """Replayed through a save, the same operations as the layout"""
+        replayed = tiling.TileRecorder()
+        display_list.loads(self.recorded().dumps()).replay(replayed)
+        self.assertEqual(replayed.records, self.records)
+
+    def test_numbers_and_labels(self):
+        """Numbers without labels, and values equal but of different types"""
+        records = tiling.compute_tiles([1, 1.0, ("one", 1), ("one", 1.0), True], 100, 100)
+        recorder = display_list.DisplayList(100, 100)
+        tiling.render(records, recorder)
+        replayed = tiling.TileRecorder()
+        display_list.loads(recorder.dumps()).replay(replayed)
+        self.assertEqual([(r.label, repr(r.value)) for r in replayed.records],
+                         [(r.label, repr(r.value)) for r in records])
+
+    def test_same_svg(self):
+        def svg(draw) -> str:
+            random.seed(210)
+            out = io.StringIO()
+            context = display.RenderContext(display_options.Options())
+            context.init(800, 600, out, ["svg"])
+            with self.assertLogs("display", "INFO"):
+                draw(context)
+                context.wait_close()
+            return out.getvalue()
+        recorded = display_list.loads(self.recorded().dumps())
+        self.assertEqual(svg(recorded.replay), svg(lambda canvas: tiling.render(self.records, canvas)))
+
+    def test_damaged(self):
+        import marshal
+        data = self.recorded().dumps()
+        missing_tile = marshal.dumps((display_list.FORMAT, 10, 10, b"\x00", b"", b"", [None]))
+        unhashable = marshal.dumps((display_list.FORMAT, 10, 10, b"", b"", b"", [None, [1, 2]]))
+        for damaged in [data[:len(data) // 2], b"", b"\x00" * 10, missing_tile, unhashable]:
+            with self.assertRaises(ValueError):
+                display_list.loads(damaged)
+
+
+if __name__ == "__main__":
+    unittest.main()
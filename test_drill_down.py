@@ -0,0 +1,88 @@
+"""Unit tests for drill_down.py"""
+
+import unittest
+import random
+
+import tiling
+import weighted_tree
+from drill_down import DrillDown
+from tiling import Tile, Group
+
+
+class TestDrillDown(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(25)
+        self.nest = {f"g{i}": {f"h{i}{j}": [(f"k{i}{j}{k}", random.randint(1, 50)) for k in range(6)]
+                               for j in range(4)}
+                     for i in range(5)}
+        self.tree = weighted_tree.WeightedTree.from_nest(self.nest)
+        self.drill = DrillDown(self.tree, 800, 600)
+
+    def groups(self, records) -> list[int]:
+        return [i for i, record in enumerate(records) if isinstance(record, Group)]
+
+    def test_whole_tree(self):
+        records = tiling.compute_tiles(self.nest, 800, 600)
+        self.assertEqual(self.drill.records(), records)
+        given = DrillDown(self.tree, 800, 600, records=records)
+        self.assertIs(given.records(), records)
+
+    def test_fills_canvas(self):
+        """Each group is laid out in the whole canvas, within the groups enclosing it"""
+        top = self.drill.records()
+        for i in self.groups(top):
+            group = self.drill.child(None, i)
+            self.assertEqual(self.tree.labels[group], top[i].label)
+            records = self.drill.records(group)
+            depth = self.drill.depth(group)
+            self.assertEqual(depth, top[i].depth + 1)
+            outer = records[:depth]
+            self.assertEqual([r.label for r in outer], list(top[i].group) + [top[i].label])
+            self.assertTrue(all((r.x0, r.y0, r.x1, r.y1) == (0, 0, 800, 600) for r in outer))
+            tiles = [r for r in records if isinstance(r, Tile)]
+            self.assertEqual(sum((t.x1 - t.x0) * (t.y1 - t.y0) for t in tiles), 800 * 600)
+            self.assertEqual(sorted(t.label for t in tiles),
+                             sorted(t.label for t in top if isinstance(t, Tile)
+                                    and t.group[:depth] == outer[-1].group + (outer[-1].label,)))
+
+    def test_down_and_up(self):
+        """A group within a group, and the same views again without layout"""
+        top = self.drill.records()
+        outer = self.drill.child(None, self.groups(top)[0])
+        view = self.drill.records(outer)
+        inner = self.drill.child(outer, self.groups(view)[-1])
+        self.assertEqual(self.drill.depth(inner), 2)
+        self.assertIsNone(self.drill.child(outer, len(view) - 1))   # A tile
+        self.assertIs(self.drill.records(outer), view)
+        replay = tiling.TileRecorder()
+        self.drill.render(inner, replay)
+        self.assertEqual(replay.records, self.drill.records(inner))
+
+    def test_same_looking_groups(self):
+        """Sibling groups with the same label and value are told apart,
+        though squarify places them out of the order of the tree
+        """
+        nest = [[{"a": [("x", 1)]}], [{"a": [("y", 1)]}, {"b": [("z", 5)]}]]
+        tree = weighted_tree.WeightedTree.from_nest(nest)
+        for algorithm in tiling.ALGORITHMS:
+            drill = DrillDown(tree, 400, 300, algorithm)
+            top = drill.records()
+            for i in self.groups(top):
+                inner = [r.label for r in drill.records(drill.child(None, i)) if isinstance(r, Tile)]
+                self.assertEqual(inner, [top[i + 1].label], algorithm)
+
+    def test_least_recently_used(self):
+        drill = DrillDown(self.tree, 800, 600, capacity=2)
+        top = drill.records()
+        first, second = [drill.child(None, i) for i in self.groups(top)[:2]]
+        kept = drill.records(first)
+        drill.records(second)
+        drill.records()   # Evicts first, least recently used
+        self.assertEqual(list(drill.layouts), [second, self.tree.root])
+        self.assertIsNot(drill.records(first), kept)
+        self.assertEqual(drill.records(first), kept)
+
+
+if __name__ == "__main__":
+    unittest.main()
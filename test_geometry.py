@@ -0,0 +1,44 @@
+"""Unit tests for geometry.py"""
+
+import unittest
+
+from geometry import Point, Rect, RectArray
+
+
+class TestStrips(unittest.TestCase):
+
+    def test_strips_fill_rect(self):
+        r = Rect(Point(5, 10), Point(105, 17))
+        strips = r.strips([0.5, 0.25, 0.125, 0.125])
+        self.assertEqual(list(strips.boxes()),
+                         [(5, 10, 55, 17), (55, 10, 80, 17), (80, 10, 92, 17), (92, 10, 105, 17)])
+
+    def test_across_longer_side(self):
+        r = Rect(Point(0, 0), Point(10, 30))
+        self.assertEqual(list(r.strips([1, 2]).boxes()), [(0, 0, 10, 10), (0, 10, 10, 30)])
+        self.assertEqual(list(r.strips([1, 2], along_x=True).boxes()), [(0, 0, 3, 30), (3, 0, 10, 30)])
+
+    def test_agrees_with_split(self):
+        r = Rect(Point(0, 0), Point(640, 480))
+        left, right = r.split(0.3)
+        strips = r.strips([0.3, 0.7])
+        self.assertEqual([str(s) for s in strips], [str(left), str(right)])
+
+
+class TestRectArray(unittest.TestCase):
+
+    def test_append_and_index(self):
+        rects = RectArray()
+        rects.append(Rect(Point(1, 2), Point(3, 4)))
+        rects.extend(Rect(Point(0, 0), Point(4, 4)).strips([1, 1]))
+        self.assertEqual(len(rects), 3)
+        self.assertEqual(str(rects[0]), "Rect((1, 2), (3, 4))")
+        self.assertEqual([r.width() for r in rects], [2, 2, 2])
+
+    def test_compact(self):
+        with self.assertRaises(AttributeError):
+            Point(1, 2).z = 3
+
+
+if __name__ == "__main__":
+    unittest.main()
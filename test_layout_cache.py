@@ -0,0 +1,81 @@
+"""Unit tests for layout_cache.py"""
+
+import unittest
+import json
+import os
+import tempfile
+
+import tiling
+from layout_cache import LayoutCache
+
+
+class TestLayoutCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = LayoutCache(self.directory.name)
+        with open("data/Howto-examples/majors-23F.json") as f:
+            self.nest = json.load(f)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def entries(self) -> list[str]:
+        return sorted(os.listdir(self.directory.name))
+
+    def test_same_records(self):
+        for algorithm in tiling.ALGORITHMS:
+            expected = tiling.compute_tiles(self.nest, 640, 480, algorithm)
+            saved = tiling.compute_tiles(self.nest, 640, 480, algorithm, cache=self.cache, threshold=2)
+            loaded = tiling.compute_tiles(self.nest, 640, 480, algorithm, cache=self.cache, threshold=2)
+            self.assertEqual(saved, expected)
+            self.assertEqual(loaded, expected)
+
+    def test_keyed_by_size(self):
+        tiling.compute_tiles(self.nest, 640, 480, cache=self.cache)
+        self.assertEqual(len(self.entries()), 1)
+        tiling.compute_tiles(self.nest, 640, 480, cache=self.cache)
+        self.assertEqual(len(self.entries()), 1)
+        tiling.compute_tiles(self.nest, 480, 640, cache=self.cache)
+        self.assertEqual(len(self.entries()), 2)
+
+    def test_shared_subtree(self):
+        """A subtree in a rectangle of the same size is reused elsewhere"""
+        part = {"a": [1, 2, 3], "b": {"c": 4, "d": 5}}
+        tiling.compute_tiles({"x": part, "y": part}, 200, 100, cache=self.cache, threshold=2)
+        before = set(self.entries())
+        # Another nest with the same part at the same size, on the other side
+        records = tiling.compute_tiles({"z": {"w": 15}, "y": part}, 200, 100,
+                                       cache=self.cache, threshold=2)
+        self.assertEqual(records, tiling.compute_tiles({"z": {"w": 15}, "y": part}, 200, 100))
+        self.assertEqual(len(set(self.entries()) - before), 2)   # Whole nest and "z"
+
+    def test_eviction(self):
+        self.cache.limit = 0
+        tiling.compute_tiles(self.nest, 640, 480, cache=self.cache)
+        self.assertEqual(self.entries(), [])
+
+    def test_evicted_once(self):
+        """The cache is trimmed once per layout, not once per entry saved"""
+        evictions = []
+        evict = self.cache.evict
+        self.cache.evict = lambda: evictions.append(evict())
+        tiling.compute_tiles(self.nest, 640, 480, cache=self.cache, threshold=2)
+        self.assertGreater(len(self.entries()), 1)
+        self.assertEqual(len(evictions), 1)
+        tiling.compute_tiles(self.nest, 640, 480, cache=self.cache, threshold=2)
+        self.assertEqual(len(evictions), 1)   # Loaded, nothing saved
+        self.assertFalse([name for name in self.entries() if name.endswith(".tmp")])
+
+    def test_damaged_entry(self):
+        tiling.compute_tiles(self.nest, 640, 480, cache=self.cache)
+        for name in self.entries():
+            with open(os.path.join(self.directory.name, name), "wb") as f:
+                f.write(b"not a layout")
+        with self.assertLogs("layout_cache", "WARNING"):
+            records = tiling.compute_tiles(self.nest, 640, 480, cache=self.cache)
+        self.assertEqual(records, tiling.compute_tiles(self.nest, 640, 480))
+
+
+if __name__ == "__main__":
+    unittest.main()
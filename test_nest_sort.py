@@ -0,0 +1,34 @@
+"""Unit tests for extensions/nest_sort.py and its command-line driver"""
+
+import unittest
+import json
+import pathlib
+import subprocess
+import sys
+import tempfile
+
+DRIVER = pathlib.Path(__file__).resolve().parent / "extensions" / "json_nest_sort.py"
+
+
+class TestJsonNestSort(unittest.TestCase):
+
+    def sort(self, nest, cwd: str | None = None):
+        """nest as sorted by the driver run as a script, as scripts/ run it"""
+        result = subprocess.run([sys.executable, str(DRIVER)], input=json.dumps(nest),
+                                capture_output=True, text=True, cwd=cwd)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return json.loads(result.stdout)
+
+    def test_from_project_root(self):
+        nest = {"Cake": {"Chocolate": 4, "Carrot": 10}, "Ice Cream": 15}
+        self.assertEqual(list(self.sort(nest, cwd=DRIVER.parent.parent).items()),
+                         [("Ice Cream", 15), ("Cake", {"Carrot": 10, "Chocolate": 4})])
+
+    def test_from_elsewhere(self):
+        with tempfile.TemporaryDirectory() as elsewhere:
+            self.assertEqual(self.sort([[1, 2], [3, [4, 5]]], cwd=elsewhere),
+                             [[[5, 4], 3], [2, 1]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+"""Unit tests for relayout.py"""
+
+import unittest
+import json
+
+import tiling
+from relayout import Layout
+
+
+class TestRelayout(unittest.TestCase):
+
+    def setUp(self):
+        with open("data/Howto-examples/majors-23F.json") as f:
+            self.nest = json.load(f)
+
+    def test_same_as_full_layout(self):
+        for algorithm in tiling.ALGORITHMS:
+            layout = Layout(self.nest, 800, 600, algorithm)
+            self.assertEqual(layout.records(), tiling.compute_tiles(self.nest, 800, 600, algorithm))
+
+    def test_update(self):
+        for algorithm in tiling.ALGORITHMS:
+            nest = json.loads(json.dumps(self.nest))
+            layout = Layout(nest, 800, 600, algorithm)
+            before = set(layout.records())
+            changes = {("Business", "PBA"): 11, ("Business", "ACTG"): 0}
+            moved = layout.update(changes)
+            nest["Business"]["PBA"] = 11
+            nest["Business"]["ACTG"] = 0
+            after = layout.records()
+            self.assertEqual(after, tiling.compute_tiles(nest, 800, 600, algorithm))
+            self.assertTrue(set(after) - before <= set(moved))
+            self.assertLess(len(moved), len(after))
+
+    def test_unchanged_stays(self):
+        layout = Layout([[1, 2], [2, 1]], 100, 100)
+        moved = layout.update({(1, 0): 1, (1, 1): 2})
+        # Only the second list, with the same total, is laid out again
+        self.assertEqual(moved, tiling.compute_tiles([[1, 2], [1, 2]], 100, 100)[2:])
+
+    def test_bad_path(self):
+        layout = Layout({"a": [1, 2]}, 100, 100)
+        with self.assertRaises(AssertionError):
+            layout.update({("a", 5): 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""Unit tests for spatial_index.py"""
+
+import unittest
+import json
+import random
+
+import tiling
+from spatial_index import TileIndex
+
+
+class TestTileIndex(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(24)
+        nest = {f"g{i}": {f"h{j}": {f"k{k}": random.randint(1, 100) for k in range(30)}
+                          for j in range(i + 1)}
+                for i in range(12)}
+        with open("data/Howto-examples/majors-23F.json") as f:
+            nest["majors"] = json.load(f)
+        self.records = tiling.compute_tiles(nest, 1000, 700)
+        self.index = TileIndex.from_records(self.records)
+
+    def test_at(self):
+        """The tile under a point and its groups, as by looking at every record"""
+        for _ in range(500):
+            x, y = random.uniform(0, 1000), random.uniform(0, 700)
+            expected = [i for i, r in enumerate(self.records)
+                        if r.x0 <= x < r.x1 and r.y0 <= y < r.y1]
+            found = self.index.at(x, y)
+            self.assertEqual(found, expected)
+            self.assertIsInstance(self.records[found[-1]], tiling.Tile)
+            self.assertEqual(tuple(self.records[i].label for i in found[:-1]),
+                             self.records[found[-1]].group)
+
+    def test_edges(self):
+        corner = self.records[self.index.at(0, 0)[-1]]
+        self.assertEqual((corner.x0, corner.y0), (0, 0))
+        self.assertEqual(self.index.at(1000, 350), [])
+
+    def test_within(self):
+        for _ in range(100):
+            x0, y0 = random.uniform(-100, 1000), random.uniform(-100, 700)
+            x1, y1 = x0 + random.uniform(0, 300), y0 + random.uniform(0, 300)
+            min_size = random.choice([0, 1, 4, 20])
+            expected = [i for i, r in enumerate(self.records)
+                        if r.x0 < x1 and x0 < r.x1 and r.y0 < y1 and y0 < r.y1
+                        and r.x1 - r.x0 >= min_size and r.y1 - r.y0 >= min_size]
+            found = list(self.index.within(x0, y0, x1, y1, min_size))
+            self.assertEqual(sorted(found), expected)
+
+    def test_groups_first(self):
+        """Records within a region can be rendered as they are found"""
+        replay = tiling.TileRecorder()
+        tiling.render([self.records[i] for i in self.index.within(0, 0, 1000, 700)], replay)
+        self.assertEqual(sorted(replay.records, key=self.records.index), self.records)
+
+    def test_deep(self):
+        nest = 1
+        for depth in range(200):
+            nest = {f"d{depth}": nest, "other": 1}
+        records = tiling.compute_tiles(nest, 4000, 4000)
+        index = TileIndex.from_records(records)
+        deepest = max(range(len(records)), key=lambda i: records[i].depth)
+        found = index.at(records[deepest].x0, records[deepest].y0)
+        self.assertEqual(found[-1], deepest)
+        self.assertEqual(len(found), records[deepest].depth + 1)
+        self.assertEqual(records[deepest].depth, 199)
+
+
+if __name__ == "__main__":
+    unittest.main()
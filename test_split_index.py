@@ -0,0 +1,75 @@
+"""Unit tests for prefix-sum splitting in splitter.py.
+Binary search over partial sums must choose exactly the split
+that the straightforward scan for minimum badness would choose.
+"""
+
+import unittest
+import random
+import time
+
+from splitter import partial_sums, split_index, bisect
+
+import logging
+logging.basicConfig()
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+
+def scan_bisect(li: list[int]) -> tuple[list[int], list[int]]:
+    """Reference version: scan every split point for minimum badness."""
+    target = sum(li) / 2
+    best_index = 1
+    best_badness = abs(sum(li[:1]) - target)
+    for i in range(2, len(li)):
+        badness = abs(sum(li[:i]) - target)
+        if badness < best_badness:
+            best_index, best_badness = i, badness
+    return li[:best_index], li[best_index:]
+
+
+class TestSplitIndex(unittest.TestCase):
+
+    def test_matches_scan(self):
+        rng = random.Random(210)
+        for trial in range(500):
+            li = [rng.randint(1, 20) for _ in range(rng.randint(2, 30))]
+            self.assertEqual(bisect(li), scan_bisect(li), f"bisecting {li}")
+
+    def test_matches_scan_subranges(self):
+        """Splitting a sub-range of the partial sums is the same as
+        splitting a slice of the list.
+        """
+        rng = random.Random(161)
+        for trial in range(200):
+            li = [rng.choice([1, 1, 2, 3, 50]) for _ in range(rng.randint(2, 40))]
+            partials = partial_sums(li)
+            lo = rng.randint(0, len(li) - 2)
+            hi = rng.randint(lo + 2, len(li))
+            prefix, suffix = scan_bisect(li[lo:hi])
+            self.assertEqual(split_index(partials, lo, hi), lo + len(prefix))
+
+    def test_zero_weights_split_early(self):
+        # [1, 0, 0, 1]: all three splits are equally balanced
+        self.assertEqual(split_index(partial_sums([1, 0, 0, 1]), 0, 4), 1)
+
+    def test_fast_enough(self):
+        """A whole balanced layout of many items should be n log n:
+        each split is a binary search, not a scan.
+        """
+        a_lot = 200_000
+        partials = partial_sums([1] * a_lot)
+        begin_time = time.time()
+        ranges = [(0, a_lot)]
+        while ranges:
+            lo, hi = ranges.pop()
+            if hi - lo >= 2:
+                mid = split_index(partials, lo, hi)
+                ranges.append((lo, mid))
+                ranges.append((mid, hi))
+        elapsed = time.time() - begin_time
+        log.debug(f"Splitting {a_lot} items down to singletons in {elapsed} seconds")
+        self.assertLess(elapsed, 5.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
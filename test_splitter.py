@@ -2,7 +2,7 @@
 
 import unittest
 import time  # To distinguish linear-time from quadratic time solutions
-from mapper import bisect
+from splitter import bisect
 
 import logging
 logging.basicConfig()
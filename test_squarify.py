@@ -0,0 +1,46 @@
+"""Unit tests for squarify.py"""
+
+import unittest
+import random
+
+import geometry
+from squarify import squarify, worst_aspect, row_end
+
+
+def canvas(width: int, height: int) -> geometry.Rect:
+    return geometry.Rect(geometry.Point(0, 0), geometry.Point(width, height))
+
+
+class TestSquarify(unittest.TestCase):
+
+    def test_single(self):
+        tiles = squarify([5], canvas(300, 200))
+        self.assertEqual([str(tile) for tile in tiles], ["Rect((0, 0), (300, 200))"])
+
+    def test_tiles_fill_canvas(self):
+        rng = random.Random(210)
+        for trial in range(100):
+            weights = sorted((rng.randint(1, 100) for _ in range(rng.randint(1, 60))), reverse=True)
+            tiles = squarify(weights, canvas(640, 480))
+            self.assertEqual(len(tiles), len(weights))
+            self.assertEqual(sum(tile.width() * tile.height() for tile in tiles), 640 * 480)
+            for tile in tiles:
+                self.assertTrue(0 <= tile.ll.x <= tile.ur.x <= 640)
+                self.assertTrue(0 <= tile.ll.y <= tile.ur.y <= 480)
+
+    def test_row_grows_while_squarer(self):
+        # Bruls et al. example: 6, 6 form the first row on a 6 x 4 canvas
+        self.assertEqual(row_end([6, 6, 4, 3, 2, 2, 1], 0, 24, canvas(6, 4)), 2)
+
+    def test_squarer_than_slices(self):
+        weights = [1] * 100
+        tiles = squarify(weights, canvas(1000, 1000))
+        self.assertLess(worst_aspect(tiles), 2.0)
+
+    def test_degenerate_canvas(self):
+        tiles = squarify([3, 2, 1], canvas(0, 100))
+        self.assertEqual(len(tiles), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,238 @@
+"""Streaming SVG output (display.stream_svg) without Tk"""
+
+import unittest
+import io
+import json
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+
+import tiling
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+class CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        return super().write(text)
+
+
+class TestSvgWriter(unittest.TestCase):
+
+    def test_few_large_writes(self):
+        from graphics.svg_display import SvgWriter
+        out = CountingStream()
+        writer = SvgWriter(out, size=1000)
+        for i in range(1000):
+            writer.write(f"<g id='{i}'/>")
+        writer.flush()
+        self.assertEqual(out.getvalue(), "".join(f"<g id='{i}'/>" for i in range(1000)))
+        self.assertLess(out.writes, 20)
+
+    def test_content_is_written_buffer(self):
+        import display
+        display.init(200, 100, backends=["svg"])
+        with self.assertLogs("display", "INFO"):   # When finished
+            tiling.render(tiling.compute_tiles({"a": [1, 2], "b": 3}, 200, 100), display)
+            display.wait_close()
+        out = CountingStream()
+        display.write_svg(out)
+        self.assertEqual(out.getvalue(), display.svg_content())
+        self.assertEqual(out.writes, 1)
+        ET.fromstring(out.getvalue())
+
+    def test_svg_backend_only(self):
+        """An SVG-only display never imports Tk"""
+        program = ("import sys, display, tiling; "
+                   "display.init(20, 10, backends=['svg']); "
+                   "tiling.render(tiling.compute_tiles({'a': [1, 2]}, 20, 10), display); "
+                   "display.wait_close(); "
+                   "sys.exit('tkinter' in sys.modules or '<rect' not in display.svg_content())")
+        self.assertEqual(subprocess.run([sys.executable, "-c", program],
+                                        capture_output=True).returncode, 0)
+
+
+
+class TestStreamSvg(unittest.TestCase):
+
+    def setUp(self):
+        from graphics import display_options
+        display_options.color_scheme.clear()   # Colors are generated again
+
+    def test_without_tk(self):
+        program = ("import io, sys, display, tiling; "
+                   "display.stream_svg(tiling.iter_tiles([1, 2], 10, 10), io.StringIO(), 10, 10); "
+                   "sys.exit('tkinter' in sys.modules)")
+        self.assertEqual(subprocess.run([sys.executable, "-c", program],
+                                        capture_output=True).returncode, 0)
+
+    def test_document(self):
+        import display
+        with open("data/Howto-examples/majors-23F.json") as f:
+            nest = json.load(f)
+        out = io.StringIO()
+        with self.assertLogs("display", "INFO"):   # Colors are generated
+            display.stream_svg(tiling.iter_tiles(nest, 800, 600), out, 800, 600)
+        svg = ET.fromstring(out.getvalue())
+        records = tiling.compute_tiles(nest, 800, 600)
+        self.assertEqual(len(svg.findall(f".//{SVG}rect")), len(records))
+        self.assertEqual(len(svg.findall(f"./{SVG}g")), len([r for r in records if r.depth == 0]))
+        # Generated colors follow the tiles that use them, each once
+        rules = svg.findall(f"{SVG}defs/{SVG}style")[-1].text.split("\n")
+        rules = [rule for rule in rules if rule]
+        self.assertEqual(len(rules), len(set(rules)))
+        # Majors inherit the color of their college, named for the college
+        self.assertIn(".Business  { fill:", out.getvalue())
+        self.assertNotIn(".ACTG  { fill:", out.getvalue())
+        classes = {name for rect in svg.iter(f"{SVG}rect")
+                   for name in rect.get("class", "").split()}
+        defined = {rule.split()[0].lstrip(".") for rule in rules if rule.startswith(".")}
+        self.assertLessEqual(defined, classes)
+
+    def test_rules_per_color(self):
+        """Many tiles in one inherited color share one pair of rules"""
+        import display
+        nest = {"group": [(f"key{i}", 1) for i in range(100)]}
+        out = io.StringIO()
+        with self.assertLogs("display", "INFO"):
+            display.stream_svg(tiling.iter_tiles(nest, 800, 600), out, 800, 600)
+        style = ET.fromstring(out.getvalue()).findall(f"{SVG}defs/{SVG}style")[-1].text
+        self.assertEqual([rule.split()[0] for rule in style.split("\n") if rule],
+                         [".group", "text.group"])
+
+    def test_one_log_line(self):
+        """Keys without colors are reported together"""
+        import display
+        nest = {f"group{i}": [(f"key{i}_{j}", 1) for j in range(20)] for i in range(30)}
+        with self.assertLogs("display", "INFO") as logged:
+            display.stream_svg(tiling.iter_tiles(nest, 800, 600), io.StringIO(), 800, 600)
+        self.assertEqual(len(logged.output), 1)
+        self.assertIn("30 keys (group0, group1,", logged.output[0])
+
+    def test_compact(self):
+        import display
+        from graphics import display_options
+        with open("data/Howto-examples/majors-23F.json") as f:
+            nest = json.load(f)
+        outputs = {}
+        for compact in [False, True]:
+            display_options.compact = compact
+            display_options.color_scheme.clear()
+            out = io.StringIO()
+            try:
+                with self.assertLogs("display", "INFO"):
+                    display.stream_svg(tiling.iter_tiles(nest, 800, 600), out, 800, 600)
+            finally:
+                display_options.compact = False
+            outputs[compact] = out.getvalue()
+        self.assertLess(len(outputs[True]), len(outputs[False]) * 0.6)
+        self.assertNotIn("\n  ", outputs[True])
+        svg = ET.fromstring(outputs[True])
+        records = tiling.compute_tiles(nest, 800, 600)
+        self.assertEqual(len(svg.findall(f".//{SVG}rect")), len(records))
+        # Each tile has either a visible label or a tool tip, not both
+        for tile in svg.iter(f"{SVG}g"):
+            if "group" not in tile.get("class").split():
+                self.assertEqual(len(tile.findall(f"{SVG}text") + tile.findall(f"{SVG}title")), 1)
+
+    def test_compact_styled_labels(self):
+        """Rules of a style sheet for labels, e.g., text.fungi, apply in compact SVG"""
+        import display
+        from graphics import display_options
+        with open("data/Biomass/ocean-biomass.json") as f:
+            nest = json.load(f)
+        with open("data/Biomass/ocean-style.css") as f:
+            css = f.readlines()
+        out = io.StringIO()
+        context = display.RenderContext(display_options.Options(css=css, compact=True))
+        context.stream_svg(tiling.iter_tiles(nest, 800, 600), out, 800, 600)
+        self.assertIn("text.fungi {fill: black; }", out.getvalue())
+        labels = {text.text: text.get("class").split()
+                  for text in ET.fromstring(out.getvalue()).iter(f"{SVG}text")}
+        self.assertIn("fungi", labels["fungi"])
+        self.assertIn("tile_label", labels["fungi"])
+
+
+class TestRenderContext(unittest.TestCase):
+
+    def render(self, nest, i: int) -> str:
+        import display
+        from graphics import display_options
+        options = display_options.Options(css=[f".g{i} {{ fill: red; }}"], compact=i % 2 == 1)
+        out = io.StringIO()
+        display.RenderContext(options).stream_svg(tiling.iter_tiles(nest, 400, 300), out, 400, 300)
+        return out.getvalue()
+
+    def test_threads(self):
+        """Renders in threads, each in its own context, are independent"""
+        from concurrent.futures import ThreadPoolExecutor
+        nests = [{f"g{i}": [(f"k{j}", j + 1) for j in range(40 + i)], "other": i + 1}
+                 for i in range(8)]
+        with self.assertLogs("display", "INFO"):   # Colors are generated, but not used
+            expected = [self.render(nest, i) for i, nest in enumerate(nests)]
+            with ThreadPoolExecutor(8) as pool:
+                results = list(pool.map(self.render, nests * 4, list(range(8)) * 4))
+        self.assertEqual(results, expected * 4)
+
+    def test_own_colors(self):
+        import display
+        from graphics import display_options
+        display_options.color_scheme.clear()
+        context = display.RenderContext()
+        with self.assertLogs("display", "INFO"):
+            context.stream_svg(tiling.iter_tiles({"a": [1, 2]}, 40, 30), io.StringIO(), 40, 30)
+        self.assertIn("a", context.options.color_scheme)
+        self.assertEqual(display_options.color_scheme, {})
+
+    def stable(self, nest, seed: str = "") -> str:
+        import display
+        from graphics import display_options
+        out = io.StringIO()
+        context = display.RenderContext(display_options.Options(stable_colors=seed))
+        with self.assertLogs("display", "INFO"):
+            context.stream_svg(tiling.iter_tiles(nest, 400, 300), out, 400, 300)
+        self.assertEqual(context.options.color_scheme, {})
+        return out.getvalue()
+
+    def test_stable_colors_logged_once(self):
+        import display
+        from color_contrast import key_color
+        from graphics import display_options
+        context = display.RenderContext(display_options.Options(stable_colors=""))
+        nest = [("a", 1)] * 5 + [("b", 1)] * 5
+        with self.assertLogs("display", "INFO") as logged:
+            context.stream_svg(tiling.iter_tiles(nest, 400, 300), io.StringIO(), 400, 300)
+        self.assertEqual(len(logged.output), 1)
+        self.assertIn("2 keys (a, b)", logged.output[0])
+        # Derived colors are remembered for one render, not past a change of seed
+        context.options.stable_colors = "other"
+        out = io.StringIO()
+        with self.assertLogs("display", "INFO") as logged:
+            context.stream_svg(tiling.iter_tiles(nest, 400, 300), out, 400, 300)
+        self.assertIn("2 keys (a, b)", logged.output[0])
+        self.assertIn(key_color("a", "other")[0], out.getvalue())
+
+    def test_stable_colors(self):
+        """Derived colors depend on keys and seed, not on order or random state"""
+        import random
+        from color_contrast import key_color
+        nest = {"g": [("a", 3), ("b", 2)], "h": [("c", 2), ("a", 1)], "d": 2}
+        random.seed(1)
+        first = self.stable(nest)
+        random.seed(2)
+        self.assertEqual(self.stable(nest), first)
+        self.assertNotEqual(self.stable(nest, "other"), first)
+        # Each category gets its own color wherever it is in the tree
+        reordered = self.stable({"d": 2, "h": [("a", 1), ("c", 2)], "g": [("b", 2), ("a", 3)]})
+        for svg in [first, reordered]:
+            for key in ["g", "h", "d"]:
+                self.assertIn(key_color(key)[0], svg)
+
+
+if __name__ == "__main__":
+    unittest.main()
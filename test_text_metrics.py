@@ -0,0 +1,120 @@
+"""Unit tests for graphics/text_metrics.py"""
+
+import unittest
+import io
+import json
+import xml.etree.ElementTree as ET
+
+import tiling
+from graphics import text_metrics
+from graphics.gr_display import Rectangular
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+class StubFont:
+    """Measures as a tkinter.font.Font would, width pixels per character"""
+    def __init__(self, width: int):
+        self.width = width
+
+    def measure(self, text: str) -> int:
+        return self.width * len(text)
+
+    def metrics(self, option: str) -> int:
+        assert option == "linespace"
+        return 2 * self.width
+
+
+class StubBackend:
+    """Keeps the tiles drawn, with the metrics of a measured font or None"""
+    def __init__(self, metrics: text_metrics.TextMetrics | None):
+        self.metrics = metrics
+        self.tiles = []
+
+    def init(self, width: int, height: int):
+        pass
+
+    def draw_tile(self, r: Rectangular):
+        self.tiles.append(r)
+
+
+class TestTextMetrics(unittest.TestCase):
+
+    def test_widths(self):
+        metrics = text_metrics.scaled(text_metrics.HELVETICA_WIDTHS, 1000)
+        self.assertEqual(metrics.size("Ill"), (278 + 222 + 222, 1200))
+        self.assertEqual(metrics.size("CS\n77"), (722 + 667, 2400))
+        self.assertEqual(metrics.line_width("é"), text_metrics.DEFAULT_WIDTH)
+        self.assertEqual(metrics.line_width("木"), text_metrics.WIDE_WIDTH)
+
+    def test_fits_agrees_with_size(self):
+        metrics = text_metrics.scaled(text_metrics.HELVETICA_WIDTHS)
+        for label in ["", "a", "Chocolate", "CS\n77", "Ice Cream\n15\nmore"]:
+            width, height = metrics.size(label)
+            for w in [0, int(width), int(width) + 1, 400]:
+                for h in [0, int(height), int(height) + 1, 400]:
+                    self.assertEqual(metrics.fits(label, w, h), width <= w and height <= h,
+                                     (label, w, h))
+
+    def test_memo_by_line(self):
+        metrics = text_metrics.scaled(text_metrics.HELVETICA_WIDTHS)
+        for value in range(100):
+            metrics.fits(f"ACTG\n{value % 10}", 100, 100)
+        self.assertEqual(len(metrics.line_widths), 11)
+
+    def test_memo_bounded(self):
+        metrics = text_metrics.scaled(text_metrics.HELVETICA_WIDTHS)
+        for value in range(3 * text_metrics.MEMO_SIZE):
+            self.assertEqual(metrics.line_width(str(value)), metrics.line_width(str(value)))
+        self.assertLessEqual(len(metrics.line_widths), text_metrics.MEMO_SIZE)
+
+    def test_measured(self):
+        """A table measured from a font, here a stand-in for tkinter.font.Font"""
+        metrics = text_metrics.measured(StubFont(10))
+        self.assertEqual(metrics.size("Ill\n77"), (30, 40))
+        self.assertEqual(metrics.line_width("é木"), 10 + 20)   # Estimated from "0"
+        self.assertTrue(metrics.fits("Ill", 30, 20))
+        self.assertFalse(metrics.fits("Ill", 29, 20))
+
+    def test_measured_decides(self):
+        """A backend with measured metrics decides for every backend"""
+        import display
+        import geometry
+        from graphics import display_options
+        context = display.RenderContext(display_options.Options(color_scheme={"abc": ("red", "black")}))
+        tile = geometry.Rect(geometry.Point(0, 0), geometry.Point(60, 40))
+        for metrics, fits in [(None, True), (text_metrics.measured(StubFont(30)), False)]:
+            backend = context.displays["stub"] = StubBackend(metrics)
+            context.init(60, 40, backends=["stub"])
+            context.draw_tile(tile, "abc")
+            self.assertEqual(backend.tiles[0].label_fits, fits)
+
+    def test_decided_once(self):
+        """Backends follow the decision made by display"""
+        box = ((0, 0), (10, 10))
+        self.assertFalse(text_metrics.region_fits(Rectangular("k", box, "k", "red", "black")))
+        self.assertTrue(text_metrics.region_fits(Rectangular("k", box, "k", "red", "black",
+                                                             label_fits=True)))
+
+    def test_svg_labels(self):
+        """SVG shows the labels that the metrics say fit"""
+        import display
+        from graphics import display_options
+        with open("data/Howto-examples/majors-23F.json") as f:
+            nest = json.load(f)
+        out = io.StringIO()
+        context = display.RenderContext(display_options.Options(css=[".a { fill: red; }"]))
+        context.stream_svg(tiling.iter_tiles(nest, 800, 600), out, 800, 600)
+        tiles = [record for record in tiling.compute_tiles(nest, 800, 600)
+                 if isinstance(record, tiling.Tile)]
+        shown = [tile for tile in tiles
+                 if text_metrics.DEFAULT.fits(f"{tile.label}\n{tile.value}",
+                                              tile.x1 - tile.x0, tile.y1 - tile.y0)]
+        svg = ET.fromstring(out.getvalue())
+        self.assertEqual(len(svg.findall(f".//{SVG}text")), len(shown))
+        self.assertLess(0, len(shown))
+        self.assertLess(len(shown), len(tiles))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""Unit tests for tiling.py, layout without a display"""
+
+import unittest
+import json
+import subprocess
+import sys
+
+import tiling
+import weighted_tree
+from tiling import Tile, Group, TileRecorder
+
+
+class TestComputeTiles(unittest.TestCase):
+
+    def test_flat(self):
+        tiles = tiling.compute_tiles([1, 1], 200, 100)
+        self.assertEqual(tiles, [Tile(None, 1, 0, 0, 0, 100, 100, ()),
+                                 Tile(None, 1, 0, 100, 0, 200, 100, ())])
+
+    def test_same_with_or_without_numpy(self):
+        """Vectorized layout is only for unlabeled numbers, so the records
+        do not depend on whether NumPy is installed
+        """
+        from unittest import mock
+        import vector_layout
+        for nest in [[("a", 3), ("b", 4)], [1, ("b", 4), 2], [5, 0, 2, 7]]:
+            for algorithm in tiling.VECTORIZED:
+                with mock.patch.object(vector_layout, "np", None):
+                    fallback = tiling.compute_tiles(nest, 100, 100, algorithm)
+                self.assertEqual(tiling.compute_tiles(nest, 100, 100, algorithm), fallback)
+        self.assertEqual([t.label for t in tiling.compute_tiles([("a", 3), ("b", 4)], 100, 100)],
+                         ["a", "b"])
+
+    def test_groups(self):
+        records = tiling.compute_tiles({"a": 2, "b": {"c": 1, "d": 1}}, 100, 100)
+        self.assertEqual([(type(r).__name__, r.label, r.depth, r.group) for r in records],
+                         [("Tile", "a", 0, ()),
+                          ("Group", "b", 0, ()),
+                          ("Tile", "c", 1, ("b",)),
+                          ("Tile", "d", 1, ("b",))])
+        self.assertEqual(records[1].value, 2)
+
+    def test_algorithms_cover_canvas(self):
+        with open("data/Howto-examples/majors-23F.json") as f:
+            nest = json.load(f)
+        for algorithm in tiling.ALGORITHMS:
+            tiles = [r for r in tiling.compute_tiles(nest, 640, 480, algorithm) if isinstance(r, Tile)]
+            area = sum((t.x1 - t.x0) * (t.y1 - t.y0) for t in tiles)
+            self.assertEqual(area, 640 * 480, algorithm)
+
+    def test_render_replays_records(self):
+        records = tiling.compute_tiles([3, {"x": [1, 2], "y": {"z": 4}}, ("w", 5)], 300, 200)
+        replay = TileRecorder()
+        tiling.render(records, replay)
+        self.assertEqual(replay.records, records)
+
+    def test_parallel_same_as_serial(self):
+        with open("data/Howto-examples/majors-23F.json") as f:
+            tree = weighted_tree.WeightedTree.from_nest(json.load(f))
+        self.assertTrue(tiling.deferred_subtrees(tree, 2, 2))
+        for algorithm in tiling.ALGORITHMS:
+            serial = tiling.compute_tiles(tree, 800, 600, algorithm)
+            parallel = tiling.compute_tiles(tree, 800, 600, algorithm, jobs=2, threshold=2)
+            self.assertEqual(parallel, serial, algorithm)
+
+    def test_iter_tiles(self):
+        with open("data/CS-SCH/sch.json") as f:
+            nest = json.load(f)
+        for algorithm in tiling.ALGORITHMS:
+            self.assertEqual(list(tiling.iter_tiles(nest, 640, 480, algorithm)),
+                             tiling.compute_tiles(nest, 640, 480, algorithm), algorithm)
+
+    def test_headless(self):
+        """Computing tiles must not load Tk"""
+        program = ("import sys, tiling; tiling.compute_tiles({'a': [1, 2]}, 10, 10); "
+                   "sys.exit('tkinter' in sys.modules)")
+        self.assertEqual(subprocess.run([sys.executable, "-c", program]).returncode, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
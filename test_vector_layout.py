@@ -0,0 +1,75 @@
+"""Unit tests for vector_layout.py.
+The vectorized layout must agree tile for tile with balanced
+bisection as computed by splitter and geometry.
+"""
+
+import unittest
+import random
+import time
+
+import geometry
+import splitter
+import vector_layout
+
+import logging
+logging.basicConfig()
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+
+def bisection_boxes(values: list, width: int, height: int) -> list[tuple[int, int, int, int]]:
+    """Reference layout, one tile at a time, as mapper.layout does it"""
+    boxes = [(0, 0, 0, 0)] * len(values)
+    shown = [i for i in range(len(values)) if values[i] > 0]
+    partials = splitter.partial_sums([values[i] for i in shown])
+    work = [(0, len(shown), geometry.Rect(geometry.Point(0, 0), geometry.Point(width, height)))]
+    while work:
+        lo, hi, rect = work.pop()
+        if hi - lo == 1:
+            boxes[shown[lo]] = (rect.ll.x, rect.ll.y, rect.ur.x, rect.ur.y)
+            continue
+        mid = splitter.split_index(partials, lo, hi)
+        left, right = rect.split((partials[mid] - partials[lo]) / (partials[hi] - partials[lo]))
+        work.append((lo, mid, left))
+        work.append((mid, hi, right))
+    return boxes
+
+
+@unittest.skipUnless(vector_layout.available(), "NumPy is not installed")
+class TestVectorLayout(unittest.TestCase):
+
+    def check_agrees(self, values: list, width: int, height: int):
+        boxes = vector_layout.layout_flat(values, width, height)
+        self.assertEqual(boxes.shape, (len(values), 4))
+        self.assertEqual([tuple(row) for row in boxes.tolist()],
+                         bisection_boxes(values, width, height))
+
+    def test_small(self):
+        self.check_agrees([1, 2, 3, 4, 5], 500, 400)
+        self.check_agrees([42], 100, 300)
+        self.check_agrees([7, 9, 20, 3, 14, 17], 200, 200)
+
+    def test_floats_and_zeros(self):
+        self.check_agrees([0.5, 0, 1.25, 3, 0.0, 2.5], 640, 480)
+
+    def test_random(self):
+        rng = random.Random(210)
+        for trial in range(50):
+            values = [rng.randint(0, 100) for _ in range(rng.randint(1, 300))]
+            self.check_agrees(values, rng.randint(50, 1000), rng.randint(50, 1000))
+
+    def test_all_empty(self):
+        self.assertEqual(vector_layout.layout_flat([0, 0], 10, 10).tolist(), [[0] * 4] * 2)
+
+    def test_fast_enough(self):
+        rng = random.Random(161)
+        values = [rng.randint(1, 1000) for _ in range(1_000_000)]
+        begin_time = time.time()
+        vector_layout.layout_flat(values, 4000, 3000)
+        elapsed = time.time() - begin_time
+        log.debug(f"Laid out {len(values)} values in {elapsed} seconds")
+        self.assertLess(elapsed, 10.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
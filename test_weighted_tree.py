@@ -0,0 +1,104 @@
+"""Unit tests for weighted_tree.py"""
+
+import unittest
+import json
+
+from weighted_tree import WeightedTree, LEAF, GROUP, LIST, validate
+from splitter import deep_sum
+
+
+class TestWeightedTree(unittest.TestCase):
+
+    def test_single_number(self):
+        tree = WeightedTree.from_nest(42)
+        self.assertEqual(len(tree), 1)
+        self.assertEqual(tree.kinds[tree.root], LEAF)
+        self.assertEqual(tree.weights[tree.root], 42)
+
+    def test_weights_agree_with_deep_sum(self):
+        for path in ["data/Howto-examples/majors-23F.json",
+                     "data/Biomass/ocean-biomass.json",
+                     "data/Tests/edge_cases.json"]:
+            with open(path) as f:
+                nest = json.load(f)
+            tree = WeightedTree.from_nest(nest)
+            self.assertEqual(tree.weights[tree.root], deep_sum(nest), path)
+
+    def test_kinds_and_labels(self):
+        tree = WeightedTree.from_nest({"Cake": {"Chocolate": 10, "Carrot": 4},
+                                       "Ice Cream": 15})
+        cake, ice_cream = tree.child_nodes(tree.root)
+        self.assertEqual(tree.kinds[tree.root], LIST)
+        self.assertEqual(tree.kinds[cake], GROUP)
+        self.assertEqual(tree.labels[cake], "Cake")
+        self.assertEqual(tree.weights[cake], 14)
+        self.assertEqual((tree.kinds[ice_cream], tree.labels[ice_cream]), (LEAF, "Ice Cream"))
+
+    def test_empty_parts_not_visible(self):
+        tree = WeightedTree.from_nest([[], {}, 5, [[], []]])
+        self.assertEqual(len(tree.child_nodes(tree.root)), 4)
+        self.assertEqual([tree.weights[node] for node in tree.visible_nodes(tree.root)], [5])
+
+    def test_partials_line_up_with_children(self):
+        tree = WeightedTree.from_nest([3, [1, 1], 4])
+        lo, hi = tree.child_range(tree.root)
+        self.assertEqual(tree.partials[lo:hi + 1], [0, 3, 5, 9])
+
+    def test_partials_skip_parts_without_weight(self):
+        tree = WeightedTree.from_nest([3, -2, [], 4])
+        lo, hi = tree.child_range(tree.root)
+        self.assertEqual(tree.partials[lo:hi + 1], [0, 3, 3, 3, 7])
+
+    def test_round_trip(self):
+        for path in ["data/Howto-examples/majors-23F.json",
+                     "data/Tests/edge_cases.json"]:
+            with open(path) as f:
+                nest = json.load(f)
+            self.assertEqual(WeightedTree.from_nest(nest).to_nest(), nest)
+
+    def test_flat_values(self):
+        self.assertEqual(WeightedTree.from_nest([3, 0, 2.5]).flat_values(), [3, 0, 2.5])
+        self.assertIsNone(WeightedTree.from_nest([("a", 3), ("b", 4)]).flat_values())
+        self.assertIsNone(WeightedTree.from_nest([1, ("b", 4)]).flat_values())
+        self.assertIsNone(WeightedTree.from_nest([1, [2]]).flat_values())
+        self.assertIsNone(WeightedTree.from_nest({"a": 1}).flat_values())
+
+    def test_largest_first(self):
+        tree = WeightedTree.from_nest([[1.0, 2.0], [3, 4], {}])
+        self.assertEqual(tree.to_nest(largest_first=True), [[4, 3], [2.0, 1.0], {}])
+
+    def test_subtree(self):
+        with open("data/Biomass/ocean-biomass.json") as f:
+            nest = json.load(f)
+        tree = WeightedTree.from_nest(nest)
+        sizes = tree.sizes()
+        self.assertEqual(sizes[tree.root], len(tree))
+        for node in range(len(tree)):
+            sub = tree.subtree(node)
+            self.assertEqual(len(sub), sizes[node])
+            self.assertEqual(sub.weights[sub.root], tree.weights[node])
+            lo, hi = tree.child_range(node)
+            sub_lo, sub_hi = sub.child_range(sub.root)
+            self.assertEqual(sub.partials[sub_lo:sub_hi + 1], tree.partials[lo:hi + 1])
+        self.assertEqual(tree.subtree(tree.root).to_nest(), nest)
+
+    def test_validate(self):
+        self.assertEqual(validate([1, {"a": 2}]), [])
+        self.assertEqual(validate({"a": [1, "two"]}), ["a/1: 'two' is not a number, list, or dict"])
+        self.assertEqual(validate([[1, float("nan")]]), ["0/1: nan is not a finite number"])
+
+    def test_invalid_without_problems(self):
+        with self.assertRaises(AssertionError):
+            WeightedTree.from_nest([1, None])
+
+    def test_very_deep(self):
+        """Deeper than Python's recursion limit"""
+        nest = 1
+        for level in range(5000):
+            nest = {f"level {level}": nest, "sibling": 1}
+        tree = WeightedTree.from_nest(nest)
+        self.assertEqual(tree.weights[tree.root], 5001)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,465 @@
+"""Treemap layout without a display.
+
+Layout algorithms draw on a "canvas", which is any object with the
+functions (or methods) of the display module's drawing API:
+
+    draw_tile(r: geometry.Rect, key: object = None, value: object = None)
+    begin_group(r: geometry.Rect, key: str | None = None, value: object = None)
+    end_group()
+
+The display module itself is such a canvas.  So is a TileRecorder,
+which keeps a compact record of each tile and group instead of drawing
+it.  compute_tiles uses a TileRecorder to lay out a nest without
+importing or initializing any graphics (neither Tk nor SVG), e.g., in
+batch jobs on machines without a display.  render replays the records
+on a canvas.
+
+Once a group or list has been given its rectangle, its layout depends
+on nothing else, so large subtrees can be laid out separately:  with
+jobs > 1, compute_tiles lays out the top of the tree itself, deferring
+large subtrees to a pool of worker processes, and splices their
+records into place.  With a cache, the records of those subtrees may
+instead come from an earlier layout.  Either way, the records are the
+same as those of a serial layout.
+"""
+from collections.abc import Container, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import geometry
+import splitter
+import squarify
+import vector_layout
+import weighted_tree
+from splitter import Nest
+from weighted_tree import WeightedTree
+
+SUBTREE_THRESHOLD = 2000   # Fewest nodes in a subtree laid out separately
+
+# Changes whenever a layout algorithm changes the tiles it produces,
+# so that cached layouts (see layout_cache.py) are not reused
+LAYOUT_VERSION = 1
+
+
+class Tile(NamedTuple):
+    """A laid-out tile.  label is None for a number without a label."""
+    label: str | None
+    value: object
+    depth: int          # Number of enclosing groups
+    x0: int             # Lower left
+    y0: int
+    x1: int             # Upper right
+    y1: int
+    group: tuple        # Labels of enclosing groups, outermost first
+
+
+class Group(NamedTuple):
+    """A laid-out group, which encloses the records that follow it
+    with greater depth.
+    """
+    label: str | None
+    value: object
+    depth: int
+    x0: int
+    y0: int
+    x1: int
+    y1: int
+    group: tuple
+
+
+class Deferred(NamedTuple):
+    """Place of a subtree whose layout is left to a worker process"""
+    node: int
+    rect: geometry.Rect
+    group: tuple
+
+
+class TileRecorder:
+    """Canvas that records tiles and groups, in drawing order."""
+    def __init__(self, path: tuple = ()):
+        self.records: list[Tile | Group | Deferred] = []
+        self.path = path    # Labels of currently open groups
+
+    def draw_tile(self, r: geometry.Rect, key: object = None, value: object = None):
+        if value is None:   # A number is its own label
+            key, value = None, key
+        self.records.append(Tile(key, value, len(self.path),
+                                 r.ll.x, r.ll.y, r.ur.x, r.ur.y, self.path))
+
+    def begin_group(self, r: geometry.Rect, key: str | None = None, value: object = None):
+        self.records.append(Group(key, value, len(self.path),
+                                  r.ll.x, r.ll.y, r.ur.x, r.ur.y, self.path))
+        self.path = self.path + (key,)
+
+    def end_group(self):
+        self.path = self.path[:-1]
+
+    def defer(self, node: int, r: geometry.Rect):
+        """Hold a place for the records of a subtree laid out elsewhere"""
+        self.records.append(Deferred(node, r, self.path))
+
+
+def compute_tiles(values: Nest | WeightedTree, width: int, height: int,
+                  algorithm: str = "bisect", jobs: int = 1,
+                  threshold: int = SUBTREE_THRESHOLD, cache=None) -> list[Tile | Group]:
+    """Tiles and groups of the treemap of values in a width x height
+    canvas, in drawing order, computed without any display.
+    With jobs > 1, subtrees of at least threshold nodes are laid out
+    in up to jobs worker processes.  With a cache (a
+    layout_cache.LayoutCache), layouts of the whole tree and of those
+    subtrees are reused from earlier runs, and saved for later runs
+    (after which the cache is trimmed to its limit, once).
+    """
+    tree = weighted_tree.as_tree(values)
+    area = geometry.Rect(geometry.Point(0, 0), geometry.Point(width, height))
+    if cache is None:
+        return uncached_tiles(tree, area, algorithm, jobs, threshold)
+    entries = cache.for_tree(tree)
+    records = entries.load(tree.root, area, algorithm)
+    if records is None:
+        records = uncached_tiles(tree, area, algorithm, jobs, threshold, entries)
+        entries.store(tree.root, area, algorithm, records)
+        cache.evict()
+    return records
+
+
+def uncached_tiles(tree: WeightedTree, area: geometry.Rect, algorithm: str, jobs: int,
+                   threshold: int, cache=None) -> list[Tile | Group]:
+    """Compute the layout of the whole tree, though a cache may still
+    provide the layouts of its subtrees.
+    """
+    flat = tree.flat_values()
+    if algorithm in VECTORIZED and vector_layout.available() and flat is not None:
+        # Same bisection, a level at a time in NumPy arrays;  only for a list
+        # of unlabeled numbers, since the tiles it makes have no labels
+        boxes = vector_layout.layout_flat(flat, area.width(), area.height()).tolist()
+        return [Tile(None, flat[i], 0, *boxes[i], ()) for i in range(len(flat)) if flat[i] > 0]
+    if jobs > 1 or cache is not None:
+        return layout_tiles(tree, area, algorithm, jobs, threshold, cache)
+    recorder = TileRecorder()
+    ALGORITHMS[algorithm](tree, area, recorder)
+    return recorder.records
+
+
+def iter_tiles(values: Nest | WeightedTree, width: int, height: int,
+               algorithm: str = "bisect") -> Iterator[Tile | Group]:
+    """The records of compute_tiles, generated one at a time in drawing
+    order, so that they can be drawn or written as they are laid out.
+    Beyond the tree itself, only the path of open groups (with the
+    remaining parts of each) is held in memory.
+    """
+    tree = weighted_tree.as_tree(values)
+    arrange = ARRANGEMENTS[algorithm]
+    area = geometry.Rect(geometry.Point(0, 0), geometry.Point(width, height))
+    kinds, labels, weights = tree.kinds, tree.labels, tree.weights
+    # Each level is the parts of an open group or list still to place,
+    # with the labels of the groups enclosing them
+    levels = [(iter([(tree.root, area)]), ())]
+    while levels:
+        parts, group = levels[-1]
+        for node, rect in parts:
+            depth = len(group)
+            if kinds[node] == weighted_tree.LEAF:
+                yield Tile(labels[node], weights[node], depth,
+                           rect.ll.x, rect.ll.y, rect.ur.x, rect.ur.y, group)
+                continue
+            inner = group
+            if kinds[node] == weighted_tree.GROUP:
+                yield Group(labels[node], weights[node], depth,
+                            rect.ll.x, rect.ll.y, rect.ur.x, rect.ur.y, group)
+                inner = group + (labels[node],)
+            levels.append((iter(arrange(tree, node, rect)), inner))
+            break   # Descend, then continue with the rest of parts
+        else:
+            levels.pop()
+
+
+def render(records: Iterable[Tile | Group], canvas):
+    """Draw tile and group records, as from compute_tiles or
+    iter_tiles, on canvas.  Groups end where the depth of
+    records decreases.
+    """
+    depth = 0
+    for record in records:
+        while depth > record.depth:
+            canvas.end_group()
+            depth -= 1
+        rect = geometry.Rect(geometry.Point(record.x0, record.y0),
+                             geometry.Point(record.x1, record.y1))
+        if isinstance(record, Group):
+            canvas.begin_group(rect, record.label, record.value)
+            depth += 1
+        elif record.label is None:
+            canvas.draw_tile(rect, record.value)
+        else:
+            canvas.draw_tile(rect, record.label, record.value)
+    while depth > 0:
+        canvas.end_group()
+        depth -= 1
+
+
+# -------------------------------------------------------------------
+#  Layout algorithms.  Each lays out a nest or WeightedTree in
+#  a rectangle, drawing it on a canvas.  Groups and lists whose
+#  node numbers are in deferred are not laid out, but passed with
+#  their rectangles to canvas.defer (see layout_tiles).
+# -------------------------------------------------------------------
+
+def layout_bisect(items: Nest | WeightedTree, rect: geometry.Rect, canvas,
+                  deferred: Container[int] = ()):
+    """Balanced bisection:  a list is split into a prefix and suffix with
+    nearly equal sums, and each part is laid out recursively in its
+    share of the rectangle.  Weights and partial sums come from the
+    WeightedTree for items, and parts of a list are passed as index
+    ranges into it rather than as slices.
+    """
+    tree = weighted_tree.as_tree(items)
+    layout_node(tree, tree.root, rect, canvas, deferred)
+
+
+def layout_node(tree: WeightedTree, node: int, rect: geometry.Rect, canvas,
+                deferred: Container[int] = ()):
+    """Lay out one node of tree in rect."""
+    kind = tree.kinds[node]
+    if kind == weighted_tree.LEAF:
+        draw_leaf(tree, node, rect, canvas)
+    elif node in deferred:
+        canvas.defer(node, rect)
+    elif kind == weighted_tree.GROUP:
+        canvas.begin_group(rect, tree.labels[node], tree.weights[node])
+        layout_range(tree, *tree.child_range(node), rect, canvas, deferred)
+        canvas.end_group()
+    else:
+        layout_range(tree, *tree.child_range(node), rect, canvas, deferred)
+
+
+def layout_range(tree: WeightedTree, lo: int, hi: int, rect: geometry.Rect, canvas,
+                 deferred: Container[int] = ()):
+    """Lay out the siblings tree.children[lo:hi] in rect."""
+    partials = tree.partials
+    if partials[hi] == partials[lo]:
+        return   # Empty parts occupy no area
+    if hi - lo == 1:
+        layout_node(tree, tree.children[lo], rect, canvas, deferred)
+        return
+    mid = splitter.split_index(partials, lo, hi)
+    proportion = (partials[mid] - partials[lo]) / (partials[hi] - partials[lo])
+    left_rect, right_rect = rect.split(proportion)
+    layout_range(tree, lo, mid, left_rect, canvas, deferred)
+    layout_range(tree, mid, hi, right_rect, canvas, deferred)
+
+
+def draw_leaf(tree: WeightedTree, node: int, rect: geometry.Rect, canvas):
+    """A number is its own label;  a labeled number shows both."""
+    if tree.labels[node] is None:
+        canvas.draw_tile(rect, tree.weights[node])
+    else:
+        canvas.draw_tile(rect, tree.labels[node], tree.weights[node])
+
+
+def layout_ranges(items: Nest | WeightedTree, rect: geometry.Rect, canvas,
+                  deferred: Container[int] = ()):
+    """The same balanced bisection as layout_bisect, but without
+    recursion.  Work is kept on an explicit stack, each entry a (lo, hi)
+    range of siblings in the shared arrays of the WeightedTree with the
+    rectangle they fill.  Suitable for nests of any depth, and lists of
+    any length.
+    """
+    tree = weighted_tree.as_tree(items)
+    partials = tree.partials
+    work: list[tuple[int, int, geometry.Rect] | None] = []  # None ends a group
+    place_node(tree, tree.root, rect, canvas, work, deferred)
+    while work:
+        task = work.pop()
+        if task is None:
+            canvas.end_group()
+            continue
+        lo, hi, rect = task
+        if partials[hi] == partials[lo]:
+            continue   # Empty parts occupy no area
+        if hi - lo == 1:
+            place_node(tree, tree.children[lo], rect, canvas, work, deferred)
+            continue
+        mid = splitter.split_index(partials, lo, hi)
+        proportion = (partials[mid] - partials[lo]) / (partials[hi] - partials[lo])
+        left_rect, right_rect = rect.split(proportion)
+        # Stack is last in, first out, so the left part is pushed last
+        work.append((mid, hi, right_rect))
+        work.append((lo, mid, left_rect))
+
+
+def place_node(tree: WeightedTree, node: int, rect: geometry.Rect, canvas,
+               work: list[tuple[int, int, geometry.Rect] | None],
+               deferred: Container[int] = ()):
+    """Draw a leaf, or push the work of laying out a group or list."""
+    kind = tree.kinds[node]
+    if kind == weighted_tree.LEAF:
+        draw_leaf(tree, node, rect, canvas)
+        return
+    if node in deferred:
+        canvas.defer(node, rect)
+        return
+    if kind == weighted_tree.GROUP:
+        canvas.begin_group(rect, tree.labels[node], tree.weights[node])
+        work.append(None)
+    work.append((*tree.child_range(node), rect))
+
+
+def layout_squarified(items: Nest | WeightedTree, rect: geometry.Rect, canvas,
+                      deferred: Container[int] = ()):
+    """Squarified layout:  the parts of each list or group are placed
+    from largest to smallest in rows chosen to keep tiles close to
+    square (see squarify.py).  Nesting is handled as in layout_bisect,
+    with groups drawn around their parts.
+    """
+    tree = weighted_tree.as_tree(items)
+    weights = tree.weights
+    work: list[tuple[int, geometry.Rect] | None] = [(tree.root, rect)]  # None ends a group
+    while work:
+        task = work.pop()
+        if task is None:
+            canvas.end_group()
+            continue
+        node, rect = task
+        kind = tree.kinds[node]
+        if kind == weighted_tree.LEAF:
+            draw_leaf(tree, node, rect, canvas)
+            continue
+        if node in deferred:
+            canvas.defer(node, rect)
+            continue
+        if kind == weighted_tree.GROUP:
+            canvas.begin_group(rect, tree.labels[node], weights[node])
+            work.append(None)
+        # Stack is last in, first out, so push the largest part last
+        work.extend(reversed(arrange_squarified(tree, node, rect)))
+
+
+# -------------------------------------------------------------------
+#  One level of layout.  Each arrangement gives the rectangles of the
+#  visible children of a group or list in its rectangle, in drawing
+#  order, as the layout algorithm of the same name places them.
+#  Descending through the arrangements of a tree reproduces its
+#  layout, one node at a time (see relayout.py).
+# -------------------------------------------------------------------
+
+def arrange_bisect(tree: WeightedTree, node: int,
+                   rect: geometry.Rect) -> Iterator[tuple[int, geometry.Rect]]:
+    """Children of node with their rectangles, by balanced bisection,
+    generated as they are placed, so that a long list of children is
+    never held in memory.
+    """
+    partials, children = tree.partials, tree.children
+    work = [(*tree.child_range(node), rect)]
+    while work:
+        lo, hi, rect = work.pop()
+        if partials[hi] == partials[lo]:
+            continue   # Empty parts occupy no area
+        if hi - lo == 1:
+            yield children[lo], rect
+            continue
+        mid = splitter.split_index(partials, lo, hi)
+        proportion = (partials[mid] - partials[lo]) / (partials[hi] - partials[lo])
+        left_rect, right_rect = rect.split(proportion)
+        work.append((mid, hi, right_rect))
+        work.append((lo, mid, left_rect))
+
+
+def arrange_squarified(tree: WeightedTree, node: int,
+                       rect: geometry.Rect) -> list[tuple[int, geometry.Rect]]:
+    """Children of node with their rectangles, largest first, squarified"""
+    weights = tree.weights
+    parts = sorted(tree.visible_nodes(node), key=lambda child: weights[child], reverse=True)
+    return list(zip(parts, squarify.squarify([weights[child] for child in parts], rect)))
+
+
+# Layout functions selectable by name
+ALGORITHMS = {
+    "bisect": layout_bisect,
+    "ranges": layout_ranges,
+    "squarify": layout_squarified,
+}
+# One level of each layout algorithm
+ARRANGEMENTS = {
+    "bisect": arrange_bisect,
+    "ranges": arrange_bisect,
+    "squarify": arrange_squarified,
+}
+# Algorithms that vector_layout implements for flat lists
+VECTORIZED = {"bisect", "ranges"}
+
+
+# -------------------------------------------------------------------
+#  Layout of deferred subtrees, in parallel and from a cache
+# -------------------------------------------------------------------
+
+def layout_tiles(tree: WeightedTree, rect: geometry.Rect, algorithm: str, jobs: int = 1,
+                 threshold: int = SUBTREE_THRESHOLD, cache=None) -> list[Tile | Group]:
+    """Records of the layout of tree in rect, as from compute_tiles.
+    The top of the tree is laid out here, holding a place for each
+    large subtree;  each place is then filled by the records of its
+    subtree, which depend only on the subtree and its rectangle.
+    Those records come from the cache (entries for tree, see
+    layout_cache.py) if possible, and are otherwise
+    laid out in up to jobs worker processes (or here, if jobs is 1).
+    """
+    deferred = set(deferred_subtrees(tree, jobs, threshold))
+    recorder = TileRecorder()
+    ALGORITHMS[algorithm](tree, rect, recorder, deferred)
+    places = [record for record in recorder.records if isinstance(record, Deferred)]
+    if not places:
+        return recorder.records
+    filled: list[list[Tile | Group] | None] = [None] * len(places)
+    if cache is not None:
+        filled = [cache.load(place.node, place.rect, algorithm, place.group)
+                  for place in places]
+    missing = [i for i in range(len(places)) if filled[i] is None]
+    tasks = [(tree.subtree(places[i].node), places[i].rect, places[i].group, algorithm)
+             for i in missing]
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+            laid_out = list(pool.map(layout_subtree, tasks))
+    else:
+        laid_out = [layout_subtree(task) for task in tasks]
+    for i, records in zip(missing, laid_out):
+        filled[i] = records
+        if cache is not None:
+            place = places[i]
+            cache.store(place.node, place.rect, algorithm, records)
+    laid_out = iter(filled)
+    records: list[Tile | Group] = []
+    for record in recorder.records:
+        if isinstance(record, Deferred):
+            records.extend(next(laid_out))
+        else:
+            records.append(record)
+    return records
+
+
+def deferred_subtrees(tree: WeightedTree, jobs: int, threshold: int) -> list[int]:
+    """Groups and lists to lay out separately:  the largest subtrees
+    of at least threshold nodes that are small enough to share the
+    work among jobs workers.  Parts of the tree above them, including
+    long lists of leaves, are laid out as a whole.
+    """
+    sizes = tree.sizes()
+    grain = max(threshold, len(tree) // (4 * jobs))   # Several tasks per worker
+    chosen = []
+    work = list(tree.child_nodes(tree.root))
+    while work:
+        node = work.pop()
+        if tree.kinds[node] == weighted_tree.LEAF or tree.weights[node] <= 0:
+            continue
+        if sizes[node] > grain:
+            work.extend(tree.child_nodes(node))
+        elif sizes[node] >= threshold:
+            chosen.append(node)
+    return chosen
+
+
+def layout_subtree(task: tuple[WeightedTree, geometry.Rect, tuple, str]) -> list[Tile | Group]:
+    """Records for one subtree, possibly in a worker process"""
+    subtree, rect, group, algorithm = task
+    recorder = TileRecorder(group)
+    ALGORITHMS[algorithm](subtree, rect, recorder)
+    return recorder.records
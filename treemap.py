@@ -7,6 +7,19 @@
   applies to SVG output only
 - user-provided CSV color scheme can be specified with --csv  filename.csv,
   will also apply to SVG if css style sheet not specified
+- smaller SVG with --compact, and gzip-compressed SVG if the --svg
+  path ends in .svgz
+- display backends chosen with --backend (default Tk and SVG);  with
+  only --backend svg, no window is opened and Tk is never loaded, and
+  with --no-cache as well, SVG is written as the treemap is laid out
+- colors derived from keys with --stable-colors [SEED], the same in
+  every run, instead of random colors for keys not in the color scheme
+- the treemap saved as a display list with --record, to be shown
+  again by display_list.py without the input or its layout
+- Tk tiles drawn largest first, while the window stays responsive,
+  with --progressive
+- Tk window explored with --interactive:  click a tile to identify
+  it, drag to pan, scroll to zoom, double-click a group to drill down
 """
 
 import json    # Acquire data to be mapped in JSON exchange format  (see https://www.json.org)
@@ -15,9 +28,15 @@ import pathlib     # To convert path argument to a full path for SVG file
 import webbrowser  # To display the SVG version
 
 import color_scheme
-import mapper
 import display
+import display_list
+import drill_down
+import layout_cache
+import mapper
+import tiling
+import weighted_tree
 from graphics import display_options as options
+from graphics.svg_display import open_svg
 
 
 def cli() -> object:
@@ -34,8 +53,38 @@ def cli() -> object:
     parser.add_argument("--css", help="CSS file to use for SVG",
                         nargs="?", default=None, type=argparse.FileType("r"))
     # Path for output SVG file, defaults to "treemap.svg"
-    parser.add_argument("--svg", help="Path to SVG file",
+    parser.add_argument("--svg", help="Path to SVG file, compressed if it ends in .svgz",
                         nargs="?", default="treemap.svg", type=str, required=False)
+    # Display media, from those registered in display
+    parser.add_argument("-b", "--backend", help="Display backend, may be repeated (default tk and svg)",
+                        choices=list(display.BACKENDS), action="append", dest="backends")
+    # Smaller SVG, with fewer tool tips
+    parser.add_argument("--compact", help="Write SVG with less whitespace and fewer tool tips",
+                        action="store_true")
+    # Colors of keys not in the color scheme derived from the keys, not random
+    parser.add_argument("--stable-colors", help="Derive colors from keys and optional SEED",
+                        nargs="?", const="", default=None, metavar="SEED")
+    # Layout algorithm, from those provided by tiling
+    parser.add_argument("-a", "--algorithm", help="Layout algorithm (default bisect)",
+                        choices=list(tiling.ALGORITHMS), default="bisect")
+    # Worker processes for laying out large subtrees in parallel
+    parser.add_argument("-j", "--jobs", help="Number of processes for layout (default 1)",
+                        type=int, default=1)
+    # Layouts are saved for reuse in later runs, unless --no-cache
+    parser.add_argument("--cache-dir", help="Directory of saved layouts",
+                        default=layout_cache.DEFAULT_DIRECTORY, type=pathlib.Path)
+    parser.add_argument("--no-cache", help="Neither use nor save layouts",
+                        action="store_true")
+    # Drawing operations saved for display_list.py
+    parser.add_argument("--record", help="Path to save the treemap as a display list",
+                        default=None, type=pathlib.Path)
+    # Tk draws the largest tiles first, in batches
+    parser.add_argument("--progressive", help="Draw the largest tiles first, keeping the window responsive",
+                        action="store_true")
+    # Tk window as a viewer
+    parser.add_argument("--interactive", help="Click tiles to identify them, drag to pan, scroll to zoom, "
+                        "double-click groups to drill down",
+                        action="store_true")
     # Suppress long labels? (Applies to SVG only for now)
     parser.add_argument("-m", "--messy", help="Include labels that are too big for their tiles",
                          action="store_true")
@@ -45,6 +94,8 @@ def cli() -> object:
                         type=int)
 
     args = parser.parse_args()
+    if not args.backends:
+        args.backends = list(display.DEFAULT_BACKENDS)
 
     #  Options communicated through treemap_options
     if args.css:
@@ -55,6 +106,10 @@ def cli() -> object:
         if not args.css:
             options.css = color_scheme.to_css(options.color_scheme)
     options.messy = args.messy
+    options.compact = args.compact
+    options.stable_colors = args.stable_colors
+    options.progressive = args.progressive
+    options.interactive = args.interactive
 
     return args
 
@@ -63,17 +118,59 @@ def main():
     """Display and produce an SVG treemap of the input data."""
     args = cli()
     values = json.load(args.input)
-    mapper.treemap(values, args.width, args.height)
+    # Validate and sum the input once, for layout and rendering
+    problems: list[str] = []
+    tree = weighted_tree.WeightedTree.from_nest(values, problems)
+    for problem in problems:
+        print(f"Warning, {args.input.name} at {problem}")
+    if args.backends == ["svg"] and args.no_cache and not args.record and not args.interactive:
+        # Nothing needs the whole layout:  tiles are written as they are laid out
+        stream(tree, args)
+        return
+    # Layout is computed without the display, then shown
+    cache = None if args.no_cache else layout_cache.LayoutCache(args.cache_dir)
+    tiles = tiling.compute_tiles(tree, args.width, args.height, args.algorithm, args.jobs,
+                                 cache=cache)
+    if args.record:
+        recorder = display_list.DisplayList(args.width, args.height)
+        tiling.render(tiles, recorder)
+        recorder.save(args.record)
+    if args.interactive and "tk" in args.backends:
+        # Groups are laid out to fill the window as the user drills down
+        display.explore(drill_down.DrillDown(tree, args.width, args.height, args.algorithm,
+                                             tiles, cache))
+    if "svg" not in args.backends:
+        mapper.show(tiles, args.width, args.height, backends=args.backends)
+        return
+    # SVG is written as the treemap is drawn
     svg_path = pathlib.Path(args.svg).resolve()
     try:
-        svg_out = open(svg_path, "w")
-        for line in display.svg_content():
-            svg_out.write(line)
-        print(f"SVG output written to {svg_path}")
-        webbrowser.open(f"file:{svg_path}")
-    except Exception as e:
+        svg_out = open_svg(svg_path)
+    except OSError as e:
         print(f"SVG output to {svg_path} failed: {e}")
+        mapper.show(tiles, args.width, args.height, backends=args.backends)
+        return
+    with svg_out:
+        mapper.show(tiles, args.width, args.height, svg_out, backends=args.backends)
+    print(f"SVG output written to {svg_path}")
+    if "tk" in args.backends:   # Not when headless
+        webbrowser.open(f"file:{svg_path}")
+
 
+def stream(tree: weighted_tree.WeightedTree, args: argparse.Namespace):
+    """Write the SVG treemap of tree as it is laid out, without
+    holding the layout in memory.
+    """
+    svg_path = pathlib.Path(args.svg).resolve()
+    try:
+        svg_out = open_svg(svg_path)
+    except OSError as e:
+        print(f"SVG output to {svg_path} failed: {e}")
+        return
+    with svg_out:
+        display.stream_svg(tiling.iter_tiles(tree, args.width, args.height, args.algorithm),
+                           svg_out, args.width, args.height)
+    print(f"SVG output written to {svg_path}")
 
 
 if __name__ == "__main__":
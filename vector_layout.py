@@ -0,0 +1,84 @@
+"""Balanced bisection layout of a flat list of numbers, vectorized with NumPy.
+
+For a flat list of values (no nesting), the balanced bisection layout
+of mapper.layout can be computed a level at a time:  all the index
+ranges at one level of the recursion are split together, with a few
+array operations on columns of range bounds and rectangle corners.
+No Python object is created per tile;  the result is a single
+(n, 4) integer array of (llx, lly, urx, ury) corners, row i for values[i].
+
+The result agrees tile for tile with mapper.layout, which follows the
+same rules:  split points are chosen as by splitter.split_index, and
+rectangles are split as by geometry.Rect.split, along the longer side,
+truncating to integer coordinates.
+
+NumPy is optional.  When it is not installed, 'available()' is false
+and mapper falls back to its pure Python layout.  Which nests are flat
+lists is decided by weighted_tree.WeightedTree.flat_values.
+"""
+from splitter import Real
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def available() -> bool:
+    """Can we use vectorized layout?"""
+    return np is not None
+
+
+def layout_flat(values: list[Real], width: int, height: int) -> "np.ndarray":
+    """Corners of the tile for each of values in a width x height canvas,
+    as an (n, 4) int array of (llx, lly, urx, ury).  Values that are not
+    positive are not displayed;  their rows are all zero.
+    """
+    assert available(), "Vectorized layout requires NumPy"
+    weights = np.asarray(values)
+    if weights.dtype.kind not in "iu":
+        weights = weights.astype(np.float64)
+    boxes = np.zeros((len(weights), 4), dtype=int)
+    shown = np.flatnonzero(weights > 0)
+    if len(shown) == 0:
+        return boxes
+    partials = np.concatenate(([0], np.cumsum(weights[shown])))
+
+    # Columns describing the ranges [lo, hi) at the current level
+    lo = np.array([0])
+    hi = np.array([len(shown)])
+    llx, lly = np.array([0]), np.array([0])
+    urx, ury = np.array([width]), np.array([height])
+    while len(lo) > 0:
+        # Single items fill their rectangles
+        done = hi - lo == 1
+        boxes[shown[lo[done]]] = np.column_stack((llx[done], lly[done], urx[done], ury[done]))
+        more = ~done
+        lo, hi = lo[more], hi[more]
+        llx, lly, urx, ury = llx[more], lly[more], urx[more], ury[more]
+        if len(lo) == 0:
+            break
+
+        # Split points, as in splitter.split_index (no zero weights here)
+        base = partials[lo]
+        target = (partials[hi] - base) / 2
+        mid = np.clip(np.searchsorted(partials, base + target, side="left"), lo + 1, hi - 1)
+        before = np.abs(partials[mid - 1] - base - target)
+        after = np.abs(partials[mid] - base - target)
+        mid = np.where((mid > lo + 1) & (before <= after), mid - 1, mid)
+
+        # Split rectangles, as in geometry.Rect.split
+        proportion = (partials[mid] - base) / (partials[hi] - base)
+        width, height = urx - llx, ury - lly
+        vertical = height > width
+        cut_y = lly + (height * proportion).astype(int)
+        cut_x = llx + (width * proportion).astype(int)
+        left_urx = np.where(vertical, urx, cut_x)
+        left_ury = np.where(vertical, cut_y, ury)
+        right_llx = np.where(vertical, llx, cut_x)
+        right_lly = np.where(vertical, cut_y, lly)
+
+        lo, hi = np.concatenate((lo, mid)), np.concatenate((mid, hi))
+        llx, lly = np.concatenate((llx, right_llx)), np.concatenate((lly, right_lly))
+        urx, ury = np.concatenate((left_urx, urx)), np.concatenate((left_ury, ury))
+    return boxes
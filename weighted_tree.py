@@ -0,0 +1,344 @@
+"""Canonical, array-backed representation of a Nest.
+
+A Nest (nested lists, dicts, and (label, value) pairs of numbers)
+is converted, in a single post-order pass, to a tree of numbered nodes,
+each with its kind, its label, and its total weight.  Layout, sorting,
+validation, and rendering all work from this tree, so no part of the
+nest is examined with isinstance or summed more than once.
+
+Rather than each node holding its own list of children, the children of
+every node are kept in one shared array, each node owning a contiguous
+range [first, first + count) of it.  A parallel array holds partial sums
+of child weights, so that the total weight of any range [lo, hi) of
+siblings is partials[hi] - partials[lo], and splitter.split_index can
+bisect it directly.  Layout can then work entirely on (lo, hi) index
+ranges over these shared arrays, without copying sub-lists.
+
+Each node's range is followed by one unused slot, so that its partial
+sums (count + 1 of them, beginning with 0) line up with its children.
+Parts with no positive weight are kept (so that sorting can reproduce
+them) but add nothing to partial sums, and layout skips them.
+
+The tree is built with an explicit stack rather than recursion, so
+nests may be nested to any depth.
+"""
+from array import array
+import doctest
+import math
+
+from splitter import Real, Nest
+
+# Node kinds
+LEAF = 0    # A number, with or without a label
+GROUP = 1   # A label with a nested list or dict of parts
+LIST = 2    # An unlabeled list or dict of parts
+
+NO_CHILD = -1   # Fills the slot after each node's range of children
+
+
+class WeightedTree:
+    """Nodes are numbered in post-order, so that children always
+    precede their parent and the root is numbered last.
+    """
+    def __init__(self):
+        self.kinds = array('b')
+        self.keyed = array('b')          # 1 if parts came from a dict, else 0
+        self.labels: list[str | None] = []
+        self.weights: list[Real] = []    # Value of a leaf, total of a group or list
+        self.first = array('i')          # Index of first child in children
+        self.count = array('i')          # Number of children
+        self.children = array('i')       # Shared by all nodes
+        self.partials: list[Real] = []   # Parallel to children
+        self.root = NO_CHILD
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    @classmethod
+    def from_nest(cls, nest: Nest, problems: list[str] | None = None) -> "WeightedTree":
+        """Build the tree for nest, which may be nested to any depth.
+        If a list of problems is provided, parts of the nest that are not
+        well-formed are described there:  values that are not numbers,
+        lists, or dicts are left out of the tree (without a list of
+        problems they cause an assertion failure), and numbers that are
+        negative or not finite are kept but can never be displayed.
+
+        >>> tree = WeightedTree.from_nest({"a": 3, "b": [1, [], 2]})
+        >>> len(tree), tree.weights[tree.root]
+        (6, 6)
+        >>> [tree.labels[node] for node in tree.child_nodes(tree.root)]
+        ['a', 'b']
+        >>> tree.partials[tree.first[tree.root]: tree.first[tree.root] + 3]
+        [0, 3, 6]
+        """
+        tree = cls()
+        # Each frame is [kind, label, parts, position, child nodes, keyed]
+        stack: list[list] = []
+        node = tree._enter(nest, None, stack, problems)
+        while stack:
+            frame = stack[-1]
+            kind, label, parts, position, child_nodes, keyed = frame
+            if position < len(parts):
+                frame[3] = position + 1
+                part = parts[position]
+                if type(part) is int and part >= 0:   # Most common case, in line
+                    child_nodes.append(tree._add_leaf(None, part))
+                    continue
+                node = tree._enter(part, None, stack, problems)
+                if node != NO_CHILD:
+                    child_nodes.append(node)
+            else:
+                stack.pop()
+                node = tree._add_internal(kind, label, child_nodes, keyed)
+                if stack:
+                    stack[-1][4].append(node)
+        if node == NO_CHILD:
+            node = tree._add_internal(LIST, None, [], False)   # Nothing valid
+        tree.root = node
+        return tree
+
+    def _enter(self, nest: Nest, label: str | None, stack: list[list],
+               problems: list[str] | None) -> int:
+        """Add a leaf and return its node number, or else
+        push a frame to build a group or list and return NO_CHILD.
+        """
+        keyed = isinstance(nest, dict)
+        if keyed:
+            nest = list(nest.items())
+
+        if isinstance(nest, Real):
+            return self._add_leaf(label, nest, stack, problems)
+        elif isinstance(nest, tuple) and len(nest) == 2:
+            key, value = nest
+            if isinstance(value, Real):
+                return self._add_leaf(key, value, stack, problems)
+            elif isinstance(value, dict):
+                stack.append([GROUP, key, list(value.items()), 0, [], True])
+                return NO_CHILD
+            elif isinstance(value, list):
+                stack.append([GROUP, key, value, 0, [], False])
+                return NO_CHILD
+            elif isinstance(value, tuple):
+                stack.append([GROUP, key, [value], 0, [], False])
+                return NO_CHILD
+            problem = f"{value!r} is not a number, list, or dict"
+        elif isinstance(nest, list):
+            stack.append([LIST, label, nest, 0, [], keyed])
+            return NO_CHILD
+        else:
+            problem = f"{nest!r} is not a number, list, or dict"
+
+        assert problems is not None, f"Unanticipated value in nest at {path(stack)}: {problem}"
+        problems.append(f"{path(stack)}: {problem}")
+        return NO_CHILD
+
+    def _add_leaf(self, label: str | None, value: Real,
+                  stack: list[list] = (), problems: list[str] | None = None) -> int:
+        if problems is not None and value_problem(value):
+            problems.append(f"{path(stack)}: {value_problem(value)}")
+        self.kinds.append(LEAF)
+        self.keyed.append(False)
+        self.labels.append(label)
+        self.weights.append(value)
+        self.first.append(len(self.children))
+        self.count.append(0)
+        return len(self.kinds) - 1
+
+    def _add_internal(self, kind: int, label: str | None,
+                      child_nodes: list[int], keyed: bool) -> int:
+        weights = self.weights
+        first = len(self.children)
+        # Total is summed in order, to agree exactly with splitter.deep_sum
+        total = 0
+        running = 0
+        for child in child_nodes:
+            self.children.append(child)
+            self.partials.append(running)
+            weight = weights[child]
+            total += weight
+            if weight > 0:
+                running += weight
+        self.children.append(NO_CHILD)
+        self.partials.append(running)
+        self.kinds.append(kind)
+        self.keyed.append(keyed)
+        self.labels.append(label)
+        self.weights.append(total)
+        self.first.append(first)
+        self.count.append(len(child_nodes))
+        return len(self.kinds) - 1
+
+    def child_range(self, node: int) -> tuple[int, int]:
+        """Range [lo, hi) of children (and partials) belonging to node"""
+        first = self.first[node]
+        return first, first + self.count[node]
+
+    def child_nodes(self, node: int) -> array:
+        lo, hi = self.child_range(node)
+        return self.children[lo:hi]
+
+    def visible_nodes(self, node: int) -> list[int]:
+        """Children of node that have positive weight, in order"""
+        weights = self.weights
+        return [child for child in self.child_nodes(node) if weights[child] > 0]
+
+    def sizes(self) -> list[int]:
+        """Number of nodes in the subtree of each node, including itself"""
+        sizes = [1] * len(self)
+        children = self.children
+        for node in range(len(self)):   # Children are numbered before parents
+            first = self.first[node]
+            for i in range(first, first + self.count[node]):
+                sizes[node] += sizes[children[i]]
+        return sizes
+
+    def subtree(self, node: int) -> "WeightedTree":
+        """A separate tree for node and its descendants, e.g., to lay out
+        in another process.  Post-order numbering places the nodes of a
+        subtree, and their children and partial sums, in contiguous
+        ranges of the arrays, so the new tree is made of slices,
+        renumbered from 0.
+
+        >>> tree = WeightedTree.from_nest([1, {"a": [2, 3], "b": 4}])
+        >>> group = tree.child_nodes(tree.root)[1]
+        >>> tree.subtree(group).to_nest()
+        {'a': [2, 3], 'b': 4}
+        """
+        start = node   # Lowest numbered node of the subtree, its leftmost descendant
+        while self.count[start] > 0:
+            start = self.children[self.first[start]]
+        lo = self.first[start]
+        hi = self.first[node] + self.count[node] + 1   # Through node's unused slot
+        sub = WeightedTree()
+        sub.kinds = self.kinds[start:node + 1]
+        sub.keyed = self.keyed[start:node + 1]
+        sub.labels = self.labels[start:node + 1]
+        sub.weights = self.weights[start:node + 1]
+        sub.first = array('i', [first - lo for first in self.first[start:node + 1]])
+        sub.count = self.count[start:node + 1]
+        sub.children = array('i', [NO_CHILD if child == NO_CHILD else child - start
+                                   for child in self.children[lo:hi]])
+        sub.partials = self.partials[lo:hi]
+        sub.root = node - start
+        return sub
+
+    def parents(self) -> array:
+        """Parent of each node;  NO_CHILD for the root"""
+        parents = array('i', [NO_CHILD]) * len(self)
+        children = self.children
+        for node in range(len(self)):
+            first = self.first[node]
+            for i in range(first, first + self.count[node]):
+                parents[children[i]] = node
+        return parents
+
+    def update_sums(self, node: int):
+        """Recompute the total weight and partial sums of a group or
+        list from the weights of its children, after some have changed.
+        Sums are taken in order, as when the tree was built.
+        """
+        weights, partials, children = self.weights, self.partials, self.children
+        lo, hi = self.child_range(node)
+        total = 0
+        running = 0
+        for i in range(lo, hi):
+            partials[i] = running
+            weight = weights[children[i]]
+            total += weight
+            if weight > 0:
+                running += weight
+        partials[hi] = running
+        weights[node] = total
+
+    def flat_values(self) -> list[Real] | None:
+        """The values, if the tree is a flat list of unlabeled numbers,
+        otherwise None.
+        """
+        root = self.root
+        if self.kinds[root] != LIST or self.keyed[root]:
+            return None
+        kinds, labels = self.kinds, self.labels
+        children = self.child_nodes(root)
+        if any(kinds[child] != LEAF or labels[child] is not None for child in children):
+            return None   # Nested, or labeled (name, value) pairs
+        return [self.weights[child] for child in children]
+
+    def to_nest(self, largest_first: bool = False) -> Nest:
+        """The nest this tree represents, with the parts of each list or
+        dict in their original order or, if largest_first, in decreasing
+        order of weight (stable among parts of equal weight).
+
+        >>> tree = WeightedTree.from_nest({"Cake": {"Chocolate": 4, "Carrot": 10}, "Ice Cream": 15})
+        >>> tree.to_nest()
+        {'Cake': {'Chocolate': 4, 'Carrot': 10}, 'Ice Cream': 15}
+        >>> tree.to_nest(largest_first=True)
+        {'Ice Cream': 15, 'Cake': {'Carrot': 10, 'Chocolate': 4}}
+        """
+        weights = self.weights
+        # Post-order numbering means parts are always built before
+        # the node that contains them.
+        built: dict[int, Nest] = {}
+        for node in range(len(self)):
+            if self.kinds[node] == LEAF:
+                built[node] = weights[node]
+                continue
+            parts = self.child_nodes(node)
+            if largest_first:
+                parts = sorted(parts, key=lambda child: weights[child], reverse=True)
+            if self.keyed[node]:
+                built[node] = {self.labels[part]: built.pop(part) for part in parts}
+            else:
+                built[node] = [self._element(part, built.pop(part)) for part in parts]
+        root = self.root
+        return self._element(root, built.pop(root))
+
+    def _element(self, node: int, nest: Nest) -> Nest:
+        """A part of a list: labeled parts are (label, value) pairs"""
+        if self.labels[node] is None:
+            return nest
+        return self.labels[node], nest
+
+
+def as_tree(items: Nest | WeightedTree) -> WeightedTree:
+    """items as a WeightedTree, building it if necessary"""
+    if isinstance(items, WeightedTree):
+        return items
+    return WeightedTree.from_nest(items)
+
+
+def validate(nest: Nest) -> list[str]:
+    """Descriptions of the parts of nest that cannot be part of a treemap.
+
+    >>> validate({"a": 1, "b": [2, -3, "four"], "c": None})
+    ['b/1: -3 is negative', "b/2: 'four' is not a number, list, or dict", 'c: None is not a number, list, or dict']
+    """
+    problems: list[str] = []
+    WeightedTree.from_nest(nest, problems)
+    return problems
+
+
+def value_problem(value: Real) -> str | None:
+    """What is wrong with this number as a weight, if anything?"""
+    if not math.isfinite(value):
+        return f"{value} is not a finite number"
+    if value < 0:
+        return f"{value} is negative"
+    return None
+
+
+def path(stack: list[list]) -> str:
+    """Path from root to the part being built, as labels of dict entries
+    and positions in lists, separated by '/'
+    """
+    steps = []
+    for kind, label, parts, position, child_nodes, keyed in stack:
+        part = parts[position - 1] if position > 0 else None
+        if keyed and isinstance(part, tuple):
+            steps.append(str(part[0]))
+        else:
+            steps.append(str(position - 1))
+    return "/".join(steps) or "(top)"
+
+
+if __name__ == "__main__":
+    doctest.testmod()